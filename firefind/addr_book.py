@@ -0,0 +1,170 @@
+# firefind/addr_book.py
+# Address-object and address-group tables (--addr-book) for the v0.1 normalizer.
+#
+# Policy exports mostly carry object names ("CLIENT1_AllNets", "WAN_21") instead
+# of CIDRs, so the engine can't reason about the networks behind them. This module
+# loads the vendor's address objects + groups, expands nested groups once, and
+# gives to_v01 a dict: lowercase name -> ("10.1.0.0/16", "10.9.0.1-10.9.0.20", ...).
+# to_v01 then stores the resolved networks next to the names (src_nets/dst_nets),
+# so checks read networks directly instead of re-interpreting names every time.
+#
+# Accepted inputs (one or more files, merged):
+#   - JSON: { "name": spec } where spec is a CIDR/IP/range string, another object
+#           name, a {"members": [...]} dict, or a list of any of these.
+#   - CSV/XLSX vendor export with a name column plus an address/subnet column
+#     (optionally netmask, or start/end IP) for objects, or a members column for groups.
+# FQDN objects are kept out of the network list (they don't resolve to CIDRs here).
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .cache import content_key, load_artifact, store_artifact
+from .object_export import flatten_groups, pick, read_object_rows
+from .v01 import _lower, _split_multi, _strip_label_prefixes
+
+AddrBook = Dict[str, Tuple[str, ...]]
+
+# bump when the compiled layout changes so old cache entries are ignored
+ADDR_BOOK_VERSION = "addr-book/1"
+
+_NAME_COLS = ("name", "objectname", "addressname", "groupname", "hostname")
+_VALUE_COLS = ("address", "ipaddress", "ip", "subnet", "network", "ipnetmask", "cidr",
+               "value", "addressfqdn", "ipv4address", "ipv6address", "details")
+_MASK_COLS = ("netmask", "mask", "subnetmask")
+_START_COLS = ("startip", "startaddress", "fromip")
+_END_COLS = ("endip", "endaddress", "toip")
+_MEMBER_COLS = ("members", "member", "groupmembers")
+
+_RANGE_SPLIT = re.compile(r"\s*[-–]\s*")
+
+
+def load_addr_book(paths: Optional[Sequence[str]]) -> Optional[AddrBook]:
+    """
+    Load and compile one or more address-object/group files into one book.
+    Returns None when no path is given. Raises FileNotFoundError / ValueError
+    on a missing or unreadable file.
+    """
+    if not paths:
+        return None
+    if isinstance(paths, str):
+        paths = [paths]
+    files = [Path(p) for p in paths]
+    for p in files:
+        if not p.is_file():
+            raise FileNotFoundError(f"Address book not found: {p}")
+
+    blob = b"\0".join(p.suffix.lower().encode() + b"\0" + p.read_bytes() for p in files)
+    key = content_key(blob, ADDR_BOOK_VERSION)
+    cached = load_artifact("addrbook", key)
+    if cached is not None:
+        return cached
+
+    defs: Dict[str, List[Any]] = {}
+    for p in files:
+        if p.suffix.lower() == ".json":
+            try:
+                raw = json.loads(p.read_text(encoding="utf-8-sig"))
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise ValueError(f"Bad address book JSON in {p}: {e}")
+            if not isinstance(raw, dict):
+                raise ValueError(f"Address book {p} must be a JSON object of name -> spec")
+            _defs_from_json(raw, defs)
+        else:
+            _defs_from_export(p, defs)
+
+    compiled = compile_addr_book(defs)
+    store_artifact("addrbook", key, compiled)
+    return compiled
+
+
+def _defs_from_json(raw: Dict[str, Any], defs: Dict[str, List[Any]]) -> None:
+    for name, spec in raw.items():
+        if isinstance(spec, dict):
+            spec = spec.get("members", spec.get("address", []))
+        if not isinstance(spec, list):
+            spec = [spec]
+        defs.setdefault(_lower(name), []).extend(spec)
+
+
+def _defs_from_export(p: Path, defs: Dict[str, List[Any]]) -> None:
+    for r in read_object_rows(p, _NAME_COLS):
+        name = pick(r, _NAME_COLS)
+        if not name:
+            continue
+        specs: List[str] = []
+        members = pick(r, _MEMBER_COLS)
+        value = pick(r, _VALUE_COLS)
+        start, end = pick(r, _START_COLS), pick(r, _END_COLS)
+        if members:
+            specs = _split_multi(members)
+        elif start and end:
+            specs = [f"{start}-{end}"]
+        elif value:
+            mask = pick(r, _MASK_COLS)
+            specs = [f"{value}/{mask}"] if mask and "/" not in value else _split_multi(value)
+        defs.setdefault(_lower(name), []).extend(specs)
+
+
+def parse_network(token: str) -> Optional[str]:
+    """
+    Canonical network string for an address literal, or None for names/FQDNs.
+      "10.1.1.0 255.255.255.0" / "IP/Netmask: 10.1.1.0/255.255.255.0" -> "10.1.1.0/24"
+      "10.0.0.5" -> "10.0.0.5/32"
+      "10.0.0.1 - 10.0.0.9" -> "10.0.0.1-10.0.0.9"
+    """
+    s = _strip_label_prefixes(str(token).strip())
+    if not s:
+        return None
+    parts = _RANGE_SPLIT.split(s)
+    if len(parts) == 2:
+        try:
+            lo, hi = ipaddress.ip_address(parts[0]), ipaddress.ip_address(parts[1])
+        except ValueError:
+            return None
+        if lo.version != hi.version:
+            return None
+        if hi < lo:
+            lo, hi = hi, lo
+        return f"{lo}-{hi}"
+    s = re.sub(r"\s+", "/", s)
+    try:
+        return str(ipaddress.ip_network(s, strict=False))
+    except ValueError:
+        return None
+
+
+def _expand_leaf(spec: Any) -> List[str]:
+    net = parse_network(str(spec))
+    return [net] if net else []
+
+
+def compile_addr_book(defs: Dict[str, List[Any]]) -> AddrBook:
+    """Flatten every address name/group to its final network strings."""
+    flat = flatten_groups(defs, _expand_leaf, "address")
+    return {name: nets for name, nets in flat.items() if nets}
+
+
+def resolve_addrs(tokens: Iterable[str], book: Optional[AddrBook]) -> List[str]:
+    """
+    Networks behind a src/dst list: literals as-is, names via the book.
+    "any" resolves to both 0.0.0.0/0 and ::/0. Unknown names contribute nothing.
+    """
+    out: Dict[str, None] = {}
+    for tok in tokens:
+        t = _lower(tok)
+        if t in ("any", "all"):
+            out["0.0.0.0/0"] = None
+            out["::/0"] = None
+            continue
+        nets = book.get(t) if book else None
+        if nets is None:
+            net = parse_network(tok)
+            nets = (net,) if net else ()
+        for n in nets:
+            out[n] = None
+    return list(out)
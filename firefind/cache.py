@@ -0,0 +1,121 @@
+# firefind/cache.py
+# Small on-disk cache for compiled artifacts (service maps, address books, rule sets).
+# Each artifact is keyed by a hash of its source bytes plus a format version,
+# so editing the source file or changing the compiled format just misses the cache.
+# Entries are pickles, so the cache lives in a per-user directory (never the working
+# directory of whatever checkout the tool runs in) and is only read when that directory
+# is not writable by other users. Old entries are evicted by age and total size.
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+# FIREFIND_CACHE_DIR=<dir> moves the cache; FIREFIND_CACHE_DIR=off disables it
+CACHE_ENV = "FIREFIND_CACHE_DIR"
+# entries unused for this long are removed, then the oldest until the cache fits
+MAX_AGE_SECONDS = 30 * 24 * 3600
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> Path:
+    """$XDG_CACHE_HOME/firefind, %LOCALAPPDATA%\\firefind on Windows, else ~/.cache/firefind."""
+    base = os.getenv("XDG_CACHE_HOME") or os.getenv("LOCALAPPDATA")
+    return (Path(base) if base else Path.home() / ".cache") / "firefind"
+
+
+def cache_dir() -> Optional[Path]:
+    """Where artifacts live, or None when caching is switched off."""
+    d = os.getenv(CACHE_ENV)
+    if d is None:
+        return default_cache_dir()
+    if not d or d.lower() == "off":
+        return None
+    return Path(d)
+
+
+def _trusted(d: Path) -> bool:
+    # a directory other users can write to could hold planted pickles
+    if os.name != "posix":
+        return True
+    try:
+        st = d.stat()
+    except OSError:
+        return False
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def content_key(data: bytes, version: str) -> str:
+    """sha256 over format version + source bytes."""
+    h = hashlib.sha256(version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+def load_artifact(kind: str, key: str) -> Optional[Any]:
+    """Return the cached object, or None on a miss / unreadable entry."""
+    d = cache_dir()
+    if d is None:
+        return None
+    p = d / f"{kind}-{key}.pkl"
+    if not p.exists() or not _trusted(d):
+        return None
+    try:
+        with p.open("rb") as f:
+            obj = pickle.load(f)
+        os.utime(p)  # last use, for eviction
+        return obj
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def store_artifact(kind: str, key: str, obj: Any) -> None:
+    """
+    Write the artifact atomically (temp file + rename) so a crashed run never
+    leaves a half-written entry. A read-only disk just means no caching.
+    """
+    d = cache_dir()
+    if d is None:
+        return
+    try:
+        d.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(d), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, d / f"{kind}-{key}.pkl")
+    except OSError:
+        return
+    prune(d)
+
+
+def prune(d: Path, max_age: float = MAX_AGE_SECONDS, max_bytes: int = MAX_CACHE_BYTES) -> int:
+    """Remove entries (and stray temp files) older than max_age, then the least recently
+    used ones until the rest fits in max_bytes. Returns how many files were removed."""
+    now = time.time()
+    entries = []
+    for p in list(d.glob("*.pkl")) + list(d.glob("*.tmp")):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    entries.sort(key=lambda e: e[0])
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, p in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            p.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
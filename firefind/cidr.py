@@ -0,0 +1,94 @@
+# firefind/cidr.py
+# Addresses as integer intervals, for the within_cidr / overlaps_cidr operators.
+#
+# Every address token becomes (version, first, last) as plain ints:
+#   "10.1.0.0/16"          -> (4, 167837696, 167903231)
+#   "10.0.0.1"             -> (4, 167772161, 167772161)
+#   "10.0.0.1-10.0.0.9"    -> (4, 167772161, 167772169)
+#   "any" / "all"          -> both 0.0.0.0/0 and ::/0
+# A cidr_groups set is merged once (at load time) into sorted, non-overlapping
+# intervals per IP version; containment and overlap are then one bisect each.
+
+from __future__ import annotations
+
+import ipaddress
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from firefind.normalized import coalesce_intervals
+
+Span = Tuple[int, int, int]  # (ip version, first, last)
+
+_ANY = ((4, 0, (1 << 32) - 1), (6, 0, (1 << 128) - 1))
+INTERVAL_MEMO_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=INTERVAL_MEMO_SIZE)
+def token_spans(tok: str) -> Tuple[Span, ...]:
+    """Intervals for one address token; () for object names and junk."""
+    from firefind.rules_loader import classify_addr_token  # shares the lexical pre-check
+
+    t = tok.strip()
+    if t.lower() in ("any", "all"):
+        return _ANY
+    kind = classify_addr_token(t)
+    try:
+        if kind == "range":
+            a, b = (ipaddress.ip_address(x.strip()) for x in t.split("-", 1))
+            if a.version != b.version:
+                return ()
+            lo, hi = sorted((int(a), int(b)))
+            return ((a.version, lo, hi),)
+        if kind in ("ipv4", "ipv6"):
+            net = ipaddress.ip_network(t, strict=False)
+            return ((net.version, int(net.network_address), int(net.broadcast_address)),)
+    except ValueError:
+        pass
+    return ()
+
+
+class IntervalIndex:
+    """Merged, sorted intervals of a set of networks (one list per IP version)."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, tokens: Iterable[str]):
+        per_version: Dict[int, List[Tuple[int, int]]] = {4: [], 6: []}
+        for tok in tokens:
+            for ver, lo, hi in token_spans(str(tok)):
+                per_version[ver].append((lo, hi))
+        self.starts: Dict[int, List[int]] = {}
+        self.ends: Dict[int, List[int]] = {}
+        for ver, spans in per_version.items():
+            merged = coalesce_intervals(spans)
+            self.starts[ver] = [lo for lo, _ in merged]
+            self.ends[ver] = [hi for _, hi in merged]
+
+    def __bool__(self) -> bool:
+        return any(self.starts.values())
+
+    def contains(self, span: Span) -> bool:
+        """Is the whole interval inside one of the group's (merged) networks?"""
+        ver, lo, hi = span
+        starts = self.starts[ver]
+        i = bisect_right(starts, lo) - 1
+        return i >= 0 and self.ends[ver][i] >= hi
+
+    def overlaps(self, span: Span) -> bool:
+        """Does the interval share at least one address with the group?"""
+        ver, lo, hi = span
+        starts = self.starts[ver]
+        i = bisect_right(starts, hi) - 1
+        return i >= 0 and self.ends[ver][i] >= lo
+
+
+def address_spans(tokens: Iterable[str]) -> Optional[List[Span]]:
+    """All intervals behind an address list, or None if any token isn't an address."""
+    out: List[Span] = []
+    for tok in tokens:
+        spans = token_spans(tok) if isinstance(tok, str) else ()
+        if not spans:
+            return None
+        out.extend(spans)
+    return out
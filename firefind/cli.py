@@ -1,21 +1,44 @@
 # firefind/cli.py
 import argparse, sys, csv
 from pathlib import Path
-from firefind import parser, risk_engine  # adjust imports to your modules
+from firefind import one, risk_engine
+from firefind.v01 import to_v01
 
 def write_csv(rows, path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = ["vendor", "rule_id", "src", "dst", "service", "action", "reason", "severity"]
+    fieldnames = ["vendor", "rule_id", "check_id", "src", "dst", "service", "reason", "severity", "source_file"]
     with path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
         w.writeheader()
         for r in rows:
             w.writerow(r)
 
+def flat_finding(fnd):
+    # one finding (schema_findings_v0.1) -> one CSV row
+    svcs = fnd.get("services", [])
+    return {
+        "vendor":   fnd.get("vendor", ""),
+        "rule_id":  fnd.get("rule_id", ""),
+        "check_id": fnd.get("check_id", ""),
+        "src":      " ".join(fnd.get("src_addrs", [])),
+        "dst":      " ".join(fnd.get("dst_addrs", [])),
+        "service":  " ".join(s.get("protocol", "any") for s in svcs if isinstance(s, dict)),
+        "reason":   fnd.get("reason", ""),
+        "severity": fnd.get("severity", ""),
+    }
+
 def main():
-    ap = argparse.ArgumentParser(description="FireFind CLI")
+    # subcommand: python -m firefind.cli lookup <rules> --src .. --dst .. [--proto ..] [--port ..]
+    if len(sys.argv) > 1 and sys.argv[1] == "lookup":
+        from firefind import lookup
+        return lookup.main(sys.argv[2:])
+
+    ap = argparse.ArgumentParser(description="FireFind CLI (subcommands: lookup)")
     ap.add_argument("-i", "--input", required=True, help="File or directory of CSV/XLSX exports")
     ap.add_argument("-o", "--out", default="results", help="Directory to write outputs (default: results)")
+    ap.add_argument("--rules", default="docs/rules.yml", help="Checks file (default: docs/rules.yml)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Engine processes per file (0 = one per CPU, default: 1)")
     args = ap.parse_args()
 
     in_path = Path(args.input)
@@ -34,11 +57,14 @@ def main():
 
     all_rows = []
     for f in files:
-        rules = list(parser.parse(str(f)))            # your existing parser
-        findings = list(risk_engine.evaluate(rules))  # your risk checks
-        write_csv(findings, out_dir / f"{f.stem}.findings.csv")
-        for row in findings:
-            row = dict(row)
+        sheet = 0 if f.suffix.lower() in {".xlsx", ".xls"} else None  # first sheet (None = every sheet)
+        rules = one.try_parse(f, sheet, 15, 0)          # parser (one.py)
+        vendor_hint = one.detect_vendor_from_filename(str(f))
+        normalized = [to_v01(r, vendor_hint) for r in rules]
+        findings = risk_engine.run_engine(normalized, rules_path=args.rules, workers=args.workers)
+        rows = [flat_finding(x) for x in findings]
+        write_csv(rows, out_dir / f"{f.stem}.findings.csv")
+        for row in rows:
             row["source_file"] = f.name
             all_rows.append(row)
 
@@ -0,0 +1,248 @@
+# firefind/columnar.py
+# Columnar (NumPy) engine mode for very large policies.
+#
+# Same checks, same findings as risk_engine.run_engine, but instead of calling every
+# compiled check on every enriched row, a batch of rows is turned into columns once
+# and each condition node becomes a boolean mask over the whole batch:
+#   - list fields (src_addrs, dst_addrs, service.ports) -> flat token arrays + row ids;
+#     "overlaps <set>" = which tokens are in the set, bincount per row
+#   - overlaps_range [lo, hi] -> numeric compare on the port tokens, OR service.any
+#   - scalar fields (action, service.any, service.port_span, raw.service, ...) ->
+#     factorized codes; the compiled leaf runs once per *distinct* value and the
+#     answer is broadcast back with codes (exact for every op, incl. ilike_any)
+#   - all/any -> logical and/or of child masks (shared DAG nodes computed once)
+# Anything that can't be columnized (builtins, unhashable values) falls back to
+# calling the compiled leaf row by row, so results never differ from run_engine.
+#
+# numpy is optional for the rest of firefind; only this mode needs it.
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from firefind.reciprocal import annotate, reciprocal_partners, uses_reciprocal
+from firefind.rules_loader import CondNode, SetTable, _compile_getter, enrich_rule, load_rules
+
+# rows enriched + columnized together (bounds memory on million-rule estates)
+COLUMN_BATCH = 65536
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("The columnar engine needs numpy (pip install numpy)")
+    return np
+
+
+def run_engine_columnar(
+    normalized_rules: List[Dict[str, Any]],
+    rules_path: str = "docs/rules.yml",
+    batch_size: int = COLUMN_BATCH,
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Vectorized equivalent of risk_engine.run_engine: same findings, same order
+    (rule, then check in rules.yml order), same suppression stats.
+    """
+    from firefind.risk_engine import make_finding, new_stats
+
+    np = _numpy()
+    checks = load_rules(rules_path)
+    sets: SetTable = checks[0]["sets"] if checks else SetTable({}, {}, {})
+    findings: List[Dict[str, Any]] = []
+
+    suppressors = [c for c in checks if c.get("suppress")]
+    active = [c for c in checks if not c.get("suppress")]
+    if stats is not None:
+        stats.update(new_stats())
+
+    rules = normalized_rules if isinstance(normalized_rules, list) else list(normalized_rules)
+    partners = reciprocal_partners(rules) if uses_reciprocal(checks) else None
+    for start in range(0, len(rules), batch_size):
+        batch = rules[start:start + batch_size]
+        rows = [enrich_rule(r) for r in batch]
+        if partners is not None:
+            annotate(rows, partners[start:start + batch_size])
+        cols = Columns(rows, sets)
+
+        # suppression pre-filter (then: action: ignore); the first matching check gets the count
+        kept = np.ones(len(batch), dtype=bool)
+        for sup in suppressors:
+            hit = cols.mask(sup["node"]) & kept
+            if stats is not None and hit.any():
+                stats["suppressed_by"][sup["id"]] = stats["suppressed_by"].get(sup["id"], 0) + int(hit.sum())
+            kept &= ~hit
+        if stats is not None:
+            stats["rules"] += len(batch)
+            stats["suppressed"] += int(len(batch) - kept.sum())
+        if not active:
+            continue
+
+        hits = np.stack([cols.mask(chk["node"]) for chk in active], axis=1) & kept[:, None]
+        # nonzero on a (rules x checks) matrix is row-major: rule order, then check order
+        for ri, ci in zip(*np.nonzero(hits)):
+            chk = active[ci]
+            findings.append(make_finding(batch[ri], chk, chk.get("rationale", "")))
+    return findings
+
+
+class Columns:
+    """Column views of one batch of enriched rows, built lazily per field."""
+
+    def __init__(self, rows: List[Dict[str, Any]], sets: SetTable):
+        self.np = _numpy()
+        self.rows = rows
+        self.n = len(rows)
+        self.sets = sets
+        self._values: Dict[str, List[Any]] = {}
+        self._codes: Dict[str, Optional[Tuple[Any, List[Any]]]] = {}
+        self._tokens: Dict[str, Tuple[Any, Any, List[Any]]] = {}
+        self._masks: Dict[int, Any] = {}
+
+    #  columns
+
+    def values(self, field: str) -> List[Any]:
+        vals = self._values.get(field)
+        if vals is None:
+            get = _compile_getter(field)
+            vals = self._values[field] = [get(r) for r in self.rows]
+        return vals
+
+    def codes(self, field: str) -> Optional[Tuple[Any, List[Any]]]:
+        """(codes array, distinct values) for a scalar field; None if a value is unhashable."""
+        if field not in self._codes:
+            index: Dict[Any, int] = {}
+            uniques: List[Any] = []
+            out = self.np.empty(self.n, dtype=self.np.int64)
+            try:
+                for i, v in enumerate(self.values(field)):
+                    c = index.get(v)
+                    if c is None:
+                        c = index[v] = len(uniques)
+                        uniques.append(v)
+                    out[i] = c
+                self._codes[field] = (out, uniques)
+            except TypeError:
+                self._codes[field] = None
+        return self._codes[field]
+
+    def tokens(self, field: str) -> Tuple[Any, Any, List[Any]]:
+        """
+        Flattened list field: (row id per token, vocab code per token, vocab).
+        Rows whose value isn't a list contribute no tokens (the ops treat them as no match).
+        """
+        hit = self._tokens.get(field)
+        if hit is None:
+            np = self.np
+            index: Dict[Any, int] = {}
+            vocab: List[Any] = []
+            row_ids: List[int] = []
+            tok: List[int] = []
+            for i, v in enumerate(self.values(field)):
+                if not isinstance(v, list):
+                    continue
+                for t in v:
+                    try:
+                        c = index.get(t)
+                    except TypeError:
+                        continue
+                    if c is None:
+                        c = index[t] = len(vocab)
+                        vocab.append(t)
+                    row_ids.append(i)
+                    tok.append(c)
+            hit = self._tokens[field] = (np.array(row_ids, dtype=np.int64),
+                                         np.array(tok, dtype=np.int64), vocab)
+        return hit
+
+    def truth(self, field: str) -> Any:
+        np = self.np
+        return np.fromiter((bool(v) for v in self.values(field)), dtype=bool, count=self.n)
+
+    #  masks
+
+    def mask(self, node: CondNode) -> Any:
+        """Boolean mask (one entry per row) for a compiled condition node."""
+        m = self._masks.get(id(node))
+        if m is None:
+            m = self._masks[id(node)] = self._mask(node)
+        return m
+
+    def _mask(self, node: CondNode) -> Any:
+        np = self.np
+        if node.kind in ("all", "any"):
+            parts = [self.mask(c) for c in node.children]
+            combine = np.logical_and if node.kind == "all" else np.logical_or
+            out = parts[0].copy()
+            for p in parts[1:]:
+                combine(out, p, out=out)
+            return out
+        if node.kind == "const":
+            return np.full(self.n, bool(node.fn({})), dtype=bool)
+
+        cond = node.cond if isinstance(node.cond, dict) else {}
+        field, op = cond.get("field"), cond.get("op")
+        if field is not None and op == "overlaps":
+            fold = self.sets.casefold if cond.get("casefold") is None else bool(cond.get("casefold"))
+            return self._overlaps(str(field), self.sets.frozen_for(cond.get("value"), folded=fold), fold)
+        if field is not None and op == "overlaps_range":
+            return self._overlaps_range(str(field), cond.get("value"))
+        if field is not None:
+            return self._by_distinct_value(str(field), node)
+        return self._row_by_row(node)
+
+    def _any_token(self, field: str, token_hit: Any) -> Any:
+        # rows with at least one token where token_hit[token] is True
+        row_ids, tok, _ = self.tokens(field)
+        return self.np.bincount(row_ids[token_hit[tok]], minlength=self.n) > 0
+
+    def _overlaps(self, field: str, vset: frozenset, fold: bool) -> Any:
+        np = self.np
+        if not vset:
+            return np.zeros(self.n, dtype=bool)
+        _, _, vocab = self.tokens(field)
+        if fold:
+            in_set = [(t.casefold() if isinstance(t, str) else t) in vset for t in vocab]
+        else:
+            in_set = [t in vset for t in vocab]
+        return self._any_token(field, np.array(in_set, dtype=bool))
+
+    def _overlaps_range(self, field: str, raw_value: Any) -> Any:
+        # mirrors rules_loader._compile_op("overlaps_range")
+        np = self.np
+        value = self.sets.resolve(raw_value)
+        vv = value if isinstance(value, list) else []
+        is_range = len(vv) == 2 and all(isinstance(x, int) for x in vv)
+        if vv and not is_range:
+            return self._overlaps(field, self.sets.frozen_for(raw_value), False)
+        if not is_range:
+            return np.zeros(self.n, dtype=bool)
+        lo, hi = vv
+        if hi < lo:
+            lo, hi = hi, lo
+        _, _, vocab = self.tokens(field)
+        in_range = np.array([isinstance(t, int) and lo <= t <= hi for t in vocab], dtype=bool)
+        return self.truth("service.any") | self._any_token(field, in_range)
+
+    def _by_distinct_value(self, field: str, node: CondNode) -> Any:
+        # the leaf only looks at get(row), so evaluate it once per distinct value
+        np = self.np
+        coded = self.codes(field)
+        if coded is None:
+            return self._row_by_row(node)
+        codes, uniques = coded
+        per_value = np.array([bool(node.fn(_probe_row(field, v))) for v in uniques], dtype=bool)
+        return per_value[codes] if len(uniques) else np.zeros(self.n, dtype=bool)
+
+    def _row_by_row(self, node: CondNode) -> Any:
+        fn = node.fn
+        return self.np.fromiter((bool(fn(r)) for r in self.rows), dtype=bool, count=self.n)
+
+
+def _probe_row(field: str, value: Any) -> Dict[str, Any]:
+    # smallest row for which _compile_getter(field) returns `value`
+    row: Any = value
+    for part in reversed(field.split(".")):
+        row = {part: row}
+    return row
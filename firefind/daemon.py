@@ -0,0 +1,244 @@
+# firefind/daemon.py
+# Resident engine: keeps the compiled checks, the enriched rules and the current
+# findings in memory, watches rules.yml, and on a change re-runs only the checks
+# that actually changed.
+#
+#   python -m firefind.daemon results/normalized.jsonl --rules docs/rules.yml --interval 2
+#
+# Change detection: mtime/size first (cheap stat), then a sha256 of the file, so a
+# plain `touch` or an editor rewriting identical bytes costs nothing.
+# A check counts as changed when its fingerprint changes. The fingerprint covers
+# everything that affects its findings: the when/then blocks with every set_ref
+# replaced by the set's current values (editing addr_names.internet_like re-runs
+# exactly the checks that use it), plus severity/name/rationale/recommendation/labels.
+# Suppression checks (then: action: ignore) changing re-evaluates the affected rules
+# only: rules that became suppressed lose their findings, rules that were released
+# are checked against the unchanged checks too.
+# Each reload publishes one JSON line on stdout:
+#   {"version": n, "changed_checks": [...], "added": [finding...], "removed": [finding...]}
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from firefind.reciprocal import annotate, reciprocal_partners
+from firefind.risk_engine import make_finding
+from firefind.rule_index import RuleIndex
+from firefind.rules_loader import SetTable, enrich_rule, load_rules
+
+Delta = Dict[str, Any]
+
+# the parts of a check that end up in (or decide) its findings
+_FINGERPRINT_KEYS = ("name", "severity", "rationale", "recommendation", "labels", "then")
+
+
+def check_fingerprint(chk: Dict[str, Any], sets: SetTable) -> str:
+    """Stable hash of a check with every set_ref replaced by the set's values."""
+    doc = {k: chk.get(k) for k in _FINGERPRINT_KEYS}
+    doc["when"] = _resolve_refs(chk.get("when"), sets)
+    doc["casefold"] = sets.casefold
+    blob = json.dumps(doc, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _resolve_refs(node: Any, sets: SetTable) -> Any:
+    if isinstance(node, dict):
+        if "set_ref" in node:
+            return {"set_ref": node["set_ref"], "values": sets.resolve(node)}
+        return {k: _resolve_refs(v, sets) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_resolve_refs(v, sets) for v in node]
+    return node
+
+
+def _check_keys(checks: List[Dict[str, Any]]) -> List[str]:
+    # check id, made unique if a file repeats one ("R-X", "R-X#2")
+    seen: Dict[str, int] = {}
+    keys = []
+    for chk in checks:
+        cid = str(chk.get("id", ""))
+        seen[cid] = seen.get(cid, 0) + 1
+        keys.append(cid if seen[cid] == 1 else f"{cid}#{seen[cid]}")
+    return keys
+
+
+class EngineDaemon:
+    """
+    In-memory engine state for one set of normalized rules.
+    reload() / poll() return a Delta (or None when nothing changed);
+    findings() is always the same list run_engine would return.
+    """
+
+    def __init__(self, rules_path: str, normalized_rules: Sequence[Dict[str, Any]]):
+        self.rules_path = rules_path
+        self.rules = list(normalized_rules)
+        self.rows = [enrich_rule(r) for r in self.rules]  # rules.yml-independent, enriched once
+        annotate(self.rows, reciprocal_partners(self.rules))  # so reloads can add reciprocal checks
+        self.index = RuleIndex(self.rows)
+        self.version = 0
+
+        self.checks: List[Dict[str, Any]] = []
+        self.keys: List[str] = []
+        self.prints: Dict[str, str] = {}
+        self.matches: Dict[str, Set[int]] = {}  # check key -> matched row positions
+        self.suppressed: Set[int] = set()
+        self._stat: Tuple[float, int] = (-1.0, -1)
+        self._digest = ""
+        self.reload()
+
+    #  state
+
+    def findings(self) -> List[Dict[str, Any]]:
+        """Current findings, in run_engine order (rule, then check)."""
+        pairs = sorted((pos, ci) for ci, key in enumerate(self.keys) for pos in self.matches.get(key, ()))
+        return [self._finding(pos, ci) for pos, ci in pairs]
+
+    def _finding(self, pos: int, ci: int) -> Dict[str, Any]:
+        chk = self.checks[ci]
+        return make_finding(self.rules[pos], chk, chk.get("rationale", ""))
+
+    def _evaluate(self, chk: Dict[str, Any], positions: Optional[Set[int]] = None) -> Set[int]:
+        cand = self.index.candidates(chk.get("guards"))
+        pool = range(len(self.rows)) if cand is None else cand
+        if positions is not None:
+            pool = positions if cand is None else (cand & positions)
+        match = chk["match"]
+        return {i for i in pool if i not in self.suppressed and match(self.rows[i])[0]}
+
+    def _suppressed_by(self, checks: List[Dict[str, Any]]) -> Set[int]:
+        out: Set[int] = set()
+        for chk in checks:
+            if chk.get("suppress"):
+                out |= {i for i in range(len(self.rows)) if chk["match"](self.rows[i])[0]}
+        return out
+
+    #  reload
+
+    def poll(self) -> Optional[Delta]:
+        """Reload if rules.yml changed on disk (stat first, then content hash)."""
+        try:
+            st = os.stat(self.rules_path)
+        except OSError:
+            return None
+        if (st.st_mtime, st.st_size) == self._stat:
+            return None
+        self._stat = (st.st_mtime, st.st_size)
+        with open(self.rules_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if digest == self._digest:
+            return None
+        return self.reload()
+
+    def reload(self) -> Optional[Delta]:
+        """
+        Load rules.yml and re-evaluate what changed. A broken file keeps the
+        previous checks (ValueError / FileNotFoundError is re-raised on the first load).
+        """
+        try:
+            st = os.stat(self.rules_path)
+            with open(self.rules_path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            checks = load_rules(self.rules_path)
+        except (OSError, ValueError) as e:
+            if not self.checks:
+                raise
+            print(f"[WARN] rules reload failed, keeping previous checks: {e}", file=sys.stderr)
+            return None
+        self._stat, self._digest = (st.st_mtime, st.st_size), digest
+
+        sets: SetTable = checks[0]["sets"] if checks else SetTable({}, {}, {})
+        keys = _check_keys(checks)
+        prints = {k: check_fingerprint(c, sets) for k, c in zip(keys, checks)}
+        changed = [k for k in keys if self.prints.get(k) != prints[k]]
+        dropped = [k for k in self.keys if k not in prints]
+        if self.checks and not changed and not dropped:
+            self.checks, self.keys = checks, keys  # same definitions, fresh compiled objects
+            return None
+
+        old = {(pos, key): self._finding(pos, ci)
+               for ci, key in enumerate(self.keys) for pos in self.matches.get(key, ())}
+
+        # suppression first: it decides which rules the other checks may see
+        # (old or new definition: a check can become or stop being an ignore-check)
+        sup_changed = any(checks[keys.index(k)].get("suppress") for k in changed) or any(
+            self.checks[self.keys.index(k)].get("suppress") for k in changed + dropped if k in self.keys)
+        released: Set[int] = set()
+        if sup_changed or not self.checks:
+            new_suppressed = self._suppressed_by(checks)
+            released = self.suppressed - new_suppressed
+            self.suppressed = new_suppressed
+
+        matches: Dict[str, Set[int]] = {}
+        for key, chk in zip(keys, checks):
+            if chk.get("suppress"):
+                continue
+            if key in changed or key not in self.matches:
+                matches[key] = self._evaluate(chk)
+            else:
+                kept = self.matches[key] - self.suppressed
+                matches[key] = kept | self._evaluate(chk, released) if released else kept
+
+        self.checks, self.keys, self.prints, self.matches = checks, keys, prints, matches
+        self.version += 1
+        new = {(pos, key): self._finding(pos, ci)
+               for ci, key in enumerate(keys) for pos in matches.get(key, ())}
+        return {
+            "version": self.version,
+            "changed_checks": sorted(set(changed) | set(dropped)),
+            "added": [new[k] for k in sorted(new) if old.get(k) != new[k]],
+            "removed": [old[k] for k in sorted(old) if new.get(k) != old[k]],
+        }
+
+    def run_forever(self, interval: float = 2.0, publish: Optional[Callable[[Delta], None]] = None) -> None:
+        publish = publish or (lambda d: print(json.dumps(d, ensure_ascii=False), flush=True))
+        while True:
+            time.sleep(interval)
+            delta = self.poll()
+            if delta is not None:
+                publish(delta)
+
+
+def _read_rules(path: str) -> List[Dict[str, Any]]:
+    # normalized v0.1 rules from a .jsonl / .json file or a folder of them
+    files = [path] if os.path.isfile(path) else sorted(
+        os.path.join(d, n) for d, _, names in os.walk(path) for n in names
+        if n.lower().endswith((".jsonl", ".json")))
+    out: List[Dict[str, Any]] = []
+    for p in files:
+        with open(p, encoding="utf-8") as f:
+            if p.lower().endswith(".jsonl"):
+                out.extend(json.loads(line) for line in f if line.strip())
+            else:
+                data = json.load(f)
+                out.extend(data if isinstance(data, list) else [])
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="FireFind engine daemon (re-evaluates on rules.yml changes)")
+    ap.add_argument("input", help="Normalized v0.1 rules: .jsonl/.json file or folder")
+    ap.add_argument("--rules", default="docs/rules.yml", help="Checks file to watch")
+    ap.add_argument("--interval", type=float, default=2.0, help="Seconds between checks of rules.yml")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: input not found: {args.input}", file=sys.stderr)
+        return 2
+    daemon = EngineDaemon(args.rules, _read_rules(args.input))
+    print(f"[OK] {len(daemon.rules)} rules, {len(daemon.checks)} checks, "
+          f"{sum(len(m) for m in daemon.matches.values())} findings; watching {args.rules}", file=sys.stderr)
+    try:
+        daemon.run_forever(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+# firefind/duplicates.py
+# Duplicate rules (exports of merged firewalls repeat the same rule under many IDs).
+#
+#   P-DUPLICATE       same canonical rule as an earlier one
+#   P-CONFLICTING-DUPLICATE  same traffic as an earlier rule, another action
+#                            (e.g. allow vs deny) -> a conflict to resolve, not a merge
+#   P-NEAR-DUPLICATE  same as an earlier rule except the source, destination or
+#                     services -> merge candidates
+#
+#   python -m firefind.duplicates results/normalized.jsonl [-o results/duplicates.jsonl]
+#
+# Canonical rule = reciprocal.signature (sorted unique addresses, per-protocol coalesced
+# port intervals) with the action folded to allow / deny (drop and reject block too).
+# Exact duplicates are one dict of canonical keys, O(n). Conflicts and near duplicates use
+# four more dicts, each keyed by the canonical rule with one dimension left out; a bucket
+# holding more than one distinct canonical rule is a cluster. The action dimension goes
+# first, so a rule that conflicts with one rule and could merge with another is reported
+# as the conflict.
+# Disabled rules are left out.
+#
+# The engine side: match_key_fn(checks) gives, for the loaded checks, a key that is
+# equal for two rules only if every check must treat them the same. risk_engine uses
+# it to evaluate each distinct rule of a batch once (run_engine(dedupe=True)).
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from firefind.normalized import action_class
+from firefind.reciprocal import signature
+from firefind.risk_engine import make_finding
+from firefind.rules_loader import _compile_getter, enrich_rule
+
+DUPLICATE = {
+    "id": "P-DUPLICATE",
+    "name": "Duplicate rule",
+    "severity": "low",
+    "rationale": "The rule matches exactly the same traffic with the same action as an earlier rule.",
+    "recommendation": "Remove the duplicate; keep the earlier rule (check hit counts before deleting).",
+    "labels": ["hygiene"],
+}
+NEAR_DUPLICATE = {
+    "id": "P-NEAR-DUPLICATE",
+    "name": "Near-duplicate rule",
+    "severity": "low",
+    "rationale": "The rule differs from an earlier rule in a single dimension; the two can usually be merged.",
+    "recommendation": "Merge the rules into one (combine the differing objects) or document why both exist.",
+    "labels": ["hygiene"],
+}
+CONFLICTING_DUPLICATE = {
+    "id": "P-CONFLICTING-DUPLICATE",
+    "name": "Same traffic, conflicting action",
+    "severity": "medium",
+    "rationale": "The rule matches the same traffic as an earlier rule but with another action; "
+                 "only the earlier one ever applies.",
+    "recommendation": "Decide which action is intended and remove the other rule.",
+    "labels": ["hygiene"],
+}
+
+# (position in the canonical key, wording in the reason, check)
+DIMENSIONS = ((3, "action", CONFLICTING_DUPLICATE), (0, "source addresses", NEAR_DUPLICATE),
+              (1, "destination addresses", NEAR_DUPLICATE), (2, "services", NEAR_DUPLICATE))
+
+Canonical = Tuple[Any, ...]
+
+
+def canonical_key(rule: Dict[str, Any]) -> Canonical:
+    src, dst, svc, action = signature(rule)
+    return src, dst, svc, action_class(action)
+
+
+def find_duplicates(rules: Iterable[Dict[str, Any]], stats: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Exact, conflicting and near duplicates as findings (docs/schema_findings_v0.1.md),
+    in rule order; evidence.related_rule_id = the earlier rule it repeats.
+    """
+    kept = [r for r in rules if r.get("enabled") is not False]
+    keys = [canonical_key(r) for r in kept]
+    first: Dict[Canonical, int] = {}
+    for i, k in enumerate(keys):
+        first.setdefault(k, i)
+
+    found: Dict[int, Dict[str, Any]] = {}
+    counts = {"rules": len(kept), "distinct": len(first), "duplicates": 0, "conflicts": 0, "near_duplicates": 0}
+    for i, k in enumerate(keys):
+        j = first[k]
+        if j != i:
+            found[i] = _finding(kept[i], DUPLICATE, f"Same rule as {_rid(kept[j])}.", kept[j])
+            counts["duplicates"] += 1
+
+    # conflicts / near duplicates: only the first rule of each distinct canonical rule takes part
+    distinct = sorted(first.values())
+    for pos, label, chk in DIMENSIONS:
+        buckets: Dict[Canonical, int] = {}
+        for i in distinct:
+            masked = keys[i][:pos] + keys[i][pos + 1:]
+            j = buckets.setdefault(masked, i)
+            if j != i and i not in found:
+                reason = f"Same as rule {_rid(kept[j])} except the {label}."
+                if chk is CONFLICTING_DUPLICATE:
+                    reason = f"Same traffic as rule {_rid(kept[j])}, but {keys[i][3]} instead of {keys[j][3]}."
+                found[i] = _finding(kept[i], chk, reason, kept[j])
+                counts["conflicts" if chk is CONFLICTING_DUPLICATE else "near_duplicates"] += 1
+    if stats is not None:
+        stats.update(counts)
+    return [found[i] for i in sorted(found)]
+
+
+def _rid(rule: Dict[str, Any]) -> str:
+    return str(rule.get("rule_id", ""))
+
+
+def _finding(rule: Dict[str, Any], chk: Dict[str, Any], reason: str, related: Dict[str, Any]) -> Dict[str, Any]:
+    fnd = make_finding(rule, chk, reason)
+    fnd["evidence"]["related_rule_id"] = _rid(related)
+    return fnd
+
+
+#  engine-side dedupe
+
+# rule keys enrich_rule reads to build the fields it adds (src/dst/service/...)
+ENRICH_SOURCES = ("src_addrs", "dst_addrs", "src", "dst", "src_nets", "dst_nets",
+                  "services", "action", "logging", "direction")
+# fields that exist only after enrich_rule (or the reciprocal pre-pass)
+_DERIVED = frozenset(enrich_rule({})) | {"reciprocal_of"}
+
+
+def match_key_fn(checks: List[Dict[str, Any]]) -> Callable[[Dict[str, Any]], Optional[Hashable]]:
+    """
+    rule -> key; two rules with the same key get the same result from every check.
+    The key holds the enrichment inputs plus every other field a check reads.
+    None = the rule has an unhashable value somewhere; evaluate it on its own.
+    """
+    fields = set()
+    for chk in checks:
+        node = chk.get("node")
+        for n in (node.walk() if node is not None else ()):
+            if isinstance(n.cond, dict) and n.cond.get("field") is not None:
+                fields.add(str(n.cond["field"]))
+    extra = sorted(f for f in fields
+                   if f.split(".", 1)[0] not in _DERIVED and f.split(".", 1)[0] not in ENRICH_SOURCES)
+    getters = [_compile_getter(f) for f in extra]
+
+    def match_key(rule: Dict[str, Any]) -> Optional[Hashable]:
+        try:
+            key = tuple(_freeze(rule.get(k)) for k in ENRICH_SOURCES) + tuple(_freeze(g(rule)) for g in getters)
+            hash(key)
+        except TypeError:
+            return None
+        return key
+    return match_key
+
+
+def _freeze(value: Any) -> Hashable:
+    # lists/dicts -> nested tuples (order kept: a check may care about it)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, Mapping):
+        return tuple((k, _freeze(value[k])) for k in sorted(value, key=str))
+    return value
+
+
+def main() -> int:
+    from firefind.daemon import _read_rules
+
+    ap = argparse.ArgumentParser(description="FireFind duplicate / conflicting / near-duplicate rules")
+    ap.add_argument("input", help="Normalized v0.1 rules: .jsonl/.json file or folder")
+    ap.add_argument("-o", "--out", default="results/duplicates.jsonl", help="Findings JSONL to write")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: input not found: {args.input}", file=sys.stderr)
+        return 2
+    stats: Dict[str, int] = {}
+    findings = find_duplicates(_read_rules(args.input), stats)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        for item in findings:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    print(f"[OK] {stats['rules']} rules, {stats['distinct']} distinct: {stats['duplicates']} duplicates, "
+          f"{stats['conflicts']} conflicting, {stats['near_duplicates']} near duplicates -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -430,9 +430,19 @@ if __name__ == "__main__":
                         default="results/firefind_report.pdf")
     parser.add_argument("--ttf", help="Optional Unicode TTF (e.g., assets/fonts/DejaVuSans.ttf)", default=None)
     parser.add_argument("--logo", help="Optional logo image path (PNG/JPG)", default=None)
+    parser.add_argument("--validate", choices=["full", "sample"], default=None,
+                        help="Check findings against docs/schema_findings_v0.1.md before rendering")
     args = parser.parse_args()
 
     findings = _load_input(args.input)
+    if args.validate:
+        from firefind.validate import validate_batch, print_report, drop_invalid
+        report = validate_batch(findings, kind="finding", mode=args.validate)
+        print_report(report, "findings")
+        if args.validate == "full":
+            findings, dropped = drop_invalid(findings, report)
+            if dropped:
+                print(f"[WARN] skipped {dropped} invalid findings")
     exporter = ExportManager()
     out = exporter.export_to_pdf(findings, filename=args.out, ttf_path=args.ttf, logo_path=args.logo)
     print(f"[OK] PDF report created at: {os.path.abspath(out)}")
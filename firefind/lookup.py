@@ -0,0 +1,337 @@
+# firefind/lookup.py
+# First-match packet lookup over an ordered v0.1 policy:
+# "which rule handles src X -> dst Y on tcp/443?" without walking the rules in order.
+#
+#   python -m firefind.cli lookup results/normalized.jsonl --src 10.1.2.3 --dst 192.168.1.5 --proto tcp --port 443
+#
+#   policy = PolicyLookup(rules)
+#   policy.first_match("10.1.2.3", "192.168.1.5", "tcp", 443)  -> rule dict or None
+#
+# Rule order lives in bitsets (Python ints, bit i = i-th enabled rule). Each dimension
+# answers "which rules accept this value":
+#   addresses: any-rules | rules naming the object | rules with a network containing the
+#              address (one dict hit per prefix length in use; a-b ranges are split into
+#              CIDRs at build time). src_nets/dst_nets are used when an address book was.
+#   services:  any-rules | rules taking the whole protocol (icmp, tcp without ports) |
+#              rules with a port block containing the port (each port range is split into
+#              aligned power-of-two blocks: one dict hit per block size in use)
+# The answer is the lowest set bit of src & dst & service. Disabled rules are left out.
+# Per key the rules are kept sparse (sorted positions) unless they are dense enough that a
+# bitset is no bigger (_Postings), so memory follows the rule x key pairs, not keys x rules.
+# matches() ANDs the two address sides first and checks the few rules left against sparse
+# port lists. Build cost is linear in the rules (mostly address parsing): about 6 s and
+# 100 MB for 50k rules with random hosts, /24s and port ranges; queries take ~35 us.
+# A query address that is an object name matches rules using that name (or any);
+# an IP matches rules by network, so name-only rules need an address book for IP queries.
+
+from __future__ import annotations
+
+import argparse
+import ipaddress
+import json
+import os
+import sys
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from firefind.cidr import token_spans
+from firefind.normalized import coalesce_intervals
+
+_ANY_NAMES = ("any", "all")
+_BITS = {4: 32, 6: 128}
+PORT_MAX = 65535
+# a key's rules are kept as a bitset once they fill 1 bit in DENSE_RATIO of its span
+# (a tuple slot is 8 bytes, the position ints are shared: 1 in 64 is where sizes meet)
+DENSE_RATIO = 32
+
+
+class _Postings:
+    """
+    key -> the rules using it, stored by density: a sorted tuple of positions when
+    sparse, else a bitset shifted down to its lowest rule. A plain int per key would be
+    as wide as the key's highest rule (a /32 used only by rule 40000 = 5 KB).
+    """
+
+    def __init__(self) -> None:
+        self._lists: Dict[Any, List[int]] = {}
+        self.sparse: Dict[Any, Tuple[int, ...]] = {}
+        self.dense: Dict[Any, Tuple[int, int]] = {}  # key -> (base, bits >> base)
+
+    def add(self, key: Any, pos: int) -> None:
+        self._lists.setdefault(key, []).append(pos)
+
+    def finish(self) -> None:
+        for key, positions in self._lists.items():
+            positions = sorted(set(positions))
+            base = positions[0]
+            if len(positions) * DENSE_RATIO < positions[-1] - base + 1:
+                self.sparse[key] = tuple(positions)
+            else:
+                self.dense[key] = (base, _to_bits(positions, base))
+        self._lists = {}
+
+    def collect(self, key: Any, bits: int, loose: List[Tuple[int, ...]]) -> int:
+        """OR the key's rules into `bits` (dense) or append them to `loose` (sparse)."""
+        hit = self.dense.get(key)
+        if hit is not None:
+            return bits | (hit[1] << hit[0])
+        got = self.sparse.get(key)
+        if got is not None:
+            loose.append(got)
+        return bits
+
+
+def _to_bits(positions: Iterable[int], base: int = 0) -> int:
+    # bitset from positions in one pass (OR-ing 1 << p per rule would copy the int each time)
+    positions = list(positions)
+    if not positions:
+        return 0
+    buf = bytearray(((max(positions) - base) >> 3) + 1)
+    for p in positions:
+        p -= base
+        buf[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(buf, "little")
+
+
+class _AddrBits:
+    """Postings for one address dimension (src or dst)."""
+
+    def __init__(self) -> None:
+        self.any = 0
+        self._any: List[int] = []
+        self.names = _Postings()
+        self.prefix = _Postings()  # (version, plen, network) -> rules
+        self.plens: Dict[int, List[int]] = {4: [], 6: []}
+
+    def add(self, pos: int, tokens: List[Any], nets: Optional[List[Any]]) -> None:
+        for tok in tokens:
+            t = str(tok).strip()
+            if t.lower() in _ANY_NAMES:
+                self._any.append(pos)
+            elif not token_spans(t):
+                self.names.add(t, pos)
+        for tok in (nets if nets is not None else tokens):
+            t = str(tok).strip()
+            if t.lower() in _ANY_NAMES:
+                continue
+            for ver, lo, hi in token_spans(t):
+                for plen, net in _as_prefixes(ver, lo, hi):
+                    self.prefix.add((ver, plen, net), pos)
+
+    def finish(self) -> None:
+        self.any = _to_bits(self._any)
+        self._any = []
+        self.names.finish()
+        self.prefix.finish()
+        keys = list(self.prefix.sparse) + list(self.prefix.dense)
+        for ver in self.plens:
+            self.plens[ver] = sorted({p for v, p, _ in keys if v == ver})
+
+    def query(self, addr: str) -> int:
+        bits = self.any
+        loose: List[Tuple[int, ...]] = []
+        t = str(addr).strip()
+        spans = token_spans(t)
+        if not spans:
+            bits = self.names.collect(t, bits, loose)
+        else:
+            ver, point, _ = spans[0]
+            width = _BITS[ver]
+            for plen in self.plens[ver]:
+                shift = width - plen
+                bits = self.prefix.collect((ver, plen, (point >> shift) << shift), bits, loose)
+        return bits | _to_bits(p for lst in loose for p in lst) if loose else bits
+
+
+def _positions(bits: int) -> Iterator[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def _has(positions: Tuple[int, ...], i: int) -> bool:
+    j = bisect_left(positions, i)
+    return j < len(positions) and positions[j] == i
+
+
+def _as_prefixes(ver: int, lo: int, hi: int) -> Iterator[Tuple[int, int]]:
+    # (prefix length, network) blocks covering [lo, hi] exactly
+    cls = ipaddress.IPv4Address if ver == 4 else ipaddress.IPv6Address
+    for net in ipaddress.summarize_address_range(cls(lo), cls(hi)):
+        yield net.prefixlen, int(net.network_address)
+
+
+class _PortBits:
+    """Postings for one protocol's ports: each range split into aligned power-of-two blocks."""
+
+    def __init__(self) -> None:
+        self.whole = 0  # rules taking every port of the protocol
+        self._whole: List[int] = []
+        self.blocks = _Postings()  # (block bits, first port) -> rules
+        self.sizes: List[int] = []
+
+    def add_whole(self, pos: int) -> None:
+        self._whole.append(pos)
+
+    def add(self, pos: int, lo: int, hi: int) -> None:
+        while lo <= hi:
+            size = lo & -lo if lo else PORT_MAX + 1
+            while size > hi - lo + 1:
+                size >>= 1
+            self.blocks.add((size.bit_length() - 1, lo), pos)
+            lo += size
+
+    def finish(self) -> None:
+        self.whole = _to_bits(self._whole)
+        self._whole = []
+        self.blocks.finish()
+        self.sizes = sorted({b for b, _ in list(self.blocks.sparse) + list(self.blocks.dense)})
+
+    def query(self, port: Optional[int]) -> Tuple[int, List[Tuple[int, ...]]]:
+        """(bitset, sparse position lists); the port's rules are their union."""
+        bits = self.whole
+        loose: List[Tuple[int, ...]] = []
+        if port is not None:
+            for b in self.sizes:
+                bits = self.blocks.collect((b, (port >> b) << b), bits, loose)
+        return bits, loose
+
+
+class PolicyLookup:
+    """Compiled first-match structure for one ordered list of v0.1 rules."""
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules: List[Dict[str, Any]] = []
+        self.positions: List[int] = []  # index of self.rules[i] in the input list
+        self.src, self.dst = _AddrBits(), _AddrBits()
+        self.svc_any = 0
+        self._svc_any: List[int] = []
+        self.ports: Dict[str, _PortBits] = {}
+        for pos, rule in enumerate(rules):
+            if rule.get("enabled") is False:
+                continue
+            i = len(self.rules)
+            self.rules.append(rule)
+            self.positions.append(pos)
+            self.src.add(i, list(rule.get("src_addrs") or ()), rule.get("src_nets"))
+            self.dst.add(i, list(rule.get("dst_addrs") or ()), rule.get("dst_nets"))
+            self._add_services(i, rule.get("services") or ())
+        self.src.finish()
+        self.dst.finish()
+        self.svc_any = _to_bits(self._svc_any)
+        self._svc_any = []
+        for pb in self.ports.values():
+            pb.finish()
+
+    def _add_services(self, i: int, services: Any) -> None:
+        per: Dict[str, List[Tuple[int, int]]] = {}
+        for s in services:
+            if not isinstance(s, dict):
+                continue
+            proto = str(s.get("protocol") or "").lower()
+            if proto == "any":
+                self._svc_any.append(i)
+                return
+            pb = self.ports.setdefault(proto, _PortBits())
+            ranges = []
+            for p in s.get("ports") or ():
+                try:
+                    lo, hi = int(p["from"]), int(p["to"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                ranges.append((max(0, min(lo, hi)), min(PORT_MAX, max(lo, hi))))
+            if ranges:
+                per.setdefault(proto, []).extend(ranges)
+            else:
+                pb.add_whole(i)
+        for proto, ranges in per.items():
+            for lo, hi in coalesce_intervals(ranges):
+                self.ports[proto].add(i, lo, hi)
+
+    def service_parts(self, proto: str, port: Optional[int]) -> Tuple[int, List[Tuple[int, ...]]]:
+        """Rules whose services accept proto/port, as (bitset, sparse position lists)."""
+        pb = self.ports.get(str(proto).lower())
+        if pb is None:
+            return self.svc_any, []
+        bits, loose = pb.query(port)
+        return self.svc_any | bits, loose
+
+    def service_bits(self, proto: str, port: Optional[int]) -> int:
+        """Rules whose services accept proto/port."""
+        bits, loose = self.service_parts(proto, port)
+        return bits | _to_bits(p for lst in loose for p in lst) if loose else bits
+
+    def matches(self, src: str, dst: str, proto: str = "tcp", port: Optional[int] = None) -> int:
+        """Bitset of every rule that accepts the flow (bit i = self.rules[i])."""
+        both = self.src.query(src) & self.dst.query(dst)
+        if not both:
+            return 0
+        bits, loose = self.service_parts(proto, port)
+        out = bits & both
+        if loose:
+            # the address match is usually a handful of rules: look those up in the
+            # sparse lists instead of turning the lists into a bitset
+            if bin(both).count("1") <= sum(len(lst) for lst in loose):
+                for i in _positions(both & ~out):
+                    if any(_has(lst, i) for lst in loose):
+                        out |= 1 << i
+            else:
+                out |= both & _to_bits(p for lst in loose for p in lst)
+        return out
+
+    def first_index(self, src: str, dst: str, proto: str = "tcp", port: Optional[int] = None) -> Optional[int]:
+        bits = self.matches(src, dst, proto, port)
+        return (bits & -bits).bit_length() - 1 if bits else None
+
+    def first_match(self, src: str, dst: str, proto: str = "tcp", port: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """The rule that handles the flow (first in policy order), or None = default action."""
+        i = self.first_index(src, dst, proto, port)
+        return None if i is None else self.rules[i]
+
+    def all_matches(self, src: str, dst: str, proto: str = "tcp", port: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Every rule that would accept the flow, in policy order (the first one wins)."""
+        bits = self.matches(src, dst, proto, port)
+        out = []
+        while bits:
+            low = bits & -bits
+            out.append(self.rules[low.bit_length() - 1])
+            bits ^= low
+        return out
+
+
+def _summary(rule: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: rule.get(k) for k in ("rule_id", "action", "src_addrs", "dst_addrs", "services", "name")}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from firefind.daemon import _read_rules
+
+    ap = argparse.ArgumentParser(prog="firefind lookup", description="Which rule handles a flow (first match)")
+    ap.add_argument("input", help="Normalized v0.1 rules: .jsonl/.json file or folder (in policy order)")
+    ap.add_argument("--src", required=True, help="Source address or object name")
+    ap.add_argument("--dst", required=True, help="Destination address or object name")
+    ap.add_argument("--proto", default="tcp", help="tcp | udp | icmp (default: tcp)")
+    ap.add_argument("--port", type=int, help="Destination port (tcp/udp)")
+    ap.add_argument("--all", action="store_true", help="List every matching rule, not just the first")
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"Error: input not found: {args.input}", file=sys.stderr)
+        return 2
+    policy = PolicyLookup(_read_rules(args.input))
+    if args.all:
+        hits = policy.all_matches(args.src, args.dst, args.proto, args.port)
+    else:
+        first = policy.first_match(args.src, args.dst, args.proto, args.port)
+        hits = [first] if first is not None else []
+    if not hits:
+        print("[OK] no rule matches; the flow gets the default action")
+        return 0
+    for rule in hits:
+        print(json.dumps(_summary(rule), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,277 @@
+# firefind/normalized.py
+# Compact in-memory form of a normalized rule (schema v0.1, see docs/schema.md).
+# A plain v0.1 dict costs a few KB once its nested lists/dicts are counted;
+# NormalizedRule keeps the same data in __slots__ with enum-coded action, interned
+# strings, and services as one coalesced interval set per protocol. Identical
+# service sets and raw-key layouts are shared across rules (exports repeat them).
+# raw is kept as (shared key tuple, value tuple) instead of a dict.
+#
+# It behaves like a read-only mapping of the v0.1 keys, so code that does
+# rule.get("src_addrs") / rule["services"] / dict(rule) keeps working unchanged.
+# rule["services"] returns a cached list shared by every rule with the same
+# service set: read it, don't modify it.
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Action(IntEnum):
+    ALLOW = 0
+    DENY = 1
+    DROP = 2
+    REJECT = 3
+    OTHER = 4
+
+
+class Protocol(IntEnum):
+    ANY = 0
+    TCP = 1
+    UDP = 2
+    ICMP = 3
+
+
+# string <-> enum tables (schema values are lowercase)
+_ACTION_BY_NAME = {a.name.lower(): a for a in Action}
+_PROTO_BY_NAME = {p.name.lower(): p for p in Protocol}
+_ACTION_NAMES = {a: a.name.lower() for a in Action}
+_PROTO_NAMES = {p: p.name.lower() for p in Protocol}
+
+Interval = Tuple[int, int]
+Service = Tuple[Protocol, Tuple[Interval, ...]]
+
+# key order matches v01.to_v01 so round-tripped JSON diffs cleanly
+V01_KEYS = (
+    "rule_id", "vendor", "enabled", "action",
+    "src_addrs", "dst_addrs", "services", "raw",
+    "name", "comments",
+)
+# optional keys written by to_v01 when an address book is used
+OPTIONAL_KEYS = ("src_nets", "dst_nets")
+
+
+def coalesce_intervals(intervals: Iterable[Interval]) -> Tuple[Interval, ...]:
+    """
+    Sort and merge overlapping/adjacent (lo, hi) intervals.
+    Example: [(80, 80), (79, 79), (100, 200), (150, 300)] -> ((79, 80), (100, 300))
+    """
+    out: List[List[int]] = []
+    for lo, hi in sorted(intervals):
+        if out and lo <= out[-1][1] + 1:
+            if hi > out[-1][1]:
+                out[-1][1] = hi
+        else:
+            out.append([lo, hi])
+    return tuple((lo, hi) for lo, hi in out)
+
+
+# action -> what it does to the packet (drop and reject block like deny)
+ACTION_CLASS = {"allow": "allow", "accept": "allow", "permit": "allow",
+                "deny": "deny", "drop": "deny", "reject": "deny"}
+
+
+def action_class(action: Any) -> str:
+    """Lowercased action folded to allow / deny; unknown actions stay as they are."""
+    act = str(action or "").strip().lower()
+    return ACTION_CLASS.get(act, act)
+
+
+def addr_key(tokens: Iterable[Any]) -> Tuple[str, ...]:
+    """
+    Order-free form of an address list, for hashing rules:
+    sorted, de-duplicated, "any"/"all" in any case -> "any".
+    """
+    out = set()
+    for t in tokens or ():
+        s = str(t).strip()
+        out.add("any" if s.lower() in ("any", "all") else s)
+    return tuple(sorted(out))
+
+
+def service_key(services: Iterable[Any]) -> Tuple[Tuple[str, Tuple[Interval, ...]], ...]:
+    """
+    Order-free form of a v0.1 services list: (protocol, coalesced port intervals)
+    per protocol, sorted. "any" anywhere -> (("any", ()),); tcp/udp without ports
+    -> the whole 0-65535 range; icmp -> no intervals.
+    """
+    per: Dict[str, List[Interval]] = {}
+    for s in services or ():
+        if not isinstance(s, Mapping):
+            continue
+        proto = str(s.get("protocol") or "").lower()
+        if proto == "any":
+            return (("any", ()),)
+        ranges = per.setdefault(proto, [])
+        if proto in ("tcp", "udp"):
+            got = []
+            for p in s.get("ports") or ():
+                try:
+                    lo, hi = int(p["from"]), int(p["to"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                got.append((min(lo, hi), max(lo, hi)))
+            ranges.extend(got or [(0, 65535)])
+    return tuple(sorted((p, coalesce_intervals(r)) for p, r in per.items()))
+
+
+def _intern_all(items: Iterable[Any]) -> Tuple[str, ...]:
+    # object names repeat across thousands of rules; share one copy of each
+    return tuple(sys.intern(str(x)) for x in items)
+
+
+# one shared copy of each distinct service set / raw key layout
+_SERVICE_SETS: Dict[Tuple[Service, ...], Tuple[Service, ...]] = {}
+_RAW_KEYS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _compile_services(rule_id: Any, services: Iterable[Any]) -> Tuple[Service, ...]:
+    # v0.1 services -> ((protocol, coalesced intervals), ...) in first-seen protocol order
+    per: Dict[Protocol, List[Interval]] = {}
+    for s in services or []:
+        proto = str(s.get("protocol", "")).lower()
+        if proto not in _PROTO_BY_NAME:
+            raise ValueError(f"Rule {rule_id!r} has invalid protocol {s.get('protocol')!r}")
+        per.setdefault(_PROTO_BY_NAME[proto], []).extend(
+            (int(p["from"]), int(p["to"])) for p in (s.get("ports") or []))
+    key = tuple((p, coalesce_intervals(r)) for p, r in per.items())
+    return _SERVICE_SETS.setdefault(key, key)
+
+
+@lru_cache(maxsize=4096)
+def _services_view(services: Tuple[Service, ...]) -> List[Dict[str, Any]]:
+    return [{"protocol": _PROTO_NAMES[p], "ports": [{"from": lo, "to": hi} for lo, hi in ports]}
+            for p, ports in services]
+
+
+def _compact_raw(raw: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[Any, ...]]:
+    keys = tuple(sys.intern(str(k)) for k in raw)
+    # raw repeats the vendor, rule_id and single-object src/dst: interning shares those copies
+    values = tuple(sys.intern(v) if isinstance(v, str) else v for v in raw.values())
+    return _RAW_KEYS.setdefault(keys, keys), values
+
+
+class NormalizedRule(Mapping):
+    """
+    Slotted v0.1 rule. Build with NormalizedRule.from_v01(dict) and turn back
+    with .to_v01(). The round trip is lossless for schema-conformant rows except
+    that each protocol's ports come back as one sorted, coalesced list.
+    """
+
+    __slots__ = (
+        "rule_id", "vendor", "enabled", "action",
+        "src_addrs", "dst_addrs", "services", "raw",
+        "name", "comments", "src_nets", "dst_nets", "extra",
+    )
+
+    def __init__(
+        self,
+        rule_id: str,
+        vendor: str,
+        enabled: bool,
+        action: Action,
+        src_addrs: Tuple[str, ...],
+        dst_addrs: Tuple[str, ...],
+        services: Tuple[Service, ...],
+        raw: Tuple[Tuple[str, ...], Tuple[Any, ...]],
+        name: Optional[str] = None,
+        comments: Optional[str] = None,
+        src_nets: Optional[Tuple[str, ...]] = None,
+        dst_nets: Optional[Tuple[str, ...]] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.rule_id = rule_id
+        self.vendor = vendor
+        self.enabled = enabled
+        self.action = action
+        self.src_addrs = src_addrs
+        self.dst_addrs = dst_addrs
+        self.services = services  # ((protocol, coalesced intervals), ...), one entry per protocol
+        self.raw = raw  # (keys, values); rule["raw"] rebuilds the dict
+        self.name = name
+        self.comments = comments
+        self.src_nets = src_nets  # resolved networks (None when no address book was used)
+        self.dst_nets = dst_nets
+        self.extra = extra  # keys outside the v0.1 set, kept for round-trip
+
+    #  conversion
+
+    @classmethod
+    def from_v01(cls, d: Dict[str, Any]) -> "NormalizedRule":
+        """
+        Build from a v0.1 dict. Raises ValueError on an action or protocol
+        outside the schema (better to fail here than silently miss later).
+        """
+        act = str(d.get("action", "")).lower()
+        if act not in _ACTION_BY_NAME:
+            raise ValueError(f"Rule {d.get('rule_id', '')!r} has invalid action {d.get('action')!r}")
+
+        extra = {k: v for k, v in d.items() if k not in V01_KEYS and k not in OPTIONAL_KEYS} or None
+        src_nets, dst_nets = d.get("src_nets"), d.get("dst_nets")
+
+        return cls(
+            rule_id=sys.intern(str(d.get("rule_id", ""))),
+            vendor=sys.intern(str(d.get("vendor", ""))),
+            enabled=bool(d.get("enabled", True)),
+            action=_ACTION_BY_NAME[act],
+            src_addrs=_intern_all(d.get("src_addrs") or []),
+            dst_addrs=_intern_all(d.get("dst_addrs") or []),
+            services=_compile_services(d.get("rule_id", ""), d.get("services")),
+            raw=_compact_raw(d.get("raw") if isinstance(d.get("raw"), dict) else {}),
+            name=d.get("name"),
+            comments=sys.intern(d["comments"]) if isinstance(d.get("comments"), str) else d.get("comments"),
+            src_nets=None if src_nets is None else _intern_all(src_nets),
+            dst_nets=None if dst_nets is None else _intern_all(dst_nets),
+            extra=extra,
+        )
+
+    def to_v01(self) -> Dict[str, Any]:
+        """Return a plain v0.1 dict (same shape as v01.to_v01 output)."""
+        return {k: self[k] for k in self}
+
+    #  helpers for engine code
+
+    @property
+    def action_name(self) -> str:
+        return _ACTION_NAMES[self.action]
+
+    def port_intervals(self, proto: Protocol) -> Tuple[Interval, ...]:
+        """Merged port intervals for one protocol (empty tuple if none)."""
+        return next((ports for p, ports in self.services if p == proto), ())
+
+    #  mapping interface (v0.1 view)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "action":
+            return _ACTION_NAMES[self.action]
+        if key == "services":
+            return _services_view(self.services)
+        if key == "raw":
+            return dict(zip(*self.raw))
+        if key in ("src_addrs", "dst_addrs"):
+            return list(getattr(self, key))
+        if key in V01_KEYS:
+            return getattr(self, key)
+        if key in OPTIONAL_KEYS and getattr(self, key) is not None:
+            return list(getattr(self, key))
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from V01_KEYS
+        for k in OPTIONAL_KEYS:
+            if getattr(self, k) is not None:
+                yield k
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        n = len(V01_KEYS) + sum(1 for k in OPTIONAL_KEYS if getattr(self, k) is not None)
+        return n + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self) -> str:
+        return f"NormalizedRule(rule_id={self.rule_id!r}, action={self.action_name!r})"
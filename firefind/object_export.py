@@ -0,0 +1,169 @@
+# firefind/object_export.py
+# Shared reader for vendor object-table exports (service objects, address objects, groups).
+# Returns plain rows keyed by a normalized header ("Dst Port" -> "dstport"),
+# so svc_map.py / addr_book.py only deal with column-name sets.
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+from pathlib import Path
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from .csv_robust import _fix_cell, _fix_line_shape
+
+Row = Dict[str, str]
+T = TypeVar("T")
+
+
+def norm_key(s: str) -> str:
+    # same idea as one._nk: keep a-z0-9 only
+    return re.sub(r"[^a-z0-9]+", "", str(s or "").strip().lower())
+
+
+def _rows_from_cells(cells: List[List[str]], wanted: Iterable[str]) -> List[Row]:
+    """
+    Pick the first row that contains one of the `wanted` headers as the header
+    row (exports often start with banner lines), then key the rest by it.
+    """
+    wanted = set(wanted)
+    for i, row in enumerate(cells[:30]):
+        keys = [norm_key(c) for c in row]
+        if wanted & set(keys):
+            out = []
+            for r in cells[i + 1:]:
+                rec = {k: (str(r[j]).strip() if j < len(r) and r[j] is not None else "")
+                       for j, k in enumerate(keys) if k}
+                if any(rec.values()):
+                    out.append(rec)
+            return out
+    return []
+
+
+def read_object_rows(path: Path, wanted: Iterable[str]) -> List[Row]:
+    """Read a CSV or XLSX object export into header-keyed rows."""
+    suffix = path.suffix.lower()
+    if suffix in {".xlsx", ".xlsm"}:
+        from openpyxl import load_workbook
+        wb = load_workbook(str(path), read_only=True, data_only=True)
+        try:
+            cells = [["" if c is None else str(c) for c in row]
+                     for row in wb.worksheets[0].iter_rows(values_only=True)]
+        finally:
+            wb.close()
+    else:
+        text = path.read_text(encoding="utf-8-sig", errors="ignore")
+        rows = [r for r in csv.reader(io.StringIO(text)) if any(c.strip() for c in r)]
+        if rows and len(rows[0]) == 1 and rows[0][0].count(",") >= 1:
+            # whole line wrapped in quotes + trailing commas (see csv_robust.py)
+            lines = [_fix_line_shape(l) for l in text.splitlines()]
+            rows = list(csv.reader([l for l in lines if l]))
+        cells = [[_fix_cell(c) for c in row] for row in rows]
+    return _rows_from_cells(cells, wanted)
+
+
+def pick(row: Row, names: Iterable[str]) -> Optional[str]:
+    """First non-empty value among the candidate column names."""
+    for n in names:
+        v = row.get(n)
+        if v:
+            return v
+    return None
+
+
+def flatten_groups(
+    defs: Dict[str, List[Any]],
+    expand_leaf: Callable[[Any], Iterable[T]],
+    label: str,
+) -> Dict[str, Tuple[T, ...]]:
+    """
+    Resolve every object/group name (lowercase keys of `defs`) to its flat,
+    de-duplicated members. A member that names another entry is expanded
+    recursively; anything else goes through expand_leaf.
+    Each name is resolved once. Groups that reference each other in a cycle
+    (A -> B -> A) are one strongly connected component (Tarjan): the cycle is
+    reported on stderr and every group in it gets the members of the whole cycle,
+    whatever order the definitions come in.
+    """
+    done: Dict[str, Tuple[T, ...]] = {}
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: set = set()
+
+    def refs(name: str) -> Iterator[Tuple[Any, Optional[str]]]:
+        for spec in defs.get(name, []):
+            ref = spec.strip().lower() if isinstance(spec, str) else None
+            yield spec, (ref if ref in defs else None)
+
+    def visit(root: str) -> None:
+        # iterative Tarjan: generated exports nest groups deeper than Python's recursion limit
+        work: List[Tuple[str, Iterator[Tuple[Any, Optional[str]]]]] = []
+
+        def enter(name: str) -> None:
+            index[name] = low[name] = len(index)
+            stack.append(name)
+            on_stack.add(name)
+            work.append((name, refs(name)))
+
+        enter(root)
+        while work:
+            name, it = work[-1]
+            for _, ref in it:
+                if ref is None:
+                    continue
+                if ref not in index:
+                    enter(ref)  # resume `name` after `ref` is finished
+                    break
+                if ref in on_stack:
+                    low[name] = min(low[name], index[ref])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[name])
+                if low[name] == index[name]:
+                    close(name)
+
+    def close(name: str) -> None:
+        component: List[str] = []
+        while True:
+            member = stack.pop()
+            on_stack.discard(member)
+            component.append(member)
+            if member == name:
+                break
+        scc = set(component)
+        if len(component) > 1 or any(ref == name for _, ref in refs(name)):
+            names = ", ".join(repr(n) for n in sorted(scc))
+            print(f"Warning: {label} group cycle through {names}; each gets the members of the whole cycle",
+                  file=sys.stderr)
+        for member in component:
+            done[member] = _expand(member, scc)
+
+    def _expand(name: str, scc: set) -> Tuple[T, ...]:
+        # groups outside the component are already in `done`; inside it, each is walked once
+        acc: Dict[T, None] = {}  # ordered set
+        seen = {name}
+        todo = [name]
+        for group in todo:  # grows while walked (breadth-first)
+            for spec, ref in refs(group):
+                if ref is None:
+                    items: Iterable[T] = expand_leaf(spec)
+                elif ref in scc:
+                    if ref not in seen:
+                        seen.add(ref)
+                        todo.append(ref)
+                    continue
+                else:
+                    items = done[ref]
+                for it in items:
+                    acc[it] = None
+        return tuple(acc)
+
+    for name in defs:
+        if name not in index:
+            visit(name)
+    return {name: done[name] for name in defs}
@@ -22,6 +22,8 @@ from typing import Optional, Dict, Any, List, Iterable, Tuple
 
 import pandas as pd
 from .v01 import to_v01
+from .svc_map import load_svc_map as _load_svc_map
+from .addr_book import load_addr_book as _load_addr_book
 
 # small utils
 
@@ -45,23 +47,31 @@ def write_flat_csv(rows: List[dict], path: Path) -> None:
             out = {k: r.get(k, "") for k in cols}
             w.writerow(out)
 
-     #we will use if we end up dealing with multiple vendors this is will help instead of hardcoding
-     #hundreds of more regexes into v01
-"""""
 def load_svc_map(path: Optional[str]) -> Optional[Dict[str, Any]]:
-    # optional: user can pass a JSON map for vendor service names -> proto/ports
+    # optional: customer service objects/groups (JSON map or vendor CSV/XLSX export),
+    # compiled + cached by firefind.svc_map so lookups in to_v01 are plain dict hits
     if not path: return None
-    p = Path(path)
-    if not p.is_file():
-        print(f"Warning: --svc-map not found: {p}", file=sys.stderr)
+    try:
+        return _load_svc_map(path)
+    except FileNotFoundError:
+        print(f"Warning: --svc-map not found: {path}", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Warning: bad --svc-map: {e}", file=sys.stderr)
         return None
+
+def load_addr_book(paths: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    # optional: address objects + groups (JSON or vendor CSV/XLSX exports), nested groups
+    # expanded once by firefind.addr_book; to_v01 then adds src_nets/dst_nets per rule
+    if not paths: return None
     try:
-        data = json.loads(p.read_text(encoding="utf-8"))
-        return data if isinstance(data, dict) else None
+        return _load_addr_book(paths)
+    except FileNotFoundError as e:
+        print(f"Warning: --addr-book {e}", file=sys.stderr)
+        return None
     except Exception as e:
-        print(f"Warning: bad --svc-map JSON: {e}", file=sys.stderr)
+        print(f"Warning: bad --addr-book: {e}", file=sys.stderr)
         return None
-       """
 
 # vendor detection (file-level)
 VENDOR_PATTERNS = [
@@ -376,7 +386,9 @@ def main() -> int:
     ap.add_argument("--auto", action="store_true", help="Try sheets/combos and pick the best")
     ap.add_argument("--dump-sheet", default=None, help="Dump raw first 50 rows of the given sheet to CSV")
     ap.add_argument("--json-v01", action="store_true", help="Also write normalized v0.1 JSONL")
-    ap.add_argument("--svc-map", default=None, help="JSON mapping of service object names -> services")
+    ap.add_argument("--svc-map", default=None, help="Service objects/groups: JSON map or vendor CSV/XLSX export")
+    ap.add_argument("--addr-book", action="append", default=None,
+                    help="Address objects/groups: JSON or vendor CSV/XLSX export (repeat for several tables)")
     args = ap.parse_args()
 
     in_file = Path(args.input)
@@ -433,11 +445,15 @@ def main() -> int:
         if not vendor_hint and isinstance(chosen_sheet, str) and "firewall policy" in chosen_sheet.lower():
             vendor_hint = "checkpoint"
 
-        # if future svc_map is needed uncomment line below
-        '''svc_map = load_svc_map(args.svc_map)'''
+        svc_map = load_svc_map(args.svc_map)
+        if svc_map:
+            print(f"Service map: {len(svc_map)} objects from {args.svc_map}")
+        addr_book = load_addr_book(args.addr_book)
+        if addr_book is not None:
+            print(f"Address book: {len(addr_book)} objects from {', '.join(args.addr_book)}")
         with v01_path.open("w", encoding="utf-8") as f:
             for r in rules:
-                f.write(json_dumps(to_v01(r, vendor_hint)) + "\n")
+                f.write(json_dumps(to_v01(r, vendor_hint, svc_map, addr_book)) + "\n")
         print(f"✓ Wrote: {v01_path.resolve()}")
 
 
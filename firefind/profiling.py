@@ -0,0 +1,201 @@
+# firefind/profiling.py
+# Per-check / per-condition profile of an engine run (run_engine(profile={})).
+#
+# attach() swaps every compiled condition of the loaded checks for a counting copy:
+#   evals      real evaluations (a shared node's memo hits are not counted again)
+#   matches    evaluations that were true
+#   time_s     wall time inside the condition, children included
+#   avg_depth  all/any only: children evaluated before it short-circuited (width = all of them)
+# and every check's match() for the same numbers per check. detach() puts the original
+# closures back. Nothing is wrapped when profiling is off, so a normal run executes
+# exactly the same code as before.
+# The numbers include the calibration pass (selectivity.py) on the first rows; with the
+# rule index on, a check is only evaluated on the rules its guards let through.
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from firefind.rules_loader import CondNode, _memoize
+
+Counter4 = List[float]  # [evals, matches, seconds, children evaluated]
+
+# rows shown per table by print_profile
+TOP = 5
+
+
+class Profiler:
+    """Counters for one set of loaded checks; attach() before the run, report() after."""
+
+    def __init__(self) -> None:
+        self.nodes: List[Tuple[CondNode, Counter4]] = []
+        self.checks: List[Tuple[Dict[str, Any], Counter4]] = []
+        self.used_by: Dict[int, List[str]] = {}
+        self._saved_fn: List[Tuple[CondNode, Callable]] = []
+        self._saved_match: List[Tuple[Dict[str, Any], Callable]] = []
+        self._t0 = 0.0
+
+    def attach(self, checks: List[Dict[str, Any]]) -> None:
+        seen: Dict[int, CondNode] = {}
+        for chk in checks:
+            node = chk.get("node")
+            for n in (node.walk() if node is not None else ()):
+                ids = self.used_by.setdefault(id(n), [])
+                if chk.get("id") not in ids:
+                    ids.append(chk.get("id"))
+                seen.setdefault(id(n), n)
+
+        for n in seen.values():
+            if n.kind == "const":
+                continue
+            c: Counter4 = [0, 0, 0.0, 0]
+            self._saved_fn.append((n, n.fn))
+            memoized = getattr(n.fn, "__wrapped__", None) is not None
+            inner = n.fn.__wrapped__ if memoized else n.fn
+            if n.kind == "all":
+                fn = _profiled_all(n.fns, c)
+            elif n.kind == "any":
+                fn = _profiled_any(n.fns, c)
+            else:
+                fn = _profiled_leaf(inner, c)
+            n.fn = _memoize(fn) if memoized else fn
+            self.nodes.append((n, c))
+        # parents loop over fns lists; point them at the counting closures
+        for n in seen.values():
+            if n.children:
+                n.fns[:] = [ch.fn for ch in n.children]
+
+        for chk in checks:
+            node = chk.get("node")
+            if node is None or "match" not in chk:
+                continue
+            c = [0, 0, 0.0, 0]
+            self._saved_match.append((chk, chk["match"]))
+            chk["match"] = _profiled_match(node, chk.get("rationale", ""), c)
+            self.checks.append((chk, c))
+        self._t0 = time.perf_counter()
+
+    def detach(self) -> None:
+        """Put the original closures back (children keep any new order)."""
+        for n, fn in self._saved_fn:
+            n.fn = fn
+        for n, _ in self._saved_fn:
+            if n.children:
+                n.fns[:] = [ch.fn for ch in n.children]
+        for chk, match in self._saved_match:
+            chk["match"] = match
+        self._saved_fn, self._saved_match = [], []
+
+    def report(self, rules: Optional[int] = None) -> Dict[str, Any]:
+        """JSON-ready profile; both lists sorted by time, slowest first."""
+        checks = [dict(_numbers(c, chk["node"]), id=chk.get("id", ""), severity=chk.get("severity", ""))
+                  for chk, c in self.checks]
+        conds = []
+        for n, c in self.nodes:
+            item = dict(_numbers(c, n), kind=n.kind, key=n.key, checks=self.used_by.get(id(n), []))
+            if n.kind == "leaf":
+                item["cond"] = n.cond
+            conds.append(item)
+        return {
+            "rules": rules,
+            "wall_s": round(time.perf_counter() - self._t0, 6),
+            "checks": sorted(checks, key=lambda x: -x["time_s"]),
+            "conditions": sorted(conds, key=lambda x: -x["time_s"]),
+        }
+
+
+def _numbers(c: Counter4, node: CondNode) -> Dict[str, Any]:
+    evals = int(c[0])
+    out: Dict[str, Any] = {"evals": evals, "matches": int(c[1]), "time_s": round(c[2], 6),
+                           "us_per_eval": round(c[2] * 1e6 / evals, 3) if evals else 0.0}
+    if node.kind in ("all", "any"):
+        out["width"] = len(node.children)
+        out["avg_depth"] = round(c[3] / evals, 3) if evals else 0.0
+    return out
+
+
+def _profiled_leaf(fn: Callable[[Dict[str, Any]], bool], c: Counter4) -> Callable[[Dict[str, Any]], bool]:
+    clock = time.perf_counter
+
+    def leaf(row: Dict[str, Any]) -> bool:
+        t0 = clock()
+        v = fn(row)
+        c[2] += clock() - t0
+        c[0] += 1
+        if v:
+            c[1] += 1
+        return v
+    return leaf
+
+
+def _profiled_all(fns: List[Callable], c: Counter4) -> Callable[[Dict[str, Any]], bool]:
+    # loops over the node's own fns list, like rules_loader._compile_all (reorder still works)
+    clock = time.perf_counter
+
+    def all_(row: Dict[str, Any]) -> bool:
+        t0 = clock()
+        depth, v = 0, True
+        for fn in fns:
+            depth += 1
+            if not fn(row):
+                v = False
+                break
+        c[2] += clock() - t0
+        c[0] += 1
+        c[3] += depth
+        if v:
+            c[1] += 1
+        return v
+    return all_
+
+
+def _profiled_any(fns: List[Callable], c: Counter4) -> Callable[[Dict[str, Any]], bool]:
+    clock = time.perf_counter
+
+    def any_(row: Dict[str, Any]) -> bool:
+        t0 = clock()
+        depth, v = 0, False
+        for fn in fns:
+            depth += 1
+            if fn(row):
+                v = True
+                break
+        c[2] += clock() - t0
+        c[0] += 1
+        c[3] += depth
+        if v:
+            c[1] += 1
+        return v
+    return any_
+
+
+def _profiled_match(node: CondNode, rationale: str, c: Counter4) -> Callable[[Dict[str, Any]], Tuple[bool, str]]:
+    # same contract as rules_loader._matcher; reads node.fn per call (the counting closure)
+    clock = time.perf_counter
+
+    def match(row: Dict[str, Any]) -> Tuple[bool, str]:
+        t0 = clock()
+        v = node.fn(row)
+        c[2] += clock() - t0
+        c[0] += 1
+        if v:
+            c[1] += 1
+            return True, rationale
+        return False, ""
+    return match
+
+
+def print_profile(report: Dict[str, Any], top: int = TOP) -> None:
+    """Slowest checks and conditions, one line each."""
+    print(f"Profile: {report.get('rules')} rules, {report['wall_s']:.3f}s wall")
+    print("Slowest checks:")
+    for item in report["checks"][:top]:
+        print(f"  {item['id']}: {item['time_s']:.4f}s, {item['evals']} evals, "
+              f"{item['matches']} matches, {item['us_per_eval']}us/eval")
+    print("Slowest conditions:")
+    for item in report["conditions"][:top]:
+        depth = f", depth {item['avg_depth']}/{item['width']}" if "width" in item else ""
+        key = item["key"] if len(item["key"]) <= 70 else item["key"][:67] + "..."
+        print(f"  {key}: {item['time_s']:.4f}s, {item['evals']} evals, {item['matches']} matches{depth}"
+              f" [{', '.join(item['checks'][:3])}{', ...' if len(item['checks']) > 3 else ''}]")
@@ -0,0 +1,77 @@
+# firefind/reciprocal.py
+# Mirror-image rules for the `builtin: reciprocal` condition.
+#
+# A rule is reciprocal when another rule with the same action allows the opposite
+# direction on the same service: A -> B plus B -> A. That needs the whole policy, so
+# it is a pre-pass: every rule is hashed on its (src, dst, service, action) signature
+# once, and each rule probes with (dst, src, service, action). Linear in the number of rules.
+# The engine stores the partner rule_ids on the enriched row as `reciprocal_of`;
+# the builtin is true when that list is non-empty.
+# Rules whose src and dst are the same list are their own mirror and are skipped.
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from firefind.normalized import addr_key, service_key
+
+Signature = Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[Any, ...], str]
+
+# enriched row field (set by annotate)
+FIELD = "reciprocal_of"
+KEY_MEMO_SIZE = 1 << 16
+
+
+def signature(rule: Dict[str, Any]) -> Signature:
+    """(src, dst, services, action) in order-free form (see normalized.addr_key / service_key)."""
+    services = tuple(
+        (s.get("protocol"), tuple((p.get("from"), p.get("to")) for p in s.get("ports") or ()))
+        if isinstance(s, dict) else None
+        for s in rule.get("services") or ())
+    return (_addr_key(tuple(rule.get("src_addrs") or ())), _addr_key(tuple(rule.get("dst_addrs") or ())),
+            _service_key(services), str(rule.get("action") or "").lower())
+
+
+# exports repeat the same address lists and services on thousands of rules
+@lru_cache(maxsize=KEY_MEMO_SIZE)
+def _addr_key(tokens: Tuple[Any, ...]) -> Tuple[str, ...]:
+    return addr_key(tokens)
+
+
+@lru_cache(maxsize=KEY_MEMO_SIZE)
+def _service_key(services: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    return service_key({"protocol": proto, "ports": [{"from": lo, "to": hi} for lo, hi in ports]}
+                       for proto, ports in (s for s in services if s is not None))
+
+
+def reciprocal_partners(rules: Sequence[Dict[str, Any]]) -> List[List[str]]:
+    """
+    For every rule (same order): rule_ids of the rules going the other way on the
+    same service with the same action. One hash build + one probe per rule.
+    """
+    sigs = [signature(r) for r in rules]
+    by_sig: Dict[Signature, List[str]] = {}
+    for rule, sig in zip(rules, sigs):
+        if sig[0] and sig[1]:
+            by_sig.setdefault(sig, []).append(str(rule.get("rule_id", "")))
+    return [[] if src == dst else by_sig.get((dst, src, svc, action), [])
+            for src, dst, svc, action in sigs]
+
+
+def annotate(rows: List[Dict[str, Any]], partners: Sequence[List[str]]) -> None:
+    """Set row[FIELD] on enriched rows (partners[i] belongs to rows[i])."""
+    for row, ids in zip(rows, partners):
+        row[FIELD] = ids
+
+
+def uses_reciprocal(checks: Iterable[Dict[str, Any]]) -> bool:
+    """Does any compiled check contain a `builtin: reciprocal` leaf?"""
+    for chk in checks:
+        node = chk.get("node")
+        if node is None:
+            continue
+        for n in node.walk():
+            if isinstance(n.cond, dict) and n.cond.get("builtin") == "reciprocal":
+                return True
+    return False
@@ -0,0 +1,248 @@
+# firefind/replay.py
+# Replay observed flows (CSV or JSONL flow logs) against an ordered policy:
+# per-rule hit counts, rules that never matched, flows that fell through to the
+# default action.
+#
+#   python -m firefind.replay results/normalized.jsonl flows.csv -o results/replay
+#
+# Flow columns (first name present wins, case-insensitive):
+#   src:   src, src_ip, source, srcaddr        dst:  dst, dst_ip, destination, dstaddr
+#   proto: proto, protocol (tcp/udp/icmp or 6/17/1; default tcp)
+#   port:  port, dst_port, dport, dstport (empty for icmp)
+#   count: count, packets, hits (optional: one row = that many flows)
+#
+# A CSV needs a src and a dst column (ValueError otherwise); JSONL lines that are not
+# objects and rows without src/dst are skipped.
+#
+# Flows are read lazily and handled REPLAY_BATCH rows at a time. Inside a batch a Counter
+# folds the rows into distinct (src, dst, proto, port) tuples, each distinct src / dst /
+# service is looked up once (firefind.lookup bitsets) and each distinct tuple is ANDed
+# once. The dedupe is plain Python on purpose: rows come out of csv/json as Python
+# objects, so numpy would first need a Python pass per row to encode the columns, and
+# that pass alone costs more than the Counter (numpy.unique over dict-encoded columns
+# measured ~1.5x slower on a repetitive 1M-flow log; on mostly distinct logs the
+# big-int ANDs dominate either way).
+#
+# The hit counts go into raw.hit_count (with_hit_counts), which make_finding already
+# reports as evidence.hit_count; unused_findings() reports the rules with zero hits.
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from firefind.lookup import PolicyLookup
+from firefind.risk_engine import make_finding
+
+Flow = Tuple[str, str, str, Optional[int]]  # (src, dst, proto, port)
+
+REPLAY_BATCH = 65536
+TOP_UNMATCHED = 20  # fall-through flows kept in the summary (the count is always exact)
+
+_COLUMNS = {
+    "src": ("src", "src_ip", "source", "srcaddr"),
+    "dst": ("dst", "dst_ip", "destination", "dstaddr"),
+    "proto": ("proto", "protocol"),
+    "port": ("port", "dst_port", "dport", "dstport"),
+    "count": ("count", "packets", "hits"),
+}
+_PROTO_NUMBERS = {"6": "tcp", "17": "udp", "1": "icmp", "58": "icmp"}
+
+UNUSED = {
+    "id": "P-UNUSED",
+    "name": "Rule never matched in replayed traffic",
+    "severity": "low",
+    "rationale": "No observed flow was handled by this rule; it may be obsolete or shadowed by earlier rules.",
+    "recommendation": "Confirm with the owner and disable the rule, then remove it after a review period.",
+    "labels": ["hygiene", "usage"],
+}
+
+
+#  reading flows
+
+def iter_flows(path: str) -> Iterator[Tuple[Flow, int]]:
+    """(flow, count) per row of a .csv or .jsonl flow log; rows without src/dst are skipped."""
+    if path.lower().endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                obj = json.loads(line) if line.strip() else None
+                if isinstance(obj, dict):
+                    row = {str(k).strip().lower(): v for k, v in obj.items()}
+                    got = _flow(*(next((row[c] for c in cols if row.get(c) not in (None, "")), None)
+                                  for cols in _COLUMNS.values()))
+                    if got is not None:
+                        yield got
+        return
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        # column positions resolved once from the header (first alias present wins)
+        idx = [next((header.index(c) for c in cols if c in header), None) for cols in _COLUMNS.values()]
+        if idx[0] is None or idx[1] is None:
+            raise ValueError(f"{path}: flow CSV needs a source and a destination column "
+                             f"(one of {', '.join(_COLUMNS['src'])} / {', '.join(_COLUMNS['dst'])})")
+        width = max((i for i in idx if i is not None), default=-1)
+        for row in reader:
+            if len(row) <= width:
+                row = row + [""] * (width + 1 - len(row))
+            got = _flow(*(row[i] if i is not None else None for i in idx))
+            if got is not None:
+                yield got
+
+
+def _flow(src: Any, dst: Any, proto: Any, port: Any, count: Any) -> Optional[Tuple[Flow, int]]:
+    if src in (None, "") or dst in (None, ""):
+        return None
+    try:
+        n = int(count) if count not in (None, "") else 1
+    except (TypeError, ValueError):
+        n = 1
+    if not isinstance(port, (str, int, float)):
+        port = None  # "" and JSON lists/objects: no usable port (and not hashable for the cache)
+    return _flow_key(str(src).strip(), str(dst).strip(), str(proto or "tcp"), port if port != "" else None), n
+
+
+@lru_cache(maxsize=1 << 16)
+def _flow_key(src: str, dst: str, proto: str, port: Any) -> Flow:
+    # flow logs repeat the same tuples; parse each distinct one once
+    p = proto.strip().lower()
+    p = _PROTO_NUMBERS.get(p, p)
+    try:
+        num = int(port) if port is not None else None
+    except (TypeError, ValueError, OverflowError):
+        num = None
+    return src, dst, p, num
+
+
+#  replay
+
+class ReplayResult:
+    """Counts of one replay; hits[i] belongs to the i-th rule of the replayed list."""
+
+    def __init__(self, n_rules: int):
+        self.hits: List[int] = [0] * n_rules
+        self.flows = 0
+        self.unmatched = 0
+        self.unmatched_flows: Counter = Counter()
+
+    def summary(self, rules: List[Dict[str, Any]], top: int = TOP_UNMATCHED) -> Dict[str, Any]:
+        # keyed by rule_id; exports can repeat an ID, its rules' hits are added up
+        hit_counts: Dict[str, int] = {}
+        for rule, n in zip(rules, self.hits):
+            if rule.get("enabled") is not False:
+                rid = str(rule.get("rule_id", ""))
+                hit_counts[rid] = hit_counts.get(rid, 0) + n
+        return {
+            "flows": self.flows,
+            "matched": self.flows - self.unmatched,
+            "default_action": self.unmatched,
+            "hit_counts": hit_counts,
+            "unused_rules": [rid for rid, n in hit_counts.items() if not n],
+            "top_default_flows": [
+                {"src": f[0], "dst": f[1], "proto": f[2], "port": f[3], "count": n}
+                for f, n in self.unmatched_flows.most_common(top)],
+        }
+
+
+def replay(
+    rules: List[Dict[str, Any]],
+    flows: Iterable[Tuple[Flow, int]],
+    batch_size: int = REPLAY_BATCH,
+    policy: Optional[PolicyLookup] = None,
+) -> ReplayResult:
+    """First-match every flow against `rules` (policy order) and count."""
+    policy = policy or PolicyLookup(rules)
+    result = ReplayResult(len(rules))
+    positions = policy.positions
+    it = iter(flows)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return result
+        # distinct flows of the batch, with their total counts
+        per_flow: Counter = Counter()
+        for flow, n in batch:
+            per_flow[flow] += n
+        src_bits = {a: policy.src.query(a) for a in {f[0] for f in per_flow}}
+        dst_bits = {a: policy.dst.query(a) for a in {f[1] for f in per_flow}}
+        svc_bits = {s: policy.service_bits(*s) for s in {(f[2], f[3]) for f in per_flow}}
+        for flow, n in per_flow.items():
+            bits = svc_bits[(flow[2], flow[3])] & src_bits[flow[0]] & dst_bits[flow[1]]
+            result.flows += n
+            if bits:
+                result.hits[positions[(bits & -bits).bit_length() - 1]] += n
+            else:
+                result.unmatched += n
+                result.unmatched_flows[flow] += n
+        # keep the fall-through sample bounded on huge logs
+        if len(result.unmatched_flows) > 50 * TOP_UNMATCHED:
+            result.unmatched_flows = Counter(dict(result.unmatched_flows.most_common(10 * TOP_UNMATCHED)))
+
+
+def with_hit_counts(rules: List[Dict[str, Any]], result: ReplayResult) -> List[Dict[str, Any]]:
+    """Copies of the rules with raw.hit_count = replayed hits (make_finding -> evidence.hit_count)."""
+    out = []
+    for rule, n in zip(rules, result.hits):
+        d = dict(rule)
+        raw = rule.get("raw")
+        d["raw"] = dict(raw if isinstance(raw, dict) else {}, hit_count=n)
+        out.append(d)
+    return out
+
+
+def unused_findings(rules: List[Dict[str, Any]], result: ReplayResult) -> List[Dict[str, Any]]:
+    """P-UNUSED findings for enabled rules no flow matched."""
+    out = []
+    for rule, n in zip(with_hit_counts(rules, result), result.hits):
+        if rule.get("enabled") is not False and not n:
+            out.append(make_finding(rule, UNUSED, f"0 of {result.flows} replayed flows matched this rule."))
+    return out
+
+
+def main() -> int:
+    from firefind.daemon import _read_rules
+
+    ap = argparse.ArgumentParser(description="FireFind flow replay (hit counts, unused rules)")
+    ap.add_argument("policy", help="Normalized v0.1 rules: .jsonl/.json file or folder (in policy order)")
+    ap.add_argument("flows", help="Flow log: .csv or .jsonl")
+    ap.add_argument("-o", "--out", default="results/replay", help="Output folder (default: results/replay)")
+    args = ap.parse_args()
+
+    for p in (args.policy, args.flows):
+        if not os.path.exists(p):
+            print(f"Error: input not found: {p}", file=sys.stderr)
+            return 2
+    rules = _read_rules(args.policy)
+    try:
+        result = replay(rules, iter_flows(args.flows))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    summary = result.summary(rules)
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "replay.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(args.out, "unused.findings.jsonl"), "w", encoding="utf-8") as f:
+        for item in unused_findings(rules, result):
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    print(f"[OK] {summary['flows']} flows: {summary['matched']} matched, "
+          f"{summary['default_action']} fell through to the default action")
+    print(f"Unused rules: {len(summary['unused_rules'])} of {len(summary['hit_counts'])}")
+    top = sorted(summary["hit_counts"].items(), key=lambda x: -x[1])[:10]
+    if top:
+        print("Top rules:", ", ".join(f"{k}={v}" for k, v in top))
+    print(f"\n✓ Replay saved to: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
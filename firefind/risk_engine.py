@@ -2,31 +2,260 @@
 # Risk Engine - applies rules.yml checks (via rules_loader) to normalized firewall rules.
 # Output = list of findings (schema defined in docs/schema_findings_v0.1.md)
 
-from typing import List, Dict, Any, Tuple
-from firefind.rules_loader import load_rules
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+from firefind.rules_loader import load_rules, enrich_rule
+from firefind.reciprocal import annotate, reciprocal_partners, uses_reciprocal
+from firefind.rule_index import RuleIndex, plan
+from firefind.selectivity import CALIBRATION_ROWS, reorder_checks
 
+# rules enriched + indexed together; bounds memory on very large rule sets
+INDEX_BATCH = 8192
+# first streaming batch (iter_engine): just enough rows to calibrate branch order,
+# small enough that the first findings show up within milliseconds
+FIRST_BATCH = CALIBRATION_ROWS
+# rules per task handed to a worker process (workers > 1)
+SHARD_SIZE = 4096
 
-def run_engine(normalized_rules: List[Dict[str, Any]], rules_path: str = "docs/rules.yml") -> List[Dict[str, Any]]:
+
+def run_engine(
+    normalized_rules: List[Dict[str, Any]],
+    rules_path: str = "docs/rules.yml",
+    optimize: bool = True,
+    use_index: bool = True,
+    workers: int = 1,
+    stats: Optional[Dict[str, Any]] = None,
+    dedupe: bool = True,
+    profile: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
     """
     Run the risk engine:
     - Load compiled checks from rules.yml
-    - Loop through normalized rules
-    - Apply predicates from the loader
+    - Loop through normalized rules, enriching each one once
+    - Apply every check's matcher to that shared enriched row
     - Build findings when matches occur
+    optimize=True reorders all/any branches by measured selectivity on the first
+    CALIBRATION_ROWS rules (see selectivity.py); findings are the same either way.
+    use_index=True indexes each batch of rules (rule_index.py) and runs a check only
+    on the rules its guards allow; findings keep the rule-then-check order.
+    workers > 1 shards the rules over a process pool (0 = one per CPU); each worker
+    loads the checks once and findings are merged back in input order.
+    Checks with `then: action: ignore` are a pre-filter: a rule they match is
+    suppressed and no other check runs on it. Pass stats={} to get the counts
+    back (see new_stats).
+    `builtin: reciprocal` checks get a pre-pass over all rules (reciprocal.py).
+    dedupe=True evaluates rules that no check can tell apart (same match key,
+    see duplicates.match_key_fn) once per batch; each still gets its own findings.
+    Pass profile={} to get per-check / per-condition counters and timings back
+    (profiling.py); a profiled run is single-process.
     Returns: list of findings (each dict follows schema_findings_v0.1.md)
     """
-    findings: List[Dict[str, Any]] = []
+    rules = normalized_rules if isinstance(normalized_rules, list) else list(normalized_rules)
+    workers = resolve_workers(workers)
+    if workers > 1 and len(rules) > SHARD_SIZE and profile is None:
+        return _run_sharded(rules, rules_path, optimize, use_index, workers, stats, dedupe)
+
+    return list(iter_engine(rules, rules_path=rules_path, optimize=optimize, use_index=use_index,
+                            stats=stats, dedupe=dedupe, profile=profile))
+
 
+def iter_engine(
+    normalized_rules: Iterable[Dict[str, Any]],
+    rules_path: str = "docs/rules.yml",
+    optimize: bool = True,
+    use_index: bool = True,
+    stats: Optional[Dict[str, Any]] = None,
+    dedupe: bool = True,
+    profile: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming form of run_engine: pulls rules from any iterable (a generator over a
+    JSONL file is fine) and yields findings as soon as their batch is done.
+    Batches start at FIRST_BATCH rules and double up to INDEX_BATCH, so the first
+    findings come out right away and memory stays bounded by one batch.
+    Same findings, same order as run_engine.
+    A `builtin: reciprocal` check needs every rule first, so the input is read into
+    memory before the first batch in that case.
+    profile={} is filled (profiling.Profiler.report) once the input is exhausted, or with
+    the batches done so far when the generator is closed early.
+    """
     # 1. Load compiled checks (predicates already built by loader)
     checks = load_rules(rules_path)
+    match_key = _match_key(checks) if dedupe else None
+    partners = None
+    if uses_reciprocal(checks):
+        normalized_rules = normalized_rules if isinstance(normalized_rules, list) else list(normalized_rules)
+        partners = reciprocal_partners(normalized_rules)
+    profiler = None
+    if profile is not None:
+        from firefind.profiling import Profiler
+        profiler = Profiler()
+        profiler.attach(checks)
+
+    # 2. Loop through every firewall rule (normalized schema v0.1), a batch at a time
+    it = iter(normalized_rules)
+    size, first, done = FIRST_BATCH, True, 0
+    try:
+        while True:
+            batch = list(islice(it, size))
+            if not batch:
+                break
+            mirrors = partners[done:done + len(batch)] if partners is not None else None
+            yield from _run_batch(checks, batch, optimize and first, use_index, stats, mirrors, match_key)
+            first, done = False, done + len(batch)
+            size = min(size * 2, INDEX_BATCH)
+    finally:
+        # also when the caller stops early (break / close()): never leave counting closures behind
+        if profiler is not None:
+            profile.update(profiler.report(rules=done))
+            profiler.detach()
+
+
+def _match_key(checks: List[Dict[str, Any]]) -> Callable[[Dict[str, Any]], Any]:
+    from firefind.duplicates import match_key_fn  # duplicates builds findings with make_finding
+    return match_key_fn(checks)
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """--workers value -> process count (0/None = every CPU, never below 1)."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def new_stats() -> Dict[str, Any]:
+    """Counters filled by the engine when a stats dict is passed in."""
+    return {"rules": 0, "suppressed": 0, "suppressed_by": {}}
+
+
+def merge_stats(into: Dict[str, Any], part: Dict[str, Any]) -> None:
+    if not into:
+        into.update(new_stats())
+    into["rules"] += part["rules"]
+    into["suppressed"] += part["suppressed"]
+    for cid, n in part["suppressed_by"].items():
+        into["suppressed_by"][cid] = into["suppressed_by"].get(cid, 0) + n
+
 
-    # 2. Loop through every firewall rule (normalized schema v0.1)
-    for rule in normalized_rules:
-        for chk in checks:
-            matched, reason = chk["predicate"](rule)
+def _run_batch(
+    checks: List[Dict[str, Any]],
+    batch: List[Dict[str, Any]],
+    calibrate: bool,
+    use_index: bool,
+    stats: Optional[Dict[str, Any]] = None,
+    mirrors: Optional[List[List[str]]] = None,
+    match_key: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> List[Dict[str, Any]]:
+    # rules with the same match key (duplicates.match_key_fn) are enriched and checked
+    # once; owner[i] = the first rule of the batch with rule i's key
+    owner = list(range(len(batch)))
+    if match_key is not None:
+        seen: Dict[Any, int] = {}
+        for i, rule in enumerate(batch):
+            key = match_key(rule)
+            if key is not None:
+                owner[i] = seen.setdefault(key, i)
+    distinct = [i for i, o in enumerate(owner) if o == i]
+
+    # enrich_rule (copy + ipaddress parsing + port flattening) runs once per rule,
+    # not once per rule x check
+    rows = [enrich_rule(batch[i]) for i in distinct]
+    if mirrors is not None:
+        annotate(rows, [mirrors[i] for i in distinct])  # reciprocal_of
+    if calibrate:
+        reorder_checks(checks, rows[:CALIBRATION_ROWS])
+
+    # suppression pre-filter: drop rules an ignore-check matches (first one wins)
+    suppressors = [c for c in checks if c.get("suppress")]
+    part = new_stats()
+    part["rules"] = len(batch)
+    suppressed_by: Dict[int, str] = {}
+    if suppressors:
+        checks = [c for c in checks if not c.get("suppress")]
+        for i, row in zip(distinct, rows):
+            for sup in suppressors:
+                if sup["match"](row)[0]:
+                    suppressed_by[i] = sup["id"]
+                    break
+        for o in owner:
+            sid = suppressed_by.get(o)
+            if sid is not None:
+                part["suppressed"] += 1
+                part["suppressed_by"][sid] = part["suppressed_by"].get(sid, 0) + 1
+    if stats is not None:
+        merge_stats(stats, part)
+
+    kept = [(i, row) for i, row in zip(distinct, rows) if i not in suppressed_by]
+    if use_index:
+        todo = plan(RuleIndex([row for _, row in kept]), checks)
+    else:
+        todo = [range(len(checks))] * len(kept)
+    hits: Dict[int, List[Tuple[Dict[str, Any], str]]] = {}
+    for (i, row), cis in zip(kept, todo):
+        for ci in cis:
+            chk = checks[ci]
+            matched, reason = chk["match"](row)
             if matched:
-                findings.append(make_finding(rule, chk, reason))
+                hits.setdefault(i, []).append((chk, reason))
+
+    findings: List[Dict[str, Any]] = []
+    for rule, o in zip(batch, owner):
+        for chk, reason in hits.get(o, ()):
+            findings.append(make_finding(rule, chk, reason))
+    return findings
+
+
+#  process pool
 
+# per-worker state, filled once by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(rules_path: str, optimize: bool, use_index: bool, dedupe: bool = True) -> None:
+    _WORKER["checks"] = load_rules(rules_path)
+    _WORKER["calibrate"] = optimize
+    _WORKER["use_index"] = use_index
+    _WORKER["match_key"] = _match_key(_WORKER["checks"]) if dedupe else None
+
+
+def _worker_shard(
+    shard: List[Dict[str, Any]], mirrors: Optional[List[List[str]]] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    checks = _WORKER["checks"]
+    calibrate = _WORKER["calibrate"]
+    _WORKER["calibrate"] = False  # first shard of each worker only
+    stats = new_stats()
+    return _run_batch(checks, shard, calibrate, _WORKER["use_index"], stats, mirrors, _WORKER["match_key"]), stats
+
+
+def _run_sharded(
+    rules: List[Dict[str, Any]],
+    rules_path: str,
+    optimize: bool,
+    use_index: bool,
+    workers: int,
+    stats: Optional[Dict[str, Any]] = None,
+    dedupe: bool = True,
+) -> List[Dict[str, Any]]:
+    # fail in the parent (clear traceback) rather than once per worker
+    if not os.path.exists(rules_path):
+        raise FileNotFoundError(f"Rules file not found: {rules_path}")
+    shards = [rules[i:i + SHARD_SIZE] for i in range(0, len(rules), SHARD_SIZE)]
+    # the reciprocal pre-pass needs every rule: it runs here, each shard gets its slice
+    mirrors = [None] * len(shards)
+    if uses_reciprocal(load_rules(rules_path)):
+        partners = reciprocal_partners(rules)
+        mirrors = [partners[i:i + SHARD_SIZE] for i in range(0, len(rules), SHARD_SIZE)]
+    findings: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_worker,
+                             initargs=(rules_path, optimize, use_index, dedupe)) as pool:
+        # map() yields results in submission order -> same order as the serial engine
+        for part, part_stats in pool.map(_worker_shard, shards, mirrors):
+            findings.extend(part)
+            if stats is not None:
+                merge_stats(stats, part_stats)
     return findings
 
 
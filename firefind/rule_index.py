@@ -0,0 +1,120 @@
+# firefind/rule_index.py
+# Per-run inverted index over enriched firewall rules, used to pick the candidate
+# rules for each check instead of testing rules x checks.
+#
+# Posting lists (positions into the batch of rows):
+#   action value -> rows          service.any / service.has_icmp -> rows
+#   port value   -> rows          src/dst address name -> rows
+# A check's guard tree (rules_loader.node_guard) is answered with set unions and
+# intersections. Guards are necessary conditions only: every candidate still runs
+# the full compiled check, so the index can narrow the work but never change a result.
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from firefind.rules_loader import FLAG_FIELDS, Guard
+
+Positions = Set[int]
+
+
+class RuleIndex:
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        self.size = len(rows)
+        self.action: Dict[Any, Positions] = {}
+        self.flags: Dict[str, Positions] = {f: set() for f in FLAG_FIELDS}
+        self.ports: Dict[int, Positions] = {}
+        self.addrs: Dict[str, Dict[Any, Positions]] = {"src_addrs": {}, "dst_addrs": {}}
+        self._memo: Dict[Guard, Positions] = {}
+
+        for i, row in enumerate(rows):
+            act = row.get("action")
+            if isinstance(act, str):
+                self.action.setdefault(act, set()).add(i)
+            svc = row.get("service")
+            if isinstance(svc, dict):
+                if svc.get("any"):
+                    self.flags["service.any"].add(i)
+                if svc.get("has_icmp"):
+                    self.flags["service.has_icmp"].add(i)
+                ports = svc.get("ports")
+                if isinstance(ports, list):
+                    for p in ports:
+                        if isinstance(p, int):
+                            self.ports.setdefault(p, set()).add(i)
+            for field, post in self.addrs.items():
+                vals = row.get(field)
+                if isinstance(vals, list):
+                    for v in vals:
+                        try:
+                            post.setdefault(v, set()).add(i)
+                        except TypeError:  # unhashable junk can't overlap a name set either
+                            pass
+        self._port_keys = sorted(self.ports)
+
+    def candidates(self, guard: Optional[Guard]) -> Optional[Positions]:
+        """Positions that can satisfy `guard`; None = every row (no guard)."""
+        if guard is None:
+            return None
+        hit = self._memo.get(guard)
+        if hit is None:
+            hit = self._memo[guard] = self._eval(guard)
+        return hit
+
+    def _eval(self, g: Guard) -> Positions:
+        kind = g[0]
+        if kind == "all":
+            parts = sorted((self.candidates(x) for x in g[1]), key=len)
+            out = set(parts[0])
+            for p in parts[1:]:
+                out &= p
+                if not out:
+                    break
+            return out
+        if kind == "any":
+            out: Positions = set()
+            for x in g[1]:
+                out |= self.candidates(x)
+            return out
+        if kind == "action":
+            return self.action.get(g[1], set())
+        if kind == "flag":
+            on = self.flags[g[1]]
+            return on if g[2] else set(range(self.size)) - on
+        if kind == "ports":
+            return _union(self.ports.get(p) for p in g[1])
+        if kind == "port_range":
+            keys = self._port_keys
+            lo, hi = bisect_left(keys, g[1]), bisect_right(keys, g[2])
+            out = _union(self.ports[k] for k in keys[lo:hi])
+            return out | self.flags["service.any"]
+        if kind == "addr":
+            post = self.addrs[g[1]]
+            return _union(post.get(v) for v in g[2])
+        raise ValueError(f"Unknown guard kind {kind!r}")
+
+
+def _union(sets) -> Positions:
+    out: Positions = set()
+    for s in sets:
+        if s:
+            out |= s
+    return out
+
+
+def plan(index: RuleIndex, checks: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    For each row of the indexed batch, the check indexes to run on it
+    (in check order, so findings come out rule-then-check as before).
+    """
+    todo: List[List[int]] = [[] for _ in range(index.size)]
+    for ci, chk in enumerate(checks):
+        cand = index.candidates(chk.get("guards"))
+        if cand is None:
+            for lst in todo:
+                lst.append(ci)
+        else:
+            for pos in cand:
+                todo[pos].append(ci)
+    return todo
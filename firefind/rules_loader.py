@@ -3,10 +3,22 @@
 # and turns each YAML rule into a real function (predicate)
 # that can be run against firewall rules.
 
+import json
 import os
 import yaml
 import ipaddress
-from typing import List, Dict, Any, Tuple, Callable
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Callable, Optional
+from firefind.cache import content_key, load_artifact, store_artifact
+from firefind.normalized import coalesce_intervals
+from firefind.cidr import IntervalIndex, address_spans, token_spans
+
+# bump when read_config's output or validation changes so cached rule sets are ignored
+RULES_CACHE_VERSION = "rules/1"
+# libyaml-backed loader when available (same safe semantics, much faster)
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 Check = Dict[str, Any]
@@ -14,25 +26,14 @@ Check = Dict[str, Any]
 
 #MAIN LOADER
 
-def load_rules(path: str = "rules.yml") -> List[Check]:
+def load_rules(path: str = "rules.yml", casefold_sets: bool = False) -> List[Check]:
     """
     Load rules.yml into memory, validate, normalize, and compile them.
     Returns a list of rules, each with a .predicate(rule) function.
+    casefold_sets=True makes every `overlaps` compare case-insensitively
+    (single conditions can opt in with `casefold: true` instead).
     """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Rules file not found: {path}")
-
-    # open the file and read yaml
-    with open(path, "r", encoding="utf-8") as f:
-        try:
-            config = yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            raise ValueError(f"YAML parsing error in {path}: {e}")
-
-    # check that file actually has "rules" key
-    if not config or "rules" not in config:
-        raise ValueError(f"Invalid config: expected top-level 'rules' key in {path}")
-
+    config = read_config(path)
     rules = config["rules"]
 
     # load port_groups and cidr_groups (reusable sets in the yaml)
@@ -40,20 +41,72 @@ def load_rules(path: str = "rules.yml") -> List[Check]:
     cidr_groups = config.get("sets", {}).get("cidr_groups", {})
     name_groups = config.get("sets", {}).get("addr_names", {})
 
-
-    # check that each rule has required fields and valid severity
-    validate_rules_schema(rules)
+    # every set_ref resolved once into frozensets (+ case-folded copies)
+    sets = SetTable(port_groups, cidr_groups, name_groups, casefold=casefold_sets)
 
     # compile each rule's "when" into a real predicate function
+    #   r["match"](row)      -> expects a row already passed through enrich_rule (engine path)
+    #   r["predicate"](rule) -> enriches first; handy for one-off tests
+    #   r["node"]            -> the compiled CondNode tree behind both
+    # sub-conditions repeated across checks share one node (and one evaluation
+    # per row) through the pool
+    pool = NodePool()
+    for r in rules:
+        r["node"] = compile_node(r["when"], sets, pool)  # root CondNode (for reordering / stats)
+    pool.finish([r["node"] for r in rules])
+
     compiled = []
     for r in rules:
-        pred = compile_predicate(r["when"], port_groups, cidr_groups, name_groups, r)
-        r["predicate"] = pred  # attach function to rule
+        r["suppress"] = isinstance(r.get("then"), dict) and r["then"].get("action") == "ignore"
+        r["guards"] = node_guard(r["node"], sets)  # candidate selection (rule_index.py)
+        r["sets"] = sets  # resolved set_refs, for engines that re-read node.cond (columnar.py)
+        r["match"] = _matcher(r["node"].fn, r.get("rationale", ""))
+        r["predicate"] = _predicate(r["match"])
         compiled.append(r)
 
     return compiled
 
 
+# `then: { action: ignore }` turns a check into a suppression rule: firewall rules it
+# matches are dropped before any other check runs (see risk_engine._run_batch)
+THEN_ACTIONS = ("ignore",)
+
+
+def read_config(path: str) -> Dict[str, Any]:
+    """
+    Parsed + validated rules.yml document (plain dicts/lists, nothing compiled yet).
+    Cached on disk (cache.py) by file content + RULES_CACHE_VERSION, so repeat runs
+    skip YAML parsing entirely. On a miss the C YAML loader is used when PyYAML
+    was built with libyaml.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Rules file not found: {path}")
+
+    with open(path, "rb") as f:
+        data = f.read()
+    key = content_key(data, RULES_CACHE_VERSION)
+    cached = load_artifact("rules", key)
+    if cached is not None:
+        return cached
+
+    # read yaml
+    try:
+        config = yaml.load(data.decode("utf-8"), Loader=_YAML_LOADER)
+    except (yaml.YAMLError, UnicodeDecodeError) as e:
+        raise ValueError(f"YAML parsing error in {path}: {e}")
+
+    # check that file actually has "rules" key
+    if not config or "rules" not in config:
+        raise ValueError(f"Invalid config: expected top-level 'rules' key in {path}")
+
+    # check that each rule has required fields and valid severity
+    validate_rules_schema(config["rules"])
+
+    # stored before compiling: load_rules adds closures to these dicts
+    store_artifact("rules", key, config)
+    return config
+
+
 def validate_rules_schema(rules: List[Dict[str, Any]]) -> None:
     """
     to make sure each rule has required fields and correct severity.
@@ -75,6 +128,15 @@ def validate_rules_schema(rules: List[Dict[str, Any]]) -> None:
         if not isinstance(r["when"], dict):
             raise ValueError(f"Rule {r['id']} has malformed 'when' block (expected dict).")
 
+        then = r.get("then")
+        if then is not None:
+            action = then.get("action") if isinstance(then, dict) else None
+            if action not in THEN_ACTIONS:
+                raise ValueError(
+                    f"Rule {r['id']} has invalid 'then' action '{action}'. "
+                    f"Allowed: {', '.join(THEN_ACTIONS)}"
+                )
+
 
 def hot_reload(path: str, last_mtime: float, cache: List[Check]) -> List[Check]:
     """
@@ -88,14 +150,144 @@ def hot_reload(path: str, last_mtime: float, cache: List[Check]) -> List[Check]:
     return cache
 
 
+#SET REFERENCES
+
+class SetTable:
+    """
+    All reusable sets from rules.yml, keyed by their set_ref name
+    ("port_groups.admin_ports", "addr_names.internet_like", ...).
+    Built once per load_rules call:
+      lists  -> the values as written (order kept; overlaps_range needs it)
+      frozen -> frozenset of the values, for single isdisjoint() overlap tests
+      folded -> case-folded frozenset, for case-insensitive overlaps
+      intervals -> merged integer intervals of each cidr_groups set (within_cidr / overlaps_cidr)
+    """
+
+    __slots__ = ("lists", "frozen", "folded", "intervals", "casefold")
+
+    def __init__(
+        self,
+        port_groups: Dict[str, List[int]],
+        cidr_groups: Dict[str, List[str]],
+        name_groups: Dict[str, List[str]],
+        casefold: bool = False,
+    ):
+        self.lists: Dict[str, List[Any]] = {}
+        self.frozen: Dict[str, frozenset] = {}
+        self.folded: Dict[str, frozenset] = {}
+        self.intervals: Dict[str, IntervalIndex] = {}
+        self.casefold = casefold  # default for overlaps without an explicit casefold key
+        for prefix, groups in (("port_groups", port_groups), ("cidr_groups", cidr_groups),
+                               ("addr_names", name_groups)):
+            for name, values in (groups or {}).items():
+                ref = f"{prefix}.{name}"
+                values = values if isinstance(values, list) else []
+                self.lists[ref] = values
+                self.frozen[ref] = _freeze(values, ref)
+                self.folded[ref] = _fold(self.frozen[ref])
+        for name, values in (cidr_groups or {}).items():
+            ref = f"cidr_groups.{name}"
+            self.intervals[ref] = IntervalIndex(self.lists[ref])
+
+    def resolve(self, value: Any) -> Any:
+        """set_ref dict -> its list (unknown names -> []); anything else unchanged."""
+        if isinstance(value, dict) and "set_ref" in value:
+            ref = str(value["set_ref"])
+            if ref.split(".", 1)[0] in ("port_groups", "cidr_groups", "addr_names"):
+                return self.lists.get(ref, [])
+        return value
+
+    def frozen_for(self, value: Any, folded: bool = False) -> frozenset:
+        """Prebuilt frozenset for a set_ref, or a fresh one for a literal list."""
+        if isinstance(value, dict) and "set_ref" in value:
+            ref = str(value["set_ref"])
+            table = self.folded if folded else self.frozen
+            if ref in table:
+                return table[ref]
+        resolved = self.resolve(value)
+        fs = _freeze(resolved if isinstance(resolved, list) else [], "value")
+        return _fold(fs) if folded else fs
+
+    def intervals_for(self, value: Any) -> IntervalIndex:
+        """Prebuilt interval index for a cidr_groups set_ref, or a fresh one for a literal list."""
+        if isinstance(value, dict) and "set_ref" in value:
+            hit = self.intervals.get(str(value["set_ref"]))
+            if hit is not None:
+                return hit
+        resolved = self.resolve(value)
+        return IntervalIndex(resolved if isinstance(resolved, list) else [])
+
+
+def _freeze(values: List[Any], where: str) -> frozenset:
+    try:
+        return frozenset(values)
+    except TypeError:
+        raise ValueError(f"Set {where} contains non-scalar values: {values!r}")
+
+
+def _fold(values: frozenset) -> frozenset:
+    return frozenset(v.casefold() if isinstance(v, str) else v for v in values)
+
+
 #PREDICATE COMPILER
+#
+# Each "when" tree is compiled once (in load_rules) into nested closures:
+# all/any become short-circuit loops over child functions, set_refs are resolved,
+# dotted field paths become pre-split getters and op strings pick the comparison
+# up front. Evaluating a rule is then only the comparisons themselves.
+
+Cond = Callable[[Dict[str, Any]], bool]
+
+
+def _false(row: Dict[str, Any]) -> bool:
+    return False
+
+
+def _true(row: Dict[str, Any]) -> bool:
+    return True
+
+
+def compile_matcher(
+    when: Dict[str, Any],
+    port_groups: Dict[str, List[int]],
+    cidr_groups: Dict[str, List[str]],
+    name_groups: Dict[str, List[str]],
+    rule_meta: Dict[str, Any],
+    sets: Optional[SetTable] = None,
+) -> Callable[[Dict[str, Any]], Tuple[bool, str]]:
+    """
+    Build match(row) for a YAML rule, where row is the output of enrich_rule().
+    The engine enriches each firewall rule once and shares the row across all checks.
+    Pass `sets` (built once by load_rules) to avoid rebuilding the set table per rule.
+    """
+    if sets is None:
+        sets = SetTable(port_groups, cidr_groups, name_groups)
+    return _matcher(compile_condition(when, sets), rule_meta.get("rationale", ""))
+
+
+def _matcher(cond: Cond, rationale: str) -> Callable[[Dict[str, Any]], Tuple[bool, str]]:
+    def match(row: Dict[str, Any]) -> Tuple[bool, str]:
+        if cond(row):
+            return True, rationale
+        return False, ""
+    return match
+
+
+def _predicate(match: Callable[[Dict[str, Any]], Tuple[bool, str]]) -> Callable[[Dict[str, Any]], Tuple[bool, str]]:
+    def predicate(rule: Dict[str, Any]) -> Tuple[bool, str]:
+        # first, compute extra fields the YAML expects (like src.any, port_span, etc.)
+        # then test the "when" block against this enriched rule
+        return match(enrich_rule(rule))
+    return predicate
+
 
 def compile_predicate(
     when: Dict[str, Any],
     port_groups: Dict[str, List[int]],
     cidr_groups: Dict[str, List[str]],
     name_groups: Dict[str, List[str]],   # ← ADD
-    rule_meta: Dict[str, Any]
+    rule_meta: Dict[str, Any],
+    sets: Optional[SetTable] = None,
 ) -> Callable[[Dict[str, Any]], Tuple[bool, str]]:
 
     """
@@ -103,13 +295,7 @@ def compile_predicate(
     This will run when we test a firewall rule against this check.
     """
 
-    def predicate(rule: Dict[str, Any]) -> Tuple[bool, str]:
-        # first, compute extra fields the YAML expects (like src.any, port_span, etc.)
-        row = enrich_rule(rule)
-        # now test the "when" block against this enriched rule
-        return eval_condition(when, row, port_groups, cidr_groups, name_groups, rule_meta)
-
-    return predicate
+    return _predicate(compile_matcher(when, port_groups, cidr_groups, name_groups, rule_meta, sets=sets))
 
 
 def eval_condition(
@@ -120,47 +306,185 @@ def eval_condition(
     name_groups: Dict[str, List[str]],
     rule_meta: Dict[str, Any]
 ) -> Tuple[bool, str]:
+    """
+    One-off evaluation of a condition (compiles it first).
+    Kept for callers/tests; the engine uses the compiled closures directly.
+    """
+    if compile_condition(cond, SetTable(port_groups, cidr_groups, name_groups))(rule):
+        return True, rule_meta.get("rationale", "")
+    return False, ""
 
-    # Always return (bool, str)
-    if not isinstance(cond, dict):
-        return False, ""
 
-    def _ensure_tuple(res):
-        if isinstance(res, tuple) and len(res) == 2 and isinstance(res[0], bool):
-            return res
-        return False, ""
+class CondNode:
+    """
+    One compiled condition. `fn(row)` evaluates it.
+    all/any nodes keep their children (and the children's fns, which is the
+    list their closure loops over) so the order can be changed in place later,
+    e.g. by firefind.selectivity. `cond` is the YAML dict it came from.
+    `key` is a canonical form of the condition: identical sub-conditions get the
+    same key, and load_rules compiles each key once (see NodePool).
+    """
 
-    # logical blocks
-    if "all" in cond:
-        subs = cond.get("all") or []
-        if not isinstance(subs, list):
-            return False, ""
-        for sub in subs:
-            matched, reason = _ensure_tuple(eval_condition(sub, rule, port_groups, cidr_groups, name_groups, rule_meta))
-            if not matched:
-                return False, ""
-        return True, rule_meta.get("rationale", "")
+    __slots__ = ("kind", "cond", "children", "fns", "fn", "key", "refs")
+
+    def __init__(self, kind: str, cond: Any, fn: Cond,
+                 children: Optional[List["CondNode"]] = None, fns: Optional[List[Cond]] = None,
+                 key: str = ""):
+        self.kind = kind            # "all" | "any" | "leaf" | "const"
+        self.cond = cond
+        self.fn = fn
+        self.children = children or []
+        self.fns = fns or []
+        self.key = key
+        self.refs = 0               # parents/checks pointing here (set by NodePool.finish)
+
+    def reorder(self, children: List["CondNode"]) -> None:
+        """Change the evaluation order of an all/any node (same children only)."""
+        if sorted(map(id, children)) != sorted(map(id, self.children)):
+            raise ValueError("reorder() must keep exactly the same children")
+        self.children[:] = children
+        self.fns[:] = [c.fn for c in children]
+
+    def walk(self):
+        """This node and every node below it (depth-first, parents first)."""
+        yield self
+        for c in self.children:
+            yield from c.walk()
 
-    if "any" in cond:
-        subs = cond.get("any") or []
+
+_FALSE_NODE = CondNode("const", None, _false, key="false")
+
+
+class NodePool:
+    """
+    Shared condition DAG for one rule set.
+    Most checks repeat the same guards (action equals allow, service.any is_false,
+    src/dst overlaps internet_like). The pool hands out one CondNode per canonical
+    key, so those guards exist once; finish() then gives every node used in more
+    than one place a one-row memo, so it is evaluated at most once per enriched row
+    no matter how many checks reach it.
+    """
+
+    def __init__(self) -> None:
+        self.nodes: Dict[str, CondNode] = {}
+        self.roots: List[CondNode] = []
+
+    def get(self, key: str, build: Callable[[], CondNode]) -> CondNode:
+        node = self.nodes.get(key)
+        if node is None:
+            node = build()
+            node.key = key
+            self.nodes[key] = node
+        return node
+
+    def finish(self, roots: List[CondNode]) -> Dict[str, int]:
+        """Count references, memoize shared nodes, return {"unique", "shared"}."""
+        self.roots = roots
+        seen: Dict[int, CondNode] = {}
+        stack = list(roots)
+        for r in roots:
+            r.refs += 1
+        while stack:
+            n = stack.pop()
+            if id(n) in seen:
+                continue
+            seen[id(n)] = n
+            for c in n.children:
+                c.refs += 1
+                stack.append(c)
+        shared = 0
+        for n in seen.values():
+            if n.refs > 1 and n.kind != "const":
+                n.fn = _memoize(n.fn)
+                shared += 1
+        # parents loop over fns lists; point them at the memoized closures
+        for n in seen.values():
+            if n.children:
+                n.fns[:] = [c.fn for c in n.children]
+        return {"unique": len(seen), "shared": shared}
+
+
+def _memoize(fn: Cond) -> Cond:
+    # one-entry cache keyed by row identity: the engine evaluates every check on
+    # the same enriched row before moving on, so one slot is all it needs
+    cell: List[Any] = [None, False]
+
+    def memo(row: Dict[str, Any]) -> bool:
+        if cell[0] is row:
+            return cell[1]
+        v = fn(row)
+        cell[0] = row
+        cell[1] = v
+        return v
+    memo.__wrapped__ = fn  # type: ignore[attr-defined]  # profiling.py counts the real evaluations
+    return memo
+
+
+def _leaf_key(cond: Any) -> str:
+    return json.dumps(cond, sort_keys=True, default=str)
+
+
+def compile_condition(cond: Dict[str, Any], sets: SetTable) -> Cond:
+    """Compile one condition (and its children) into fn(row) -> bool."""
+    return compile_node(cond, sets).fn
+
+
+def compile_node(cond: Dict[str, Any], sets: SetTable, pool: Optional[NodePool] = None) -> CondNode:
+    """
+    Compile one condition (and its children) into a CondNode tree.
+    With a pool, identical sub-conditions (all/any children compared as sets)
+    come back as the same node.
+    """
+    if not isinstance(cond, dict):
+        return _FALSE_NODE
+
+    # logical blocks
+    if "all" in cond or "any" in cond:
+        key = "all" if "all" in cond else "any"
+        subs = cond.get(key) or []
         if not isinstance(subs, list):
-            return False, ""
+            return _FALSE_NODE
+        children: List[CondNode] = []
         for sub in subs:
-            matched, reason = _ensure_tuple(eval_condition(sub, rule, port_groups, cidr_groups, name_groups, rule_meta))
-            if matched:
-                return True, reason
-        return False, ""
-
+            c = compile_node(sub, sets, pool)
+            if all(c is not x for x in children):  # `all: [a, a]` == `a`
+                children.append(c)
+        if not children:
+            return CondNode("const", cond, _true if key == "all" else _false, key=key + "()")
+        if len(children) == 1:
+            return children[0]
+
+        def build() -> CondNode:
+            fns = [c.fn for c in children]
+            fn = _compile_all(fns) if key == "all" else _compile_any(fns)
+            return CondNode(key, cond, fn, children, fns)
+        if pool is None:
+            return build()
+        return pool.get(key + "(" + ",".join(sorted(c.key for c in children)) + ")", build)
+
+    if pool is None:
+        return _compile_leaf(cond, sets)
+    return pool.get(_leaf_key(cond), lambda: _compile_leaf(cond, sets))
+
+
+def _compile_leaf(cond: Dict[str, Any], sets: SetTable) -> CondNode:
     #  builtin shortcuts (optional)
     if "builtin" in cond:
-        b = cond["builtin"]
-        if b == "unknown_service":
-            if rule.get("service", {}).get("name") == "unknown":
-                return True, rule_meta.get("rationale", "")
-            return False, ""
-        if b == "reciprocal":
-            return False, ""
-        return False, ""
+        if cond["builtin"] == "unknown_service":
+            def unknown_service(row: Dict[str, Any]) -> bool:
+                svc = row.get("service")
+                return isinstance(svc, dict) and svc.get("name") == "unknown"
+            return CondNode("leaf", cond, unknown_service)
+        if cond["builtin"] == "reciprocal":
+            # cross-rule: the engine fills reciprocal_of in a pre-pass (firefind/reciprocal.py)
+            def reciprocal(row: Dict[str, Any]) -> bool:
+                return bool(row.get("reciprocal_of"))
+            return CondNode("leaf", cond, reciprocal)
+        return CondNode("const", cond, _false)
+
+    # port quantifiers: { service: { ports: { any|all: { in: [...], to_from_diff_gte: N } } } }
+    if "field" not in cond and isinstance(cond.get("service"), dict):
+        return CondNode("leaf", cond, _compile_port_quantifier(cond["service"], sets))
 
     # field ops
     field = cond.get("field")
@@ -168,83 +492,355 @@ def eval_condition(
     value = cond.get("value")
 
     if field is None or op is None:
-        return False, ""
+        return CondNode("const", cond, _false)
+
+    return CondNode("leaf", cond, _compile_op(op, _compile_getter(str(field)), value, sets, cond.get("casefold")))
+
+
+# Guards: necessary conditions of a check that firefind.rule_index can answer from
+# posting lists instead of running the check. A guard is a hashable tuple:
+#   ("action", value)                 action equals value
+#   ("flag", field, bool)             service.any / service.has_icmp is_true / is_false
+#   ("ports", frozenset)              service.ports overlaps_range a discrete port set
+#   ("port_range", lo, hi)            service.ports overlaps_range [lo, hi] (service.any counts)
+#   ("addr", field, frozenset)        src_addrs/dst_addrs overlaps a name set
+#   ("all", (g, ...)) / ("any", (g, ...))
+# None means "can't narrow": every rule is a candidate.
+Guard = Tuple[Any, ...]
+FLAG_FIELDS = ("service.any", "service.has_icmp")
+
+
+def node_guard(node: CondNode, sets: SetTable) -> Optional[Guard]:
+    """Guard for a compiled node (see above), or None."""
+    if node.kind in ("all", "any"):
+        subs = [node_guard(c, sets) for c in node.children]
+        if node.kind == "all":
+            subs = [g for g in subs if g is not None]
+            if not subs:
+                return None
+            return subs[0] if len(subs) == 1 else ("all", tuple(subs))
+        if any(g is None for g in subs):
+            return None
+        return ("any", tuple(subs))
+    cond = node.cond
+    if node.kind != "leaf" or not isinstance(cond, dict):
+        return None
+    field, op, raw_value = cond.get("field"), cond.get("op"), cond.get("value")
+
+    if field == "action" and op == "equals":
+        value = sets.resolve(raw_value)
+        return ("action", value) if isinstance(value, str) else None
+    if field in FLAG_FIELDS and op in ("is_true", "is_false"):
+        return ("flag", field, op == "is_true")
+    if field == "service.ports" and op == "overlaps_range":
+        vv = sets.resolve(raw_value)
+        if not isinstance(vv, list) or not vv:
+            return None
+        if len(vv) == 2 and all(isinstance(x, int) for x in vv):
+            return ("port_range", min(vv), max(vv))
+        return ("ports", sets.frozen_for(raw_value))
+    if field in ("src_addrs", "dst_addrs") and op == "overlaps":
+        fold = sets.casefold if cond.get("casefold") is None else bool(cond.get("casefold"))
+        if fold:
+            return None
+        return ("addr", field, sets.frozen_for(raw_value))
+    return None
+
+
+def _compile_all(fns: List[Cond]) -> Cond:
+    # fns is owned by the CondNode, so a reorder shows up here without recompiling
+    def all_(row: Dict[str, Any]) -> bool:
+        for fn in fns:
+            if not fn(row):
+                return False
+        return True
+    return all_
+
 
-    # resolve set_ref
-    if isinstance(value, dict) and "set_ref" in value:
-        ref = value["set_ref"]
-        if ref.startswith("port_groups."):
-            value = port_groups.get(ref.split(".", 1)[1], [])
-        elif ref.startswith("cidr_groups."):
-            value = cidr_groups.get(ref.split(".", 1)[1], [])
-        elif ref.startswith("addr_names."):
-            value = name_groups.get(ref.split(".", 1)[1], [])
+def _compile_any(fns: List[Cond]) -> Cond:
+    def any_(row: Dict[str, Any]) -> bool:
+        for fn in fns:
+            if fn(row):
+                return True
+        return False
+    return any_
 
-    field_val = get_field(rule, field)
+
+def _compile_getter(dotted: str) -> Callable[[Dict[str, Any]], Any]:
+    """Pre-split version of get_field(row, dotted)."""
+    parts = dotted.split(".")
+    if len(parts) == 1:
+        k = parts[0]
+
+        def get1(row: Dict[str, Any]) -> Any:
+            return row.get(k)
+        return get1
+    if len(parts) == 2:
+        k1, k2 = parts
+
+        def get2(row: Dict[str, Any]) -> Any:
+            v = row.get(k1)
+            return v.get(k2) if isinstance(v, dict) else None
+        return get2
+
+    def getn(row: Dict[str, Any]) -> Any:
+        val: Any = row
+        for p in parts:
+            if isinstance(val, dict) and p in val:
+                val = val[p]
+            else:
+                return None
+        return val
+    return getn
+
+
+def _compile_op(
+    op: str,
+    get: Callable[[Dict[str, Any]], Any],
+    raw_value: Any,
+    sets: SetTable,
+    casefold: Optional[bool] = None,
+) -> Cond:
+    """Bind one comparison operator to its getter and value (set_refs resolved here, once)."""
+    value = sets.resolve(raw_value)
 
     # comparisons
     if op == "equals":
-        return (field_val == value, rule_meta.get("rationale", ""))
+        return lambda row: get(row) == value
     if op == "is_true":
-        return (bool(field_val) is True, rule_meta.get("rationale", ""))
+        return lambda row: bool(get(row))
     if op == "is_false":
-        return (bool(field_val) is False, rule_meta.get("rationale", ""))
+        return lambda row: not get(row)
     if op == "contains":
-        ok = False
-        if isinstance(field_val, list):
-            ok = value in field_val
-        elif isinstance(field_val, str):
-            ok = isinstance(value, str) and value in field_val
-        return (ok, rule_meta.get("rationale", ""))
+        value_is_str = isinstance(value, str)
+
+        def contains(row: Dict[str, Any]) -> bool:
+            fv = get(row)
+            if isinstance(fv, list):
+                return value in fv
+            if isinstance(fv, str):
+                return value_is_str and value in fv
+            return False
+        return contains
     if op == "overlaps":
-        fv = field_val if isinstance(field_val, list) else []
-        vv = value if isinstance(value, list) else []
-        return (bool(set(fv) & set(vv)), rule_meta.get("rationale", ""))
+        fold = sets.casefold if casefold is None else bool(casefold)
+        vset = sets.frozen_for(raw_value, folded=fold)
+        if not vset:
+            return _false
+        isdisjoint = vset.isdisjoint
+        if fold:
+            def overlaps_folded(row: Dict[str, Any]) -> bool:
+                fv = get(row)
+                return isinstance(fv, list) and not isdisjoint(
+                    x.casefold() if isinstance(x, str) else x for x in fv)
+            return overlaps_folded
+
+        def overlaps(row: Dict[str, Any]) -> bool:
+            fv = get(row)
+            return isinstance(fv, list) and not isdisjoint(fv)
+        return overlaps
 
     # proper numeric range overlap
     if op == "overlaps_range":
-        fv = field_val if isinstance(field_val, list) else []
         vv = value if isinstance(value, list) else []
+        is_range = len(vv) == 2 and all(isinstance(x, int) for x in vv)
         # list of discrete ports (e.g., admin_ports)
-        if vv and not (len(vv) == 2 and all(isinstance(x, int) for x in vv)):
-            return (bool(set(fv) & set(vv)), rule_meta.get("rationale", ""))
+        if vv and not is_range:
+            isdisjoint = sets.frozen_for(raw_value).isdisjoint
+
+            def overlaps_ports(row: Dict[str, Any]) -> bool:
+                fv = get(row)
+                return isinstance(fv, list) and not isdisjoint(fv)
+            return overlaps_ports
         # numeric range [lo, hi]
-        if len(vv) == 2 and all(isinstance(x, int) for x in vv):
+        if is_range:
             lo, hi = vv
             if hi < lo: lo, hi = hi, lo
-            # service.any overlaps everything
-            if get_field(rule, "service.any"):
-                return True, rule_meta.get("rationale", "")
-            # endpoints check
-            for p in fv:
-                if isinstance(p, int) and lo <= p <= hi:
-                    return True, rule_meta.get("rationale", "")
-            return False, ""
-        return False, ""
-
+            svc_any = _compile_getter("service.any")
+
+            def overlaps_span(row: Dict[str, Any]) -> bool:
+                # service.any overlaps everything
+                if svc_any(row):
+                    return True
+                fv = get(row)
+                if not isinstance(fv, list):
+                    return False
+                # endpoints check
+                for p in fv:
+                    if isinstance(p, int) and lo <= p <= hi:
+                        return True
+                return False
+            return overlaps_span
+        return _false
+
+    # address containment against CIDR sets (integer intervals, one bisect per address)
+    if op in ("within_cidr", "overlaps_cidr"):
+        return _compile_cidr_op(op, get, sets.intervals_for(raw_value))
+
+    # numeric compares; a non-comparable field value (str vs int) is a miss, not a crash,
+    # so evaluation order inside all/any can never change the outcome
     if op == "gte":
-        if field_val is None: return False, ""
-        return (field_val >= value, rule_meta.get("rationale", ""))
+        def gte(row: Dict[str, Any]) -> bool:
+            fv = get(row)
+            try:
+                return fv is not None and fv >= value
+            except TypeError:
+                return False
+        return gte
     if op == "lte":
-        if field_val is None: return False, ""
-        return (field_val <= value, rule_meta.get("rationale", ""))
+        def lte(row: Dict[str, Any]) -> bool:
+            fv = get(row)
+            try:
+                return fv is not None and fv <= value
+            except TypeError:
+                return False
+        return lte
 
     # case-insensitive contains helpers (for DHCP exclusions etc.)
-    if op == "ilike_any":
-        s = field_val if isinstance(field_val, str) else ""
-        terms = value if isinstance(value, list) else [value]
-        ok = any(isinstance(t, str) and t.lower() in s.lower() for t in terms)
-        return (ok, rule_meta.get("rationale", ""))
-    if op == "not_ilike_any":
-        s = field_val if isinstance(field_val, str) else ""
+    if op in ("ilike_any", "not_ilike_any"):
         terms = value if isinstance(value, list) else [value]
-        ok = all(isinstance(t, str) and t.lower() not in s.lower() for t in terms)
-        return (ok, rule_meta.get("rationale", ""))
+        lowered = tuple(t.lower() for t in terms if isinstance(t, str))
+        if op == "ilike_any":
+            if not lowered:
+                return _false
+
+            def ilike_any(row: Dict[str, Any]) -> bool:
+                fv = get(row)
+                s = fv.lower() if isinstance(fv, str) else ""
+                for t in lowered:
+                    if t in s:
+                        return True
+                return False
+            return ilike_any
+        # a non-string term can never be "not in" the string -> always False
+        if len(lowered) != len(terms):
+            return _false
+
+        def not_ilike_any(row: Dict[str, Any]) -> bool:
+            fv = get(row)
+            s = fv.lower() if isinstance(fv, str) else ""
+            for t in lowered:
+                if t in s:
+                    return False
+            return True
+        return not_ilike_any
 
     # unknown op → clean fail
-    return False, ""
+    return _false
 
 
+def _compile_cidr_op(op: str, get: Callable[[Dict[str, Any]], Any], index: IntervalIndex) -> Cond:
+    """
+    within_cidr:   every address in the field lies inside the group; a name that
+                   isn't an address (or an empty list) can't be proven inside -> False
+    overlaps_cidr: at least one address shares an address with the group; names are skipped
+    Addresses, a-b ranges and CIDRs all count; "any" is 0.0.0.0/0 + ::/0.
+    """
+    if not index:
+        return _false
+    if op == "within_cidr":
+        contains = index.contains
+
+        def within_cidr(row: Dict[str, Any]) -> bool:
+            fv = get(row)
+            spans = address_spans(fv) if isinstance(fv, list) else None
+            if not spans:
+                return False
+            for span in spans:
+                if not contains(span):
+                    return False
+            return True
+        return within_cidr
+
+    overlaps = index.overlaps
+
+    def overlaps_cidr(row: Dict[str, Any]) -> bool:
+        fv = get(row)
+        if not isinstance(fv, list):
+            return False
+        for tok in fv:
+            if isinstance(tok, str):
+                for span in token_spans(tok):
+                    if overlaps(span):
+                        return True
+        return False
+    return overlaps_cidr
+
+
+# per-range predicates usable inside a port quantifier
+_RANGE_PREDICATES = ("in", "not_in", "to_from_diff_gte", "to_from_diff_lte")
+
+
+def _compile_port_quantifier(spec: Dict[str, Any], sets: SetTable) -> Cond:
+    """
+    service.ports quantifier over the rule's tcp/udp port ranges (service.port_ranges):
+      any: at least one range satisfies every predicate given
+      all: every range does (and there is at least one range)
+    predicates: in / not_in (range contains / contains none of the listed ports),
+                to_from_diff_gte / to_from_diff_lte (to - from of the range).
+    "any" services have no ranges; checks match those with service.any instead.
+    An unknown quantifier or predicate compiles to False, like an unknown op.
+    """
+    ports = spec.get("ports")
+    if not isinstance(ports, dict) or len(ports) != 1:
+        return _false
+    quant, preds = next(iter(ports.items()))
+    if quant not in ("any", "all") or not isinstance(preds, dict) or not preds:
+        return _false
+    if any(k not in _RANGE_PREDICATES for k in preds):
+        return _false
+
+    tests: List[Callable[[int, int], bool]] = []
+    for name, raw in preds.items():
+        value = sets.resolve(raw)
+        if name in ("in", "not_in"):
+            wanted = sorted({v for v in (value if isinstance(value, list) else [value]) if isinstance(v, int)})
+            if not wanted:
+                return _false if name == "in" else _true
+            tests.append(_range_contains(wanted) if name == "in" else _range_avoids(wanted))
+        else:
+            if not isinstance(value, int):
+                return _false
+            if name == "to_from_diff_gte":
+                tests.append(lambda lo, hi, n=value: hi - lo >= n)
+            else:
+                tests.append(lambda lo, hi, n=value: hi - lo <= n)
+
+    def range_ok(lo: int, hi: int) -> bool:
+        for t in tests:
+            if not t(lo, hi):
+                return False
+        return True
+
+    def ranges_of(row: Dict[str, Any]) -> List[Tuple[int, int]]:
+        svc = row.get("service")
+        return (svc.get("port_ranges") or []) if isinstance(svc, dict) else []
+
+    if quant == "any":
+        def any_range(row: Dict[str, Any]) -> bool:
+            for lo, hi in ranges_of(row):
+                if range_ok(lo, hi):
+                    return True
+            return False
+        return any_range
+
+    def all_ranges(row: Dict[str, Any]) -> bool:
+        rngs = ranges_of(row)
+        return bool(rngs) and all(range_ok(lo, hi) for lo, hi in rngs)
+    return all_ranges
+
+
+def _range_contains(wanted: List[int]) -> Callable[[int, int], bool]:
+    # sorted port list -> "does [lo, hi] contain one of them", one bisect per range
+    def contains(lo: int, hi: int) -> bool:
+        i = bisect_left(wanted, lo)
+        return i < len(wanted) and wanted[i] <= hi
+    return contains
+
+
+def _range_avoids(wanted: List[int]) -> Callable[[int, int], bool]:
+    contains = _range_contains(wanted)
+    return lambda lo, hi: not contains(lo, hi)
 
 
 def get_field(rule: Dict[str, Any], dotted: str) -> Any:
@@ -269,23 +865,32 @@ def enrich_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
     src_list = r.get("src_addrs") or r.get("src") or []
     dst_list = r.get("dst_addrs") or r.get("dst") or []
 
-    src_info = _compute_addr_info(src_list)
-    dst_info = _compute_addr_info(dst_list)
+    # with an address book, to_v01 already resolved names -> networks (src_nets/dst_nets)
+    src_nets = r.get("src_nets")
+    dst_nets = r.get("dst_nets")
+    src_info = _compute_addr_info(src_nets if src_nets is not None else src_list)
+    dst_info = _compute_addr_info(dst_nets if dst_nets is not None else dst_list)
 
     r["src"] = {"any": src_info["any"], "cidr": src_info["cidrs"], "max_prefix_len": src_info["max_prefix_len"]}
     r["dst"] = {"any": dst_info["any"], "cidr": dst_info["cidrs"], "max_prefix_len": dst_info["max_prefix_len"], "is_private": dst_info["has_private"]}
     r["src_list"] = src_list
     r["dst_list"] = dst_list
+    r["src_is_internal"] = src_info["all_private"]
+    r["dst_is_internal"] = dst_info["all_private"]
 
     svcs = r.get("services") or []
     has_any = False
     has_icmp = False
+    protocols = set()
+    tcp_ports: List[int] = []
     port_count = 0
     span_max = 0
     flat_ports: List[int] = []
+    ranges: List[Tuple[int, int]] = []
 
     for s in svcs:
         proto = (s.get("protocol") or "").lower()
+        protocols.add(proto)
         if proto == "any":
             has_any = True; continue
         if proto == "icmp":
@@ -300,6 +905,9 @@ def enrich_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
                 span = hi - lo
                 if span > span_max: span_max = span
                 port_count += 1
+                ranges.append((lo, hi))
+                if proto == "tcp" and lo == hi:
+                    tcp_ports.append(lo)
                 if lo == hi:
                     flat_ports.append(lo)
                 else:
@@ -308,14 +916,30 @@ def enrich_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
     if has_any and port_count == 0:
         span_max = 65535
 
+    # one pass for the port quantifiers / span ops: sorted (lo, hi) ranges as written,
+    # plus the number of distinct ports they cover (overlaps counted once)
+    ranges.sort()
+    span_total = 65536 if has_any else sum(hi - lo + 1 for lo, hi in coalesce_intervals(ranges))
+
     r["service"] = {
         "any": has_any,
         "port_count": port_count,
         "port_span": span_max,
+        "port_span_total": span_total,
         "ports": flat_ports,
+        "port_ranges": ranges,
         "has_icmp": has_icmp,
     }
 
+    # flat fields for suppression rules (then: action: ignore)
+    #   services_protocol: "any" if any service is any, else the one protocol used, "mixed" or ""
+    #   services_tcp_ports: single tcp ports only; a range isn't "tcp/80" even if it covers 80
+    if has_any:
+        r["services_protocol"] = "any"
+    else:
+        r["services_protocol"] = protocols.pop() if len(protocols) == 1 else ("mixed" if protocols else "")
+    r["services_tcp_ports"] = tcp_ports
+
     r.setdefault("logging", {})
     if "enabled" not in r["logging"]:
         r["logging"]["enabled"] = True
@@ -327,6 +951,51 @@ def enrich_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
 
 
 
+# Address tokens are mostly object names ("All_Internet", "WAN_21"); ip_network()
+# on a name raises, and raising/catching is what made enrichment slow. Tokens go
+# through a lexical pre-classifier first, and parsed results are memoized per token
+# for the whole process (bounded), so a repeated token is one dict lookup.
+_V4_TOKEN = re.compile(r"^[0-9]{1,3}(?:\.[0-9]{1,3}){3}(?:/[0-9.]{1,15})?$")
+_V6_TOKEN = re.compile(r"^[0-9A-Fa-f:.]*:[0-9A-Fa-f:.]*(?:%[^/\s]+)?(?:/[0-9]{1,3})?$")
+_RANGE_TOKEN = re.compile(r"^[0-9A-Fa-f:.]+\s*-\s*[0-9A-Fa-f:.]+$")
+ADDR_MEMO_SIZE = 1 << 16
+
+AddrInfo = Tuple[str, int, bool]  # (canonical cidr, prefix length, is_private)
+
+
+def classify_addr_token(tok: str) -> str:
+    """'ipv4' | 'ipv6' | 'range' | 'name', from the text alone (no parsing, no exceptions)."""
+    if _V4_TOKEN.match(tok):
+        return "ipv4"
+    if ":" in tok and _V6_TOKEN.match(tok):
+        return "ipv6"
+    if "-" in tok and _RANGE_TOKEN.match(tok):
+        return "range"
+    return "name"
+
+
+@lru_cache(maxsize=ADDR_MEMO_SIZE)
+def _token_info(tok: str) -> Optional[AddrInfo]:
+    if classify_addr_token(tok) not in ("ipv4", "ipv6"):
+        return None  # names and a-b ranges aren't networks (same as before)
+    try:
+        net = ipaddress.ip_network(tok, strict=False)
+    except ValueError:
+        return None  # looked like an address but isn't one (e.g. 300.1.1.1)
+    return str(net), net.prefixlen, net.is_private
+
+
+def addr_token_info(tok: Any) -> Optional[AddrInfo]:
+    """(cidr, prefixlen, is_private) for an address token, None for names/ranges/junk."""
+    if isinstance(tok, str):
+        return _token_info(tok)
+    try:
+        net = ipaddress.ip_network(tok, strict=False)
+    except (ValueError, TypeError):
+        return None
+    return str(net), net.prefixlen, net.is_private
+
+
 def _compute_addr_info(items: List[str]) -> Dict[str, Any]:
     """
     Compute info from src/dst list.
@@ -334,6 +1003,7 @@ def _compute_addr_info(items: List[str]) -> Dict[str, Any]:
     - cidrs: valid cidr strings
     - max_prefix_len: smallest prefix length (broadest range)
     - has_private: True if private range found
+    - all_private: True if the list is non-empty and every item is a private network
     """
     any_tokens = {"any", "0.0.0.0/0", "::/0"}
     has_any = any(tok in any_tokens for tok in items)
@@ -341,18 +1011,21 @@ def _compute_addr_info(items: List[str]) -> Dict[str, Any]:
     cidrs = []
     max_prefix = None
     has_private = False
+    all_private = bool(items)
 
     for s in items:
-        try:
-            net = ipaddress.ip_network(s, strict=False)
-            cidrs.append(str(net))
-            plen = net.prefixlen
-            if max_prefix is None or plen < max_prefix:
-                max_prefix = plen
-            if net.is_private:
-                has_private = True
-        except Exception:
+        info = addr_token_info(s)
+        if info is None:
+            all_private = False
             continue
+        cidr, plen, private = info
+        cidrs.append(cidr)
+        if max_prefix is None or plen < max_prefix:
+            max_prefix = plen
+        if private:
+            has_private = True
+        else:
+            all_private = False
 
     if max_prefix is None:
         max_prefix = 32  # safe default
@@ -361,7 +1034,8 @@ def _compute_addr_info(items: List[str]) -> Dict[str, Any]:
         "any": has_any,
         "cidrs": cidrs,
         "max_prefix_len": max_prefix,
-        "has_private": has_private
+        "has_private": has_private,
+        "all_private": all_private,
     }
 
 
@@ -0,0 +1,133 @@
+# firefind/svc_map.py
+# External service-object map (--svc-map) for the v0.1 normalizer.
+#
+# Customers name services and service groups however they like ("GRP_Web_Tier",
+# "TCP-Backup-Agent"...). Anything v01._ALIAS doesn't know ends up as protocol
+# "any", which makes the engine treat the rule as any-service. This module loads
+# the customer's service objects once, flattens nested groups once, and hands
+# to_v01 a plain dict: lowercase name -> ((proto, from, to), ...), same shape as _ALIAS.
+#
+# Accepted inputs:
+#   - JSON: { "name": spec } where spec is a token ("tcp/443", "udp_53-54", "icmp"),
+#           another object name, a {"protocol":..,"ports":[{from,to}]} dict,
+#           a {"members": [...]} dict, or a list of any of these.
+#   - CSV/XLSX vendor export with a name column plus either protocol/port
+#     columns (service objects) or a members column (service groups).
+#
+# The compiled map is cached on disk (see cache.py) keyed by the file's content.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import content_key, load_artifact, store_artifact
+from .object_export import flatten_groups, pick, read_object_rows
+from .v01 import _add, _lower, _parse_token, _split_multi
+
+SvcEntry = Tuple[str, Optional[int], Optional[int]]
+SvcMap = Dict[str, Tuple[SvcEntry, ...]]
+
+# bump when the compiled layout or content changes so old cache entries are ignored
+SVC_MAP_VERSION = "svc-map/2"
+
+_NAME_COLS = ("name", "servicename", "objectname", "service")
+_PROTO_COLS = ("protocol", "proto", "type")
+_PORT_COLS = ("port", "ports", "dstport", "destinationport", "dstports", "destinationports", "portrange")
+_MEMBER_COLS = ("members", "member", "groupmembers", "services")
+# a port protocol given without ports means every port (v0.1 has no null ports)
+_ALL_PORTS = (0, 65535)
+
+
+def load_svc_map(path: Optional[str]) -> Optional[SvcMap]:
+    """
+    Load and compile a service map file. Returns None when no path is given.
+    Raises FileNotFoundError / ValueError on a missing or unreadable file.
+    """
+    if not path:
+        return None
+    p = Path(path)
+    if not p.is_file():
+        raise FileNotFoundError(f"Service map not found: {p}")
+
+    data = p.read_bytes()
+    key = content_key(data + p.suffix.lower().encode(), SVC_MAP_VERSION)
+    cached = load_artifact("svcmap", key)
+    if cached is not None:
+        return cached
+
+    if p.suffix.lower() == ".json":
+        try:
+            raw = json.loads(data.decode("utf-8-sig"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Bad service map JSON in {p}: {e}")
+        if not isinstance(raw, dict):
+            raise ValueError(f"Service map {p} must be a JSON object of name -> spec")
+        defs = _defs_from_json(raw)
+    else:
+        defs = _defs_from_export(p)
+
+    compiled = compile_svc_map(defs)
+    store_artifact("svcmap", key, compiled)
+    return compiled
+
+
+def _defs_from_json(raw: Dict[str, Any]) -> Dict[str, List[Any]]:
+    defs: Dict[str, List[Any]] = {}
+    for name, spec in raw.items():
+        if isinstance(spec, dict) and "members" in spec:
+            spec = spec["members"]
+        if not isinstance(spec, list):
+            spec = [spec]
+        defs.setdefault(_lower(name), []).extend(spec)
+    return defs
+
+
+def _defs_from_export(p: Path) -> Dict[str, List[Any]]:
+    rows = read_object_rows(p, _NAME_COLS)
+    defs: Dict[str, List[Any]] = {}
+    for r in rows:
+        name = pick(r, _NAME_COLS)
+        if not name:
+            continue
+        members = pick(r, _MEMBER_COLS)
+        proto = _lower(pick(r, _PROTO_COLS))
+        ports = pick(r, _PORT_COLS)
+        specs: List[Any] = []
+        if members and not (proto or ports):
+            specs = _split_multi(members)
+        elif proto in ("icmp", "any", "ip", "all"):
+            specs = ["icmp" if proto == "icmp" else "any"]
+        elif proto:
+            # "80", "1000-2000", "80,443" -> one tcp_/udp_ token per port spec
+            specs = [f"{proto}_{x}" for x in (_split_multi(ports) if ports else ["%d-%d" % _ALL_PORTS])]
+        defs.setdefault(_lower(name), []).extend(specs)
+    return defs
+
+
+def _expand_spec(spec: Any) -> List[SvcEntry]:
+    # one leaf spec (token string or {protocol, ports} dict) -> (proto, from, to) entries
+    acc: List[Dict[str, Any]] = []
+    if isinstance(spec, dict):
+        proto = _lower(spec.get("protocol")) or "any"
+        ports = [r for r in spec.get("ports") or [] if isinstance(r, dict) and r.get("from") is not None]
+        if not ports:
+            _add(acc, proto, *_ALL_PORTS)  # icmp / any ignore the ports
+        for rng in ports:
+            _add(acc, proto, rng.get("from"), rng.get("to"))
+    else:
+        _parse_token(str(spec), acc)
+    entries: List[SvcEntry] = []
+    for s in acc:
+        if not s["ports"]:
+            entries.append((s["protocol"], None, None))
+        for rng in s["ports"]:
+            entries.append((s["protocol"], rng["from"], rng["to"]))
+    return entries
+
+
+def compile_svc_map(defs: Dict[str, List[Any]]) -> SvcMap:
+    """Flatten every service name/group to its final (proto, from, to) tuple."""
+    flat = flatten_groups(defs, _expand_spec, "service")
+    return {name: entries for name, entries in flat.items() if entries}
@@ -253,12 +253,20 @@ def _from_alias(tok: str) -> List[Tuple[str, Optional[int], Optional[int]]]:
     # Helper wrapper (easy to swap the alias source later if needed)
     return _ALIAS.get(tok, [])
 
-def _parse_token(tok: str, out: List[Dict[str, Any]]):
+def _parse_token(tok: str, out: List[Dict[str, Any]], svc_map: Optional[dict] = None):
     # Parse a single token (etc "dns", "tcp_443") and update 'out' via _add
     t = _lower(tok)
     if not t:
         return
 
+    # 0) Customer service objects (compiled by svc_map.load_svc_map, groups already flat)
+    if svc_map:
+        hit = svc_map.get(t)
+        if hit:
+            for proto, lo, hi in hit:
+                _add(out, proto, lo, hi)
+            return
+
     # 1) Direct alias (fast path)
     for proto, lo, hi in _from_alias(t):
         _add(out, proto, lo, hi)
@@ -300,7 +308,7 @@ def _parse_token(tok: str, out: List[Dict[str, Any]]):
 
     # 6) If nothing matched, we leave it. Caller will decide about "any".
 
-def _services_from_field(svc_field: Any) -> List[Dict[str, Any]]:
+def _services_from_field(svc_field: Any, svc_map: Optional[dict] = None) -> List[Dict[str, Any]]:
     raw = _clean(str(svc_field))
     # Convert alpha/alpha slashes to commas so "HTTP/HTTPS" -> "HTTP,HTTPS"
     raw = re.sub(r'(?i)\b([a-z][a-z0-9_\-+]*)\s*/\s*([a-z][a-z0-9_\-+]*)\b', r'\1,\2', raw)
@@ -312,7 +320,7 @@ def _services_from_field(svc_field: Any) -> List[Dict[str, Any]]:
 
     services: List[Dict[str, Any]] = []
     for tok in tokens or []:
-        _parse_token(tok, services)
+        _parse_token(tok, services, svc_map)
 
     if not services:
         return [{"protocol": "any", "ports": []}]
@@ -326,17 +334,21 @@ def _services_from_field(svc_field: Any) -> List[Dict[str, Any]]:
 
 # ---------- public API
 
-def to_v01(flat: Dict[str, Any], vendor_hint: Optional[str] = None, svc_map: Optional[dict] = None) -> Dict[str, Any]:
+def to_v01(flat: Dict[str, Any], vendor_hint: Optional[str] = None, svc_map: Optional[dict] = None,
+           addr_book: Optional[dict] = None) -> Dict[str, Any]:
     """
     Convert a 'flat' row (vendor CSV/XLSX) into FireFind v0.1 normalized object.
     Expected flat keys: vendor, rule_id, src, dst, service, action, reason, severity
+    svc_map: compiled map from svc_map.load_svc_map (lowercase name -> (proto, from, to) tuples)
+    addr_book: compiled book from addr_book.load_addr_book; when given, the networks behind
+               src/dst names are added as src_nets/dst_nets (names stay as-is in *_addrs)
     """
     # Gather normalized fields; defaults are intentional ("any", "other", etc.)
     vendor = _norm_vendor(vendor_hint, flat.get("vendor"))
     rule_id = _clean(str(flat.get("rule_id", "")))
     src_addrs = _norm_addrs(flat.get("src"))
     dst_addrs = _norm_addrs(flat.get("dst"))
-    services = _services_from_field(flat.get("service"))
+    services = _services_from_field(flat.get("service"), svc_map)
     action = _norm_action(flat.get("action"))
     enabled = True  # Until we parse disabled markers from vendor exports
 
@@ -364,4 +376,9 @@ def to_v01(flat: Dict[str, Any], vendor_hint: Optional[str] = None, svc_map: Opt
         "name": None,  # may be filled by vendor-specific logic later
         "comments": (flat.get("reason") or None),  # reuse "reason" as comments for now
     }
+    if addr_book is not None:
+        # resolved once here, so the engine never has to re-interpret object names
+        from .addr_book import resolve_addrs
+        v01["src_nets"] = resolve_addrs(src_addrs, addr_book)
+        v01["dst_nets"] = resolve_addrs(dst_addrs, addr_book)
     return v01
@@ -0,0 +1,196 @@
+# firefind/validate.py
+# Schema validation between pipeline stages:
+#   one.py (normalized rules, docs/schema.md)  -> validate "rule"    -> risk engine
+#   risk engine (findings, docs/schema_findings_v0.1.md) -> validate "finding" -> exporters
+#
+# Malformed rows otherwise only show up later as silent predicate misses.
+# Validators are compiled once per schema (jsonschema checks the schema itself
+# only at build time) and then run over whole batches.
+#   mode="full"   -> every item
+#   mode="sample" -> the first SAMPLE_HEAD items + every Nth item after that
+#                    (N = 1/sample_rate). Problems in exports are nearly always
+#                    systematic, so a 1% sample catches them at ~1% of the cost.
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import jsonschema
+
+_STR_ARRAY = {"type": "array", "items": {"type": "string"}}
+_SERVICES = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["protocol", "ports"],
+        "properties": {
+            "protocol": {"enum": ["tcp", "udp", "icmp", "any"]},
+            "ports": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["from", "to"],
+                    "properties": {
+                        "from": {"type": "integer", "minimum": 0, "maximum": 65535},
+                        "to": {"type": "integer", "minimum": 0, "maximum": 65535},
+                    },
+                },
+            },
+        },
+    },
+}
+_NULLABLE_STR = {"type": ["string", "null"]}
+
+# docs/schema.md
+RULE_SCHEMA: Dict[str, Any] = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "FireFind normalized rule v0.1",
+    "type": "object",
+    "required": ["rule_id", "vendor", "enabled", "action", "src_addrs", "dst_addrs", "services", "raw"],
+    "properties": {
+        "rule_id": {"type": "string"},
+        "vendor": {"type": "string"},
+        "enabled": {"type": "boolean"},
+        "action": {"enum": ["allow", "deny", "drop", "reject", "other"]},
+        "src_addrs": _STR_ARRAY,
+        "dst_addrs": _STR_ARRAY,
+        "services": _SERVICES,
+        "raw": {"type": "object"},
+        "name": _NULLABLE_STR,
+        "comments": _NULLABLE_STR,
+        "src_nets": _STR_ARRAY,
+        "dst_nets": _STR_ARRAY,
+    },
+}
+
+# docs/schema_findings_v0.1.md
+FINDING_SCHEMA: Dict[str, Any] = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "FireFind finding v0.1",
+    "type": "object",
+    "required": ["rule_id", "check_id", "severity", "title", "reason", "recommendation",
+                 "src_addrs", "dst_addrs", "services"],
+    "properties": {
+        "rule_id": {"type": "string"},
+        "check_id": {"type": "string"},
+        "severity": {"enum": ["low", "medium", "high", "critical"]},
+        "title": {"type": "string"},
+        "reason": {"type": "string"},
+        "recommendation": {"type": "string"},
+        "src_addrs": _STR_ARRAY,
+        "dst_addrs": _STR_ARRAY,
+        "services": _SERVICES,
+        "vendor": {"type": "string"},
+        "name": _NULLABLE_STR,
+        "comments": _NULLABLE_STR,
+        "evidence": {
+            "type": "object",
+            "properties": {
+                "policy_name": {"type": "string"},
+                # "" = unknown (most exports carry no hit counts)
+                "hit_count": {"anyOf": [{"type": "integer"}, {"type": "null"}, {"const": ""}]},
+            },
+        },
+        "labels": _STR_ARRAY,
+    },
+}
+
+SCHEMAS = {"rule": RULE_SCHEMA, "finding": FINDING_SCHEMA}
+
+MODES = ("full", "sample")
+SAMPLE_HEAD = 100
+DEFAULT_SAMPLE_RATE = 0.01
+MAX_REPORTED = 50  # invalid items kept in the report (the count is always exact)
+
+
+@lru_cache(maxsize=None)
+def compiled_validator(kind: str) -> Any:
+    """Build (and check) the validator for 'rule' or 'finding' once per process."""
+    if kind not in SCHEMAS:
+        raise ValueError(f"Unknown schema kind '{kind}'. Allowed: {', '.join(SCHEMAS)}")
+    schema = SCHEMAS[kind]
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+def sample_indexes(total: int, mode: str, sample_rate: float = DEFAULT_SAMPLE_RATE) -> Iterable[int]:
+    """Which positions of a batch of `total` items get validated."""
+    if mode == "full":
+        return range(total)
+    if mode != "sample":
+        raise ValueError(f"Unknown validation mode '{mode}'. Allowed: {', '.join(MODES)}")
+    step = max(1, int(round(1.0 / sample_rate))) if sample_rate > 0 else total + 1
+    head = min(total, SAMPLE_HEAD)
+    return list(range(head)) + list(range(head, total, step))
+
+
+def validate_batch(
+    items: Sequence[Any],
+    kind: str = "rule",
+    mode: str = "full",
+    sample_rate: float = DEFAULT_SAMPLE_RATE,
+) -> Dict[str, Any]:
+    """
+    Validate a batch of rules or findings.
+    Returns a report dict:
+      {"kind", "mode", "total", "checked", "invalid_count",
+       "invalid": [{"index", "id", "errors": [str, ...]}, ...],   # first MAX_REPORTED
+       "invalid_indexes": [int, ...]}                              # all of them
+    """
+    validator = compiled_validator(kind)
+    id_key = "rule_id" if kind == "rule" else "check_id"
+    invalid: List[Dict[str, Any]] = []
+    invalid_indexes: List[int] = []
+    checked = 0
+
+    for i in sample_indexes(len(items), mode, sample_rate):
+        item = items[i]
+        # NormalizedRule (and other mappings) -> plain dict; jsonschema wants dicts
+        if not isinstance(item, dict) and isinstance(item, Mapping):
+            item = dict(item)
+        checked += 1
+        if validator.is_valid(item):  # cheap path; only collect messages on failure
+            continue
+        invalid_indexes.append(i)
+        if len(invalid) < MAX_REPORTED:
+            errs = [_describe(e) for e in validator.iter_errors(item)]
+            rid = item.get(id_key, "") if isinstance(item, dict) else ""
+            invalid.append({"index": i, "id": rid, "errors": errs})
+
+    return {
+        "kind": kind,
+        "mode": mode,
+        "total": len(items),
+        "checked": checked,
+        "invalid_count": len(invalid_indexes),
+        "invalid": invalid,
+        "invalid_indexes": invalid_indexes,
+    }
+
+
+def _describe(err: Any) -> str:
+    # "services/0/protocol: 'sctp' is not one of [...]"
+    path = "/".join(str(p) for p in err.absolute_path)
+    return f"{path or '<root>'}: {err.message}"
+
+
+def print_report(report: Dict[str, Any], label: str = "") -> None:
+    """Human summary in the same [WARN]/[OK] style as the CLIs."""
+    name = label or report["kind"] + "s"
+    if not report["invalid_count"]:
+        print(f"[OK] {name}: {report['checked']}/{report['total']} validated ({report['mode']}), no schema errors")
+        return
+    print(f"[WARN] {name}: {report['invalid_count']} of {report['checked']} checked "
+          f"({report['mode']}) fail the schema")
+    for bad in report["invalid"][:10]:
+        print(f"  - #{bad['index']} {bad['id']}: {'; '.join(bad['errors'][:3])}")
+
+
+def drop_invalid(items: List[Any], report: Dict[str, Any]) -> Tuple[List[Any], int]:
+    """Remove the items a report flagged (only meaningful for mode='full')."""
+    bad = set(report["invalid_indexes"])
+    if not bad:
+        return items, 0
+    return [x for i, x in enumerate(items) if i not in bad], len(bad)
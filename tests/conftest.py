@@ -2,3 +2,11 @@
 import sys, pathlib
 # add project root (FireFind/) to sys.path so "firefind" can be imported
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _private_cache(tmp_path, monkeypatch):
+    # compiled artifacts go to a per-test folder, never the repo or the user's cache
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", str(tmp_path / "firefind-cache"))
@@ -5,47 +5,119 @@
 #   python -m tests.run_engine_cli results/normalized/   (folder with many files)
 
 import sys, json, pathlib
-from typing import List, Dict, Any
-from firefind.risk_engine import run_engine
+from typing import Iterator, List, Dict, Any
+from firefind.risk_engine import iter_engine, run_engine
+from firefind.normalized import NormalizedRule
+from firefind.validate import validate_batch, print_report, drop_invalid
 import os, csv
 
 
-def read_normalized(path_str: str) -> List[Dict[str, Any]]:
+def read_normalized(path_str: str, compact: bool = False) -> List[Dict[str, Any]]:
     """
     Load normalized rules v0.1 from a file or folder.
     Supports:
       - JSONL (one JSON object per line)  -> *.jsonl
       - JSON  (array of objects)          -> *.json
+    compact=True keeps each rule as a slotted NormalizedRule instead of a dict
+    (same keys via the mapping interface, far less memory on big policies).
     """
+    return list(iter_normalized(path_str, compact=compact))
+
+
+def iter_normalized(path_str: str, compact: bool = False) -> Iterator[Dict[str, Any]]:
+    """Same as read_normalized, but yields rules one at a time (JSONL is read line by line)."""
     path = pathlib.Path(path_str)
-    rows: List[Dict[str, Any]] = []
+    wrap = NormalizedRule.from_v01 if compact else (lambda d: d)
 
     def _load_file(p: pathlib.Path):
         if p.suffix.lower() == ".jsonl":
-            for line in p.read_text(encoding="utf-8").splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                rows.append(json.loads(line))
+            with p.open(encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    yield wrap(json.loads(line))
         elif p.suffix.lower() == ".json":
             data = json.loads(p.read_text(encoding="utf-8"))
             if isinstance(data, list):
-                rows.extend(data)
+                yield from (wrap(d) for d in data)
             else:
                 print(f"[WARN] {p} is JSON but not a list; skipping")
         else:
             print(f"[SKIP] {p} (not .json or .jsonl)")
 
     if path.is_file():
-        _load_file(path)
+        yield from _load_file(path)
     elif path.is_dir():
         for p in sorted(path.glob("**/*")):
             if p.is_file() and p.suffix.lower() in (".jsonl", ".json"):
-                _load_file(p)
+                yield from _load_file(p)
     else:
         raise FileNotFoundError(f"Path not found: {path}")
 
-    return rows
+
+def print_suppressed(stats: Dict[str, Any]) -> None:
+    """One line on what the ignore-checks (then: action: ignore) filtered out."""
+    if stats.get("suppressed"):
+        parts = ", ".join(f"{k}={v}" for k, v in sorted(stats["suppressed_by"].items(), key=lambda x: -x[1]))
+        print(f"Suppressed {stats['suppressed']} of {stats['rules']} rules ({parts})")
+
+
+def write_profile(profile: Dict[str, Any], out_path: str) -> None:
+    """--profile: JSON report (profiling.Profiler.report) + the slowest checks/conditions."""
+    from firefind.profiling import print_profile
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2, default=str)
+    print_profile(profile)
+    print(f"✓ Profile saved to: {out_path}\n")
+
+
+def profile_path() -> str:
+    """--profile [out.json] (default results/profile.json)."""
+    i = sys.argv.index("--profile")
+    if i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith("-"):
+        return sys.argv[i + 1]
+    return "results/profile.json"
+
+
+def stream_main(src_path: str, rules_path: str, out_path: str = "results/findings.jsonl") -> None:
+    """
+    --stream: rules are read lazily and every finding is written to the JSONL as soon
+    as the engine yields it, so memory stays flat and results/findings.jsonl fills
+    while the run is going. Only counts are kept for the summary.
+    """
+    for flag in ("--validate", "--csv", "--engine", "--workers", "--hygiene"):
+        if flag in sys.argv:
+            print(f"[WARN] {flag} needs the whole batch; ignored with --stream")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    by_check: Dict[str, int] = {}
+    by_sev: Dict[str, int] = {}
+    stats: Dict[str, Any] = {}
+    profile = {} if "--profile" in sys.argv else None
+    total = 0
+    rules = iter_normalized(src_path, compact="--compact" in sys.argv)
+    with open(out_path, "w", encoding="utf-8") as f:
+        for item in iter_engine(rules, rules_path=rules_path, stats=stats, profile=profile):
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            f.flush()
+            if total < 5:
+                print(f"- {item['rule_id']} -> {item['check_id']} ({item['severity']}): {item['reason']}")
+            total += 1
+            by_check[item["check_id"]] = by_check.get(item["check_id"], 0) + 1
+            by_sev[item["severity"]] = by_sev.get(item["severity"], 0) + 1
+
+    print_suppressed(stats)
+    print(f"Engine produced {total} findings\n")
+    if profile is not None:
+        write_profile(profile, profile_path())
+    if by_sev:
+        print("By severity:", ", ".join(f"{k}:{v}" for k,v in sorted(by_sev.items(), key=lambda x: -x[1])))
+    if by_check:
+        top = sorted(by_check.items(), key=lambda x: -x[1])[:10]
+        print("Top checks:", ", ".join(f"{k}={v}" for k,v in top))
+    print(f"\n✓ Findings saved to: {out_path}")
 
 def main():
     if len(sys.argv) < 2:
@@ -56,14 +128,74 @@ def main():
     src_path = sys.argv[1]
     rules_path = sys.argv[2] if (len(sys.argv) > 2 and not sys.argv[2].startswith("--")) else "docs/rules.yml"
 
+    # --stream = constant-memory JSONL in -> JSONL out (see stream_main)
+    if "--stream" in sys.argv:
+        stream_main(src_path, rules_path)
+        return
 
-    # 1) read real normalized rules from disk
-    normalized = read_normalized(src_path)
+    # 1) read real normalized rules from disk (--compact = slotted NormalizedRule)
+    normalized = read_normalized(src_path, compact="--compact" in sys.argv)
     print(f"Loaded {len(normalized)} normalized rules from {src_path}")
 
+    # optional schema gate: --validate full|sample
+    #   full   = check every rule (invalid ones are dropped) and every finding
+    #   sample = spot-check ~1% (warn only), cheap enough for huge policies
+    validate_mode = None
+    if "--validate" in sys.argv:
+        i = sys.argv.index("--validate")
+        validate_mode = sys.argv[i + 1] if i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith("-") else "full"
+        report = validate_batch(normalized, kind="rule", mode=validate_mode)
+        print_report(report, "normalized rules")
+        if validate_mode == "full":
+            normalized, dropped = drop_invalid(normalized, report)
+            if dropped:
+                print(f"[WARN] dropped {dropped} invalid rules before the engine")
+
     # 2) run the engine (uses rules_loader inside)
-    findings = run_engine(normalized, rules_path=rules_path)
+    #    --engine columnar = NumPy mask evaluation (same findings, for very large policies)
+    engine = "rows"
+    if "--engine" in sys.argv:
+        i = sys.argv.index("--engine")
+        engine = sys.argv[i + 1] if i + 1 < len(sys.argv) else ""
+        if engine not in ("rows", "columnar"):
+            print(f"[WARN] unknown --engine '{engine}' (use rows|columnar); using rows")
+            engine = "rows"
+    #    --workers N = shard the rules over N processes (0 = one per CPU)
+    workers = 1
+    if "--workers" in sys.argv:
+        i = sys.argv.index("--workers")
+        try:
+            workers = int(sys.argv[i + 1])
+        except (IndexError, ValueError):
+            print("[WARN] --workers expects a number; running single-process")
+    #    --profile [out.json] = per-check / per-condition timings and counts (single-process)
+    profile = {} if "--profile" in sys.argv else None
+    stats = {}  # suppression counts (then: action: ignore)
+    if engine == "columnar":
+        if profile is not None:
+            print("[WARN] --profile covers the rows engine only; ignored with --engine columnar")
+            profile = None
+        from firefind.columnar import run_engine_columnar
+        findings = run_engine_columnar(normalized, rules_path=rules_path, stats=stats)
+    else:
+        findings = run_engine(normalized, rules_path=rules_path, workers=workers, stats=stats, profile=profile)
+    print_suppressed(stats)
     print(f"Engine produced {len(findings)} findings\n")
+    if profile is not None:
+        write_profile(profile, profile_path())
+    #    --hygiene = also report shadowed / redundant / duplicate rules (cross-rule, input order = policy order)
+    if "--hygiene" in sys.argv:
+        from firefind.duplicates import find_duplicates
+        from firefind.policy_analysis import analyze_policy
+        hstats, dstats = {}, {}
+        findings += analyze_policy(normalized, hstats)
+        findings += find_duplicates(normalized, dstats)
+        print(f"Hygiene: {hstats['shadowed']} shadowed, {hstats['redundant']} redundant, "
+              f"{dstats['duplicates']} duplicates, {dstats['conflicts']} conflicting, "
+              f"{dstats['near_duplicates']} near duplicates "
+              f"of {hstats['rules']} rules\n")
+    if validate_mode:
+        print_report(validate_batch(findings, kind="finding", mode=validate_mode), "findings")
 
     # 3) quick human summary
     by_check = {}
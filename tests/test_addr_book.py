@@ -0,0 +1,63 @@
+# tests/test_addr_book.py
+import json
+from firefind.addr_book import load_addr_book, parse_network
+from firefind.normalized import NormalizedRule
+from firefind.rules_loader import enrich_rule
+from firefind.v01 import to_v01
+
+
+def test_parse_network_literals():
+    assert parse_network("10.1.1.0 255.255.255.0") == "10.1.1.0/24"
+    assert parse_network("IP/Netmask: 10.1.1.0/255.255.255.0") == "10.1.1.0/24"
+    assert parse_network("10.0.0.9 - 10.0.0.1") == "10.0.0.1-10.0.0.9"
+    assert parse_network("CLIENT1_AllNets") is None
+    assert parse_network("example.com") is None
+
+
+def test_nested_groups_resolved_at_normalization(tmp_path, monkeypatch):
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", "off")
+    objs = tmp_path / "addresses.csv"
+    objs.write_text(
+        "Name,Type,Address,Netmask\n"
+        "Net_A,subnet,10.1.0.0,255.255.0.0\n"
+        "Host_B,host,10.2.0.5,\n"
+        "Web_FQDN,fqdn,www.example.com,\n"
+    )
+    groups = tmp_path / "groups.json"
+    groups.write_text(json.dumps({
+        "CLIENT1_AllNets": {"members": ["Net_A", "GRP_Inner"]},
+        "GRP_Inner": ["Host_B", "Web_FQDN", "CLIENT1_AllNets"],  # cycle back to the outer group
+    }))
+    book = load_addr_book([str(objs), str(groups)])
+    assert book["client1_allnets"] == ("10.1.0.0/16", "10.2.0.5/32")
+    # both groups of the cycle get the same members, whichever is defined first
+    assert set(book["grp_inner"]) == set(book["client1_allnets"])
+    groups.write_text(json.dumps({
+        "GRP_Inner": ["Host_B", "Web_FQDN", "CLIENT1_AllNets"],
+        "CLIENT1_AllNets": {"members": ["Net_A", "GRP_Inner"]},
+    }))
+    swapped = load_addr_book([str(objs), str(groups)])
+    for name in ("client1_allnets", "grp_inner"):
+        assert set(swapped[name]) == {"10.1.0.0/16", "10.2.0.5/32"}
+
+    flat = {"vendor": "fortinet", "rule_id": "1", "src": "Group Member (2): CLIENT1_AllNets",
+            "dst": "8.8.8.8", "service": "dns", "action": "accept", "reason": "", "severity": ""}
+    v = to_v01(flat, addr_book=book)
+    assert v["src_addrs"] == ["CLIENT1_AllNets"]
+    assert v["src_nets"] == ["10.1.0.0/16", "10.2.0.5/32"]
+    assert v["dst_nets"] == ["8.8.8.8/32"]
+    assert NormalizedRule.from_v01(v).to_v01() == v
+
+    row = enrich_rule(v)
+    assert row["src"]["cidr"] == ["10.1.0.0/16", "10.2.0.5/32"]
+    assert row["src"]["max_prefix_len"] == 16
+
+
+def test_deeply_nested_groups_do_not_hit_the_recursion_limit():
+    import sys
+    from firefind.object_export import flatten_groups
+    depth = sys.getrecursionlimit() + 500
+    defs = {f"g{i}": [f"g{i + 1}"] for i in range(depth)}
+    defs[f"g{depth}"] = ["10.0.0.1", f"g{depth - 1}"]   # plus a cycle at the bottom
+    flat = flatten_groups(defs, lambda spec: [spec], "address")
+    assert flat["g0"] == flat[f"g{depth // 2}"] == flat[f"g{depth}"] == ("10.0.0.1",)
@@ -0,0 +1,39 @@
+# tests/test_cache.py
+import os
+import time
+from pathlib import Path
+from firefind import cache
+
+
+def test_default_dir_is_per_user(monkeypatch, tmp_path):
+    monkeypatch.delenv("FIREFIND_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert cache.cache_dir() == tmp_path / "xdg" / "firefind"
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.delenv("LOCALAPPDATA", raising=False)
+    assert cache.cache_dir() == Path.home() / ".cache" / "firefind"
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", "off")
+    assert cache.cache_dir() is None
+
+
+def test_round_trip_and_shared_dir_is_not_read(tmp_path):
+    cache.store_artifact("rules", "k1", {"a": 1})
+    assert cache.load_artifact("rules", "k1") == {"a": 1}
+    if os.name == "posix":
+        d = cache.cache_dir()
+        os.chmod(d, 0o777)  # anyone could have planted the pickle
+        assert cache.load_artifact("rules", "k1") is None
+
+
+def test_prune_by_age_then_size(tmp_path):
+    d = tmp_path / "c"
+    d.mkdir()
+    now = time.time()
+    for i, age in enumerate([90, 40, 20, 10]):  # days
+        p = d / f"rules-{i}.pkl"
+        p.write_bytes(b"x" * 100)
+        os.utime(p, (now - age * 86400, now - age * 86400))
+    assert cache.prune(d, max_age=60 * 86400, max_bytes=10_000) == 1
+    assert sorted(p.name for p in d.iterdir()) == ["rules-1.pkl", "rules-2.pkl", "rules-3.pkl"]
+    assert cache.prune(d, max_age=60 * 86400, max_bytes=150) == 2  # least recently used go first
+    assert [p.name for p in d.iterdir()] == ["rules-3.pkl"]
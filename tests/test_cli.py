@@ -0,0 +1,18 @@
+# tests/test_cli.py
+import csv
+import pathlib
+from firefind import cli
+
+ROOT = pathlib.Path(__file__).parent.parent
+RULES_YML = str(ROOT / "docs" / "rules.yml")
+
+
+def test_batch_cli_reads_xlsx_and_csv(tmp_path, monkeypatch):
+    for name in ("xlsx-files/inside_fw01.xlsx", "csv-files/Firewall_Policy-INSIDE-FW01.csv"):
+        src = ROOT / "sample_data" / name
+        out = tmp_path / src.stem
+        monkeypatch.setattr("sys.argv", ["firefind", "-i", str(src), "-o", str(out), "--rules", RULES_YML])
+        assert cli.main() == 0
+        with (out / f"{src.stem}.findings.csv").open(encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert rows and all(r["check_id"] for r in rows)
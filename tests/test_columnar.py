@@ -0,0 +1,47 @@
+# tests/test_columnar.py
+import pathlib
+import pytest
+from firefind import risk_engine
+from firefind.v01 import to_v01
+
+pytest.importorskip("numpy")
+from firefind.columnar import run_engine_columnar  # noqa: E402
+
+RULES_YML = str(pathlib.Path(__file__).parent.parent / "docs" / "rules.yml")
+
+
+def _rule(rule_id, src="All_Internet", dst="10.0.0.0/24", service="ssh", action="accept"):
+    return to_v01({"vendor": "fortinet", "rule_id": rule_id, "src": src, "dst": dst,
+                   "service": service, "action": action, "reason": "", "severity": ""})
+
+
+RULES = [
+    _rule("1"),
+    _rule("2", service="ALL"),
+    _rule("3", src="CLIENT1_AllNets", service="http"),
+    _rule("4", service="tcp_3389", action="deny"),
+    _rule("5", service="telnet, smtp"),
+    _rule("6", src="10.1.0.0/16", dst="any", service="tcp_3000-3500"),
+    _rule("7", service="icmp"),
+    _rule("8", src="any", dst="any", service="ALL"),
+    _rule("9", src="10.0.0.1", dst="192.168.1.0/24", service="DHCP"),
+]
+
+
+@pytest.mark.parametrize("batch_size", [2, 1000])
+def test_columnar_matches_row_engine(batch_size):
+    expected = risk_engine.run_engine(RULES, rules_path=RULES_YML)
+    assert expected
+    assert run_engine_columnar(RULES, rules_path=RULES_YML, batch_size=batch_size) == expected
+
+
+def test_columnar_empty_input():
+    assert run_engine_columnar([], rules_path=RULES_YML) == []
+
+
+def test_columnar_suppression_stats_match():
+    rules = RULES + [_rule("int", src="10.1.0.0/16", dst="10.2.0.0/16", service="ALL")]
+    row_stats, col_stats = {}, {}
+    expected = risk_engine.run_engine(rules, rules_path=RULES_YML, stats=row_stats)
+    assert run_engine_columnar(rules, rules_path=RULES_YML, stats=col_stats) == expected
+    assert col_stats == row_stats and row_stats["suppressed"] >= 1
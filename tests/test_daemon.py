@@ -0,0 +1,80 @@
+# tests/test_daemon.py
+import pathlib
+from firefind import risk_engine
+from firefind.daemon import EngineDaemon
+from firefind.v01 import to_v01
+
+RULES_YML = pathlib.Path(__file__).parent.parent / "docs" / "rules.yml"
+
+
+def _rule(rule_id, src="All_Internet", dst="10.0.0.0/24", service="ssh", action="accept"):
+    return to_v01({"vendor": "fortinet", "rule_id": rule_id, "src": src, "dst": dst,
+                   "service": service, "action": action, "reason": "", "severity": ""})
+
+
+RULES = [
+    _rule("1"),
+    _rule("2", service="ALL"),
+    _rule("3", src="CLIENT1_AllNets", service="http"),
+    _rule("4", src="10.1.0.0/16", dst="10.2.0.0/16", service="ALL"),
+    _rule("5", src="Outside", service="telnet, smtp"),
+]
+
+
+def _daemon(tmp_path):
+    path = tmp_path / "rules.yml"
+    path.write_text(RULES_YML.read_text(encoding="utf-8"), encoding="utf-8")
+    return path, EngineDaemon(str(path), RULES)
+
+
+def test_initial_findings_match_run_engine(tmp_path):
+    path, d = _daemon(tmp_path)
+    assert d.findings() == risk_engine.run_engine(RULES, rules_path=str(path))
+    assert d.poll() is None  # nothing changed
+
+
+def test_set_change_reruns_only_checks_using_it(tmp_path):
+    path, d = _daemon(tmp_path)
+    text = path.read_text(encoding="utf-8").replace('"Outside",', "", 1)
+    path.write_text(text, encoding="utf-8")
+    delta = d.reload()
+    assert "R-ADMIN-OPEN" in delta["changed_checks"]
+    assert "R-WIDE-PORT-SPAN" not in delta["changed_checks"]  # doesn't use internet_like
+    assert {f["rule_id"] for f in delta["removed"]} == {"5"}
+    assert not delta["added"]
+    assert d.findings() == risk_engine.run_engine(RULES, rules_path=str(path))
+
+
+def test_dropping_a_suppression_check_releases_its_rules(tmp_path):
+    path, d = _daemon(tmp_path)
+    assert not any(f["rule_id"] == "4" for f in d.findings())
+    text = path.read_text(encoding="utf-8")
+    start = text.index("  - id: R-IGNORE-INTERNAL-ANY-ANY")
+    end = text.index("  - id: R-IGNORE-INTERNAL-HTTP")
+    path.write_text(text[:start] + text[end:], encoding="utf-8")
+    delta = d.reload()
+    assert delta["changed_checks"] == ["R-IGNORE-INTERNAL-ANY-ANY"]
+    assert {f["rule_id"] for f in delta["added"]} == {"4"}
+    assert d.findings() == risk_engine.run_engine(RULES, rules_path=str(path))
+
+
+def test_broken_file_keeps_previous_checks(tmp_path, capsys):
+    path, d = _daemon(tmp_path)
+    before = d.findings()
+    path.write_text("rules: [", encoding="utf-8")
+    assert d.poll() is None
+    assert d.findings() == before
+    assert "[WARN]" in capsys.readouterr().err
+
+
+def test_suppression_check_turned_into_a_normal_check(tmp_path):
+    path, d = _daemon(tmp_path)
+    text = path.read_text(encoding="utf-8")
+    start = text.index("  - id: R-IGNORE-INTERNAL-ANY-ANY")
+    end = text.index("  - id: R-IGNORE-INTERNAL-HTTP")
+    block = text[start:end].replace("    then:\n      action: ignore\n", "")
+    path.write_text(text[:start] + block + text[end:], encoding="utf-8")
+    delta = d.reload()
+    assert delta["changed_checks"] == ["R-IGNORE-INTERNAL-ANY-ANY"]
+    assert d.findings() == risk_engine.run_engine(RULES, rules_path=str(path))
+    assert ("4", "R-IGNORE-INTERNAL-ANY-ANY") in {(f["rule_id"], f["check_id"]) for f in d.findings()}
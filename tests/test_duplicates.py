@@ -0,0 +1,77 @@
+# tests/test_duplicates.py
+import pathlib
+from firefind import risk_engine, rules_loader
+from firefind.duplicates import canonical_key, find_duplicates, match_key_fn
+from firefind.v01 import to_v01
+
+RULES_YML = str(pathlib.Path(__file__).parent.parent / "docs" / "rules.yml")
+
+
+def _r(rule_id, src, dst, services, action="allow", enabled=True):
+    return {"rule_id": rule_id, "vendor": "x", "enabled": enabled, "action": action,
+            "src_addrs": src, "dst_addrs": dst, "services": services, "raw": {}}
+
+
+def _tcp(*ports):
+    return [{"protocol": "tcp", "ports": [{"from": lo, "to": hi} for lo, hi in ports]}]
+
+
+def _ids(findings):
+    return [(f["rule_id"], f["check_id"], f["evidence"]["related_rule_id"]) for f in findings]
+
+
+def test_canonical_key_ignores_order_and_split_ranges():
+    a = _r("a", ["B", "A"], ["any"], _tcp((80, 80), (81, 90)), action="drop")
+    b = _r("b", ["A", "B", "A"], ["ALL"], _tcp((80, 90)), action="deny")
+    assert canonical_key(a) == canonical_key(b)
+
+
+def test_exact_and_near_duplicates():
+    rules = [
+        _r("1", ["A"], ["B"], _tcp((22, 22))),
+        _r("2", ["A"], ["B"], _tcp((22, 22))),              # exact copy of 1
+        _r("3", ["A"], ["C"], _tcp((22, 22))),              # 1 with another dst
+        _r("4", ["A"], ["C"], _tcp((22, 22)), enabled=False),
+        _r("5", ["A"], ["B"], _tcp((22, 22)), action="deny"),  # 1 with another action
+        _r("6", ["X"], ["Y"], _tcp((443, 443))),
+        _r("7", ["A"], ["C"], _tcp((22, 22)), action="deny"),  # 3 with another action, 5 with another dst
+    ]
+    stats = {}
+    found = find_duplicates(rules, stats)
+    assert _ids(found) == [
+        ("2", "P-DUPLICATE", "1"), ("3", "P-NEAR-DUPLICATE", "1"), ("5", "P-CONFLICTING-DUPLICATE", "1"),
+        ("7", "P-CONFLICTING-DUPLICATE", "3")]
+    assert found[2]["severity"] == "medium"
+    assert found[2]["reason"] == "Same traffic as rule 1, but deny instead of allow."
+    assert stats == {"rules": 6, "distinct": 5, "duplicates": 1, "conflicts": 2, "near_duplicates": 1}
+
+
+def _v01(rule_id, src="All_Internet", service="ssh", comments=None):
+    d = to_v01({"vendor": "fortinet", "rule_id": rule_id, "src": src, "dst": "10.0.0.0/24",
+                "service": service, "action": "accept", "reason": "", "severity": ""})
+    d["comments"] = comments
+    return d
+
+
+def test_match_key_covers_fields_the_checks_read():
+    checks = rules_loader.load_rules(RULES_YML)
+    key = match_key_fn(checks)
+    assert key(_v01("1")) == key(_v01("2", comments="copy"))   # id/comments aren't read by any check
+    assert key(_v01("1")) != key(_v01("1", service="rdp"))
+    cond = {"field": "comments", "op": "ilike_any", "value": ["temp"]}
+    node = rules_loader.compile_node(cond, checks[0]["sets"])
+    assert match_key_fn([{"node": node}])(_v01("1")) != match_key_fn([{"node": node}])(_v01("2", comments="temp"))
+
+
+def test_engine_dedupe_keeps_every_finding():
+    rules = [_v01(str(i), src=src, service=svc)
+             for i, (src, svc) in enumerate([("All_Internet", "ssh"), ("10.1.0.0/16", "ALL"),
+                                             ("Outside", "telnet, smtp")] * 5)]
+    rules += [_v01("back", src="10.0.0.0/24", service="ssh")]
+    rules[-1]["dst_addrs"] = ["All_Internet"]   # reciprocal partner of the ssh copies
+    plain = risk_engine.run_engine(rules, rules_path=RULES_YML, dedupe=False)
+    assert risk_engine.run_engine(rules, rules_path=RULES_YML) == plain
+    stats, plain_stats = {}, {}
+    risk_engine.run_engine(rules, rules_path=RULES_YML, stats=stats)
+    risk_engine.run_engine(rules, rules_path=RULES_YML, stats=plain_stats, dedupe=False)
+    assert stats == plain_stats
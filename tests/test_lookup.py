@@ -0,0 +1,89 @@
+# tests/test_lookup.py
+import pytest
+from firefind import cli
+from firefind.lookup import PolicyLookup
+
+
+def _r(rule_id, src, dst, services, action="allow", enabled=True, **extra):
+    return dict({"rule_id": rule_id, "vendor": "x", "enabled": enabled, "action": action,
+                 "src_addrs": src, "dst_addrs": dst, "services": services, "raw": {}}, **extra)
+
+
+def _tcp(*ports):
+    return [{"protocol": "tcp", "ports": [{"from": lo, "to": hi} for lo, hi in ports]}]
+
+
+POLICY = [
+    _r("off", ["any"], ["any"], [{"protocol": "any", "ports": []}], enabled=False),
+    _r("ssh-block", ["10.1.0.0/16"], ["192.168.1.0/24"], _tcp((22, 22)), action="deny"),
+    _r("mgmt", ["10.0.0.0/8"], ["192.168.1.5-192.168.1.9"], _tcp((22, 23), (3389, 3389))),
+    _r("web", ["any"], ["DMZ", "192.168.0.0/16"], _tcp((80, 80), (443, 443))),
+    _r("ping", ["LAN"], ["any"], [{"protocol": "icmp", "ports": []}]),
+    _r("v6", ["fd00::/8"], ["any"], [{"protocol": "udp", "ports": []}]),
+    _r("booked", ["Branch"], ["any"], _tcp((8080, 8080)), src_nets=["172.16.0.0/12"]),
+    _r("cleanup", ["any"], ["any"], [{"protocol": "any", "ports": []}], action="deny"),
+]
+
+
+@pytest.mark.parametrize("flow, first", [
+    (("10.1.2.3", "192.168.1.7", "tcp", 22), "ssh-block"),
+    (("10.2.2.3", "192.168.1.7", "tcp", 22), "mgmt"),
+    (("10.2.2.3", "192.168.1.10", "tcp", 22), "cleanup"),
+    (("10.2.2.3", "192.168.1.7", "tcp", 3389), "mgmt"),
+    (("8.8.8.8", "DMZ", "tcp", 443), "web"),
+    (("8.8.8.8", "DMZ", "tcp", 444), "cleanup"),
+    (("LAN", "8.8.8.8", "icmp", None), "ping"),
+    (("fd00::1", "2001:db8::1", "udp", 53), "v6"),
+    (("172.20.0.1", "1.1.1.1", "tcp", 8080), "booked"),     # via src_nets
+    (("Branch", "1.1.1.1", "tcp", 8080), "booked"),         # via the object name
+])
+def test_first_match(flow, first):
+    assert PolicyLookup(POLICY).first_match(*flow)["rule_id"] == first
+
+
+def test_all_matches_in_policy_order_and_default():
+    policy = PolicyLookup(POLICY)
+    assert [r["rule_id"] for r in policy.all_matches("10.1.2.3", "192.168.1.7", "tcp", 22)] == \
+        ["ssh-block", "mgmt", "cleanup"]
+    assert PolicyLookup(POLICY[:-1]).first_match("8.8.8.8", "9.9.9.9", "tcp", 25) is None
+
+
+def test_cli_lookup_subcommand(tmp_path, monkeypatch, capsys):
+    import json
+    path = tmp_path / "policy.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in POLICY), encoding="utf-8")
+    monkeypatch.setattr("sys.argv", ["firefind", "lookup", str(path), "--src", "10.2.0.1",
+                                     "--dst", "192.168.1.6", "--port", "23"])
+    assert cli.main() == 0
+    assert json.loads(capsys.readouterr().out)["rule_id"] == "mgmt"
+
+
+def test_sparse_keys_stay_small_and_agree_with_a_scan():
+    import random
+    random.seed(7)
+    rules = []
+    for i in range(3000):
+        lo = random.randint(1, 60000)
+        rules.append(_r(str(i), [f"10.{i >> 8}.{i & 255}.{random.randint(1, 254)}"],
+                        [random.choice(["any", "192.168.0.0/16", f"172.16.{i % 256}.0/24"])],
+                        _tcp((lo, lo + random.choice([0, 10, 3000])))))
+    policy = PolicyLookup(rules)
+    # one rule's /32 or port block must not cost a bitset as wide as the policy
+    postings = [policy.src.prefix, policy.dst.prefix, policy.ports["tcp"].blocks]
+    assert sum(bits.bit_length() for p in postings for _, bits in p.dense.values()) < 64 * len(rules)
+
+    def naive(src, dst, port):
+        for r in rules:
+            lo, hi = r["services"][0]["ports"][0]["from"], r["services"][0]["ports"][0]["to"]
+            d = r["dst_addrs"][0]
+            if (src == r["src_addrs"][0] and lo <= port <= hi
+                    and (d == "any" or (d.startswith("192.168.") and dst.startswith("192.168."))
+                         or (d.startswith("172.16.") and dst.startswith(d[:d.rindex(".")] + ".")))):
+                return r["rule_id"]
+        return None
+
+    for r in random.sample(rules, 300):
+        src, port = r["src_addrs"][0], r["services"][0]["ports"][0]["from"] + random.randint(0, 20)
+        dst = random.choice(["192.168.4.4", "172.16.3.9", "8.8.8.8"])
+        got = policy.first_match(src, dst, "tcp", port)
+        assert (got and got["rule_id"]) == naive(src, dst, port)
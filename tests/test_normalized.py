@@ -0,0 +1,66 @@
+# tests/test_normalized.py
+import pytest
+from firefind.v01 import to_v01
+from firefind.normalized import NormalizedRule, Action, Protocol, addr_key, coalesce_intervals, service_key
+from firefind.risk_engine import make_finding
+
+FLAT = {
+    "vendor": "fortinet", "rule_id": "7", "src": "CLIENT1_AllNets",
+    "dst": "All_Internet", "service": "HTTP, HTTPS, tcp_8006-8007, PING",
+    "action": "accept", "reason": "web out", "severity": "",
+}
+
+
+def test_round_trip_v01():
+    d = to_v01(FLAT)
+    nr = NormalizedRule.from_v01(d)
+    assert nr.action is Action.ALLOW
+    assert nr.services[0][0] is Protocol.TCP
+    assert isinstance(nr.src_addrs, tuple)
+    assert nr.to_v01() == d
+    assert dict(nr) == d
+
+
+def test_mapping_view_feeds_engine_helpers():
+    d = to_v01(FLAT)
+    nr = NormalizedRule.from_v01(d)
+    chk = {"id": "R-X", "name": "x", "severity": "low", "rationale": "r"}
+    assert make_finding(nr, chk, "r") == make_finding(d, chk, "r")
+
+
+def test_extra_keys_survive_round_trip():
+    d = dict(to_v01(FLAT), custom={"a": 1})
+    assert NormalizedRule.from_v01(d).to_v01() == d
+
+
+def test_invalid_protocol_rejected():
+    d = to_v01(FLAT)
+    d["services"] = [{"protocol": "sctp", "ports": []}]
+    with pytest.raises(ValueError):
+        NormalizedRule.from_v01(d)
+
+
+def test_coalesce_and_port_intervals():
+    assert coalesce_intervals([(80, 80), (79, 79), (100, 200), (150, 300)]) == ((79, 80), (100, 300))
+    nr = NormalizedRule.from_v01(to_v01(FLAT))
+    assert nr.port_intervals(Protocol.TCP) == ((80, 80), (443, 443), (8006, 8007))
+
+
+def test_addr_and_service_keys_ignore_order():
+    assert addr_key(["B", "A", "B", "ANY"]) == ("A", "B", "any")
+    a = [{"protocol": "tcp", "ports": [{"from": 443, "to": 443}, {"from": 80, "to": 80}]},
+         {"protocol": "tcp", "ports": [{"from": 81, "to": 81}]}, {"protocol": "icmp", "ports": []}]
+    b = [{"protocol": "icmp", "ports": []}, {"protocol": "tcp", "ports": [{"from": 80, "to": 81}, {"from": 443, "to": 443}]}]
+    assert service_key(a) == service_key(b) == (("icmp", ()), ("tcp", ((80, 81), (443, 443))))
+    assert service_key([{"protocol": "udp", "ports": []}]) == (("udp", ((0, 65535),)),)
+    assert service_key(b + [{"protocol": "any", "ports": []}]) == (("any", ()),)
+
+
+def test_services_coalesced_once_and_views_shared():
+    d = to_v01(dict(FLAT, service="tcp_20, tcp_21, HTTP"))
+    a, b = NormalizedRule.from_v01(d), NormalizedRule.from_v01(dict(d, rule_id="8"))
+    assert a.services == ((Protocol.TCP, ((20, 21), (80, 80))),)
+    assert a.services is b.services                      # one copy per distinct service set
+    assert a["services"] is b["services"]               # cached v0.1 view
+    assert a["services"] == [{"protocol": "tcp", "ports": [{"from": 20, "to": 21}, {"from": 80, "to": 80}]}]
+    assert a["raw"] == d["raw"] and a.raw[0] is b.raw[0]  # raw keys shared, dict rebuilt on access
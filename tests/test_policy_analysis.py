@@ -0,0 +1,107 @@
+# tests/test_policy_analysis.py
+import pytest
+from firefind.policy_analysis import PolicyIndex, RuleBox, analyze_policy
+from firefind.validate import validate_batch
+
+
+def _r(rule_id, src, dst, services, action="allow", enabled=True):
+    return {"rule_id": rule_id, "vendor": "x", "enabled": enabled, "action": action,
+            "src_addrs": src, "dst_addrs": dst, "services": services, "raw": {}}
+
+
+SSH = [{"protocol": "tcp", "ports": [{"from": 22, "to": 22}]}]
+LOW_TCP = [{"protocol": "tcp", "ports": [{"from": 1, "to": 1024}]}]
+ANY = [{"protocol": "any", "ports": []}]
+
+
+def _ids(findings):
+    return [(f["rule_id"], f["check_id"], f["severity"], f["evidence"]["related_rule_id"]) for f in findings]
+
+
+def test_shadowed_by_wider_earlier_rule():
+    rules = [
+        _r("1", ["10.0.0.0/8"], ["LAN"], LOW_TCP, action="deny"),
+        _r("2", ["10.1.2.0/24", "10.3.0.1-10.3.0.9"], ["LAN"], SSH),   # conflicting shadow
+        _r("3", ["10.1.2.0/24"], ["LAN", "DMZ"], SSH),                 # DMZ not covered
+        _r("4", ["any"], ["LAN"], SSH, action="deny"),                 # 'any' src not covered
+        _r("5", ["10.9.9.9"], ["LAN"], SSH, action="deny"),            # same action
+    ]
+    assert _ids(analyze_policy(rules)) == [("2", "P-SHADOWED", "high", "1"), ("5", "P-SHADOWED", "medium", "1")]
+
+
+def test_redundant_with_later_rule_unless_a_conflict_sits_between():
+    rules = [
+        _r("1", ["10.1.0.0/16"], ["DMZ"], SSH),
+        _r("2", ["10.2.0.0/16"], ["DMZ"], SSH),
+        _r("3", ["10.2.5.0/24"], ["DMZ"], LOW_TCP, action="deny"),     # overlaps 2, not 1
+        _r("4", ["10.0.0.0/8"], ["DMZ"], ANY),
+    ]
+    stats = {}
+    assert _ids(analyze_policy(rules, stats)) == [("1", "P-REDUNDANT", "low", "4")]
+    assert stats == {"rules": 4, "shadowed": 0, "redundant": 1}
+
+
+def test_disabled_and_unparseable_rules_are_skipped():
+    rules = [
+        _r("1", ["any"], ["any"], ANY, enabled=False),
+        _r("2", [], ["LAN"], SSH),
+        _r("3", ["LAN"], ["DMZ"], SSH),
+    ]
+    assert analyze_policy(rules) == []
+    assert [b.rule["rule_id"] for b in PolicyIndex(rules).boxes] == ["3"]
+
+
+def test_findings_follow_the_findings_schema():
+    rules = [_r("1", ["any"], ["any"], ANY), _r("2", ["fd00::1"], ["LAN"], [{"protocol": "icmp", "ports": []}])]
+    findings = analyze_policy(rules)
+    assert _ids(findings) == [("2", "P-SHADOWED", "medium", "1")]
+    assert validate_batch(findings, kind="finding", mode="full")["invalid_count"] == 0
+
+
+@pytest.mark.parametrize("shape", ["ports", "ranges"])
+def test_box_tests_grow_linearly(shape, monkeypatch):
+    # all-tcp rules on distinct ports, or distinct a-b source ranges: a pairwise scan
+    # would do ~n^2 box tests; the posting lists keep it near n
+    def policy(n):
+        out = []
+        for i in range(n):
+            action = "allow" if i % 2 else "deny"
+            if shape == "ports":
+                out.append(_r(str(i), ["any"], ["any"],
+                              [{"protocol": "tcp", "ports": [{"from": i + 1, "to": i + 1}]}], action=action))
+            else:
+                src = f"10.{i >> 8}.{i & 255}.1-10.{i >> 8}.{i & 255}.{2 + i % 200}"
+                out.append(_r(str(i), [src], ["any"], ANY, action=action))
+        return out
+
+    calls = [0]
+    covers, overlaps = RuleBox.covers, RuleBox.overlaps
+    monkeypatch.setattr(RuleBox, "covers", lambda a, b: calls.__setitem__(0, calls[0] + 1) or covers(a, b))
+    monkeypatch.setattr(RuleBox, "overlaps", lambda a, b: calls.__setitem__(0, calls[0] + 1) or overlaps(a, b))
+    counts = []
+    for n in (500, 2000):
+        calls[0] = 0
+        assert analyze_policy(policy(n)) == []
+        counts.append(calls[0])
+    assert counts[1] < 6 * max(counts[0], 1)
+
+
+def test_drop_and_deny_are_the_same_action():
+    rules = [
+        _r("1", ["10.0.0.0/8"], ["LAN"], LOW_TCP, action="deny"),
+        _r("2", ["10.1.0.0/16"], ["LAN"], SSH, action="drop"),        # same outcome: not "high"
+        _r("3", ["10.2.0.0/16"], ["DMZ"], SSH, action="reject"),
+        _r("4", ["10.0.0.0/8"], ["DMZ"], ANY, action="deny"),          # covers 3 with the same outcome
+    ]
+    assert _ids(analyze_policy(rules)) == [("2", "P-SHADOWED", "medium", "1"), ("3", "P-REDUNDANT", "low", "4")]
+
+
+def test_object_names_may_overlap_ip_rules():
+    rules = [
+        _r("1", ["10.1.0.0/16"], ["DMZ"], SSH),
+        _r("2", ["Branch"], ["DMZ"], SSH, action="deny"),   # Branch may be inside 10.1.0.0/16
+        _r("3", ["10.0.0.0/8"], ["DMZ"], ANY),
+    ]
+    assert analyze_policy(rules) == []
+    rules[1]["src_addrs"] = ["192.168.0.0/16"]              # IPs on both sides: provably disjoint
+    assert _ids(analyze_policy(rules)) == [("1", "P-REDUNDANT", "low", "3")]
@@ -0,0 +1,71 @@
+# tests/test_profiling.py
+import json
+import pathlib
+from firefind import risk_engine
+from firefind.profiling import Profiler
+from firefind.rules_loader import SetTable, compile_node, enrich_rule
+from firefind.v01 import to_v01
+
+RULES_YML = str(pathlib.Path(__file__).parent.parent / "docs" / "rules.yml")
+
+
+def _rule(rule_id, service="ssh", action="accept"):
+    return to_v01({"vendor": "fortinet", "rule_id": rule_id, "src": "All_Internet", "dst": "10.0.0.0/24",
+                   "service": service, "action": action, "reason": "", "severity": ""})
+
+
+RULES = [_rule(str(i), service=svc, action=act)
+         for i, (svc, act) in enumerate(
+             [("ssh", "accept"), ("ALL", "accept"), ("http", "deny"), ("tcp_3389", "accept")] * 5)]
+
+
+def test_counts_and_short_circuit_depth():
+    node = compile_node({"all": [
+        {"field": "action", "op": "equals", "value": "deny"},
+        {"field": "service.any", "op": "is_false"},
+    ]}, SetTable({}, {}, {}))
+    chk = {"id": "C1", "node": node, "rationale": "why"}
+    chk["match"] = lambda row: (node.fn(row), "")
+    original = node.fn
+    rows = [enrich_rule(r) for r in RULES]
+    expected = [original(r) for r in rows]
+
+    prof = Profiler()
+    prof.attach([chk])
+    assert [chk["match"](r)[0] for r in rows] == expected
+    report = prof.report(rules=len(rows))
+    prof.detach()
+    assert node.fn is original
+
+    assert report["checks"][0]["id"] == "C1"
+    assert (report["checks"][0]["evals"], report["checks"][0]["matches"]) == (20, 5)
+    by_kind = {c["kind"]: c for c in report["conditions"] if c["kind"] == "all"}
+    # deny is true for 5 of 20 rows -> 15 stop after the first child, 5 go on to the second
+    assert by_kind["all"]["avg_depth"] == 1.25 and by_kind["all"]["width"] == 2
+    leaves = {json.dumps(c["cond"], sort_keys=True): c for c in report["conditions"] if c["kind"] == "leaf"}
+    assert leaves['{"field": "service.any", "op": "is_false"}']["evals"] == 5
+    json.dumps(report)
+
+
+def test_profiled_run_gives_same_findings():
+    plain = risk_engine.run_engine(RULES, rules_path=RULES_YML)
+    profile = {}
+    assert risk_engine.run_engine(RULES, rules_path=RULES_YML, profile=profile) == plain
+    assert profile["rules"] == len(RULES)
+    ids = {c["id"] for c in profile["checks"]}
+    assert {f["check_id"] for f in plain} <= ids
+    times = [c["time_s"] for c in profile["checks"]]
+    assert times == sorted(times, reverse=True)
+    # 4 distinct rules (dedupe); shared sub-conditions count real evaluations, not memo hits
+    assert max(c["evals"] for c in profile["conditions"]) <= 4
+
+
+def test_profiler_detached_when_iteration_stops_early(monkeypatch):
+    detached = []
+    monkeypatch.setattr(Profiler, "detach", lambda self: detached.append(self))
+    profile = {}
+    it = risk_engine.iter_engine(iter(RULES), rules_path=RULES_YML, profile=profile)
+    next(it)
+    assert not detached
+    it.close()   # what `break` out of a for loop does
+    assert len(detached) == 1 and "checks" in profile
@@ -0,0 +1,105 @@
+# tests/test_replay.py
+import json
+
+import pytest
+
+from firefind.lookup import PolicyLookup
+from firefind.replay import iter_flows, replay, unused_findings, with_hit_counts
+
+
+def _r(rule_id, src, dst, services, action="allow", enabled=True):
+    return {"rule_id": rule_id, "vendor": "x", "enabled": enabled, "action": action,
+            "src_addrs": src, "dst_addrs": dst, "services": services, "raw": {"policy_name": "p"}}
+
+
+def _tcp(*ports):
+    return [{"protocol": "tcp", "ports": [{"from": p, "to": p} for p in ports]}]
+
+
+POLICY = [
+    _r("off", ["any"], ["any"], [{"protocol": "any", "ports": []}], enabled=False),
+    _r("ssh", ["10.0.0.0/8"], ["192.168.1.0/24"], _tcp(22)),
+    _r("web", ["any"], ["192.168.0.0/16"], _tcp(80, 443)),
+    _r("dns", ["any"], ["8.8.8.8"], [{"protocol": "udp", "ports": [{"from": 53, "to": 53}]}]),
+    _r("web-dup", ["any"], ["192.168.1.0/24"], _tcp(443)),  # never wins: "web" comes first
+]
+
+FLOWS = [
+    (("10.1.1.1", "192.168.1.5", "tcp", 22), 1),
+    (("10.1.1.1", "192.168.1.5", "tcp", 22), 4),
+    (("1.2.3.4", "192.168.9.9", "tcp", 443), 1),
+    (("1.2.3.4", "192.168.1.9", "tcp", 443), 1),
+    (("1.2.3.4", "192.168.1.9", "tcp", 22), 2),   # default action
+    (("1.2.3.4", "8.8.8.8", "udp", 53), 1),
+]
+
+
+def test_replay_counts_match_naive_first_match():
+    res = replay(POLICY, FLOWS, batch_size=2)  # several batches
+    assert res.hits == [0, 5, 2, 1, 0]
+    assert (res.flows, res.unmatched) == (10, 2)
+    policy = PolicyLookup(POLICY)
+    for flow, _ in FLOWS:
+        rule = policy.first_match(*flow)
+        got = None if rule is None else rule["rule_id"]
+        assert (got is None) == (flow in res.unmatched_flows)
+
+    summary = res.summary(POLICY)
+    assert summary["unused_rules"] == ["web-dup"]
+    assert "off" not in summary["hit_counts"]
+    assert summary["top_default_flows"] == [
+        {"src": "1.2.3.4", "dst": "192.168.1.9", "proto": "tcp", "port": 22, "count": 2}]
+
+
+def test_hit_counts_reach_findings():
+    res = replay(POLICY, FLOWS)
+    counted = with_hit_counts(POLICY, res)
+    assert [r["raw"]["hit_count"] for r in counted] == res.hits
+    assert counted[1]["raw"]["policy_name"] == "p"
+    assert "hit_count" not in POLICY[1]["raw"]  # input left alone
+
+    unused = unused_findings(POLICY, res)
+    assert [f["rule_id"] for f in unused] == ["web-dup"]
+    assert unused[0]["check_id"] == "P-UNUSED"
+    assert unused[0]["evidence"]["hit_count"] == 0
+
+
+def test_iter_flows_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "flows.csv"
+    csv_path.write_text("Source,Destination,Protocol,DstPort,Packets\n"
+                        "10.1.1.1,192.168.1.5,6,22,3\n"
+                        "1.2.3.4,8.8.8.8,udp,53,\n"
+                        ",8.8.8.8,udp,53,1\n"
+                        "1.2.3.4,8.8.4.4,1,,\n", encoding="utf-8")
+    assert list(iter_flows(str(csv_path))) == [
+        (("10.1.1.1", "192.168.1.5", "tcp", 22), 3),
+        (("1.2.3.4", "8.8.8.8", "udp", 53), 1),
+        (("1.2.3.4", "8.8.4.4", "icmp", None), 1),
+    ]
+    jl = tmp_path / "flows.jsonl"
+    jl.write_text(json.dumps({"src_ip": "10.1.1.1", "dst_ip": "192.168.1.5", "dst_port": 22}) + "\n\n",
+                  encoding="utf-8")
+    assert list(iter_flows(str(jl))) == [(("10.1.1.1", "192.168.1.5", "tcp", 22), 1)]
+
+
+def test_summary_adds_up_repeated_rule_ids():
+    rules = [_r("a", ["any"], ["10.0.0.1"], _tcp(22)), _r("a", ["any"], ["10.0.0.2"], _tcp(22)),
+             _r("b", ["any"], ["10.0.0.3"], _tcp(22))]
+    res = replay(rules, [(("1.1.1.1", "10.0.0.2", "tcp", 22), 3)])
+    summary = res.summary(rules)
+    assert summary["hit_counts"] == {"a": 3, "b": 0}
+    assert summary["unused_rules"] == ["b"]
+
+
+def test_iter_flows_bad_rows(tmp_path):
+    jl = tmp_path / "flows.jsonl"
+    jl.write_text("[1, 2]\n\"text\"\n" + json.dumps({"src": "1.2.3.4", "dst": "8.8.8.8", "port": [53]}) + "\n"
+                  + json.dumps({"src": "1.2.3.4", "dst": "8.8.8.8", "port": {"n": 1}, "proto": "udp"}) + "\n",
+                  encoding="utf-8")
+    assert list(iter_flows(str(jl))) == [(("1.2.3.4", "8.8.8.8", "tcp", None), 1),
+                                         (("1.2.3.4", "8.8.8.8", "udp", None), 1)]
+
+    csv_path = tmp_path / "flows.csv"
+    csv_path.write_text("from,to,port\n1.2.3.4,8.8.8.8,53\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="source and a destination column"):
+        list(iter_flows(str(csv_path)))
@@ -0,0 +1,112 @@
+# tests/test_risk_engine.py
+import pathlib
+import pytest
+from firefind import risk_engine, rules_loader
+from firefind.reciprocal import uses_reciprocal
+from firefind.v01 import to_v01
+
+RULES_YML = str(pathlib.Path(__file__).parent.parent / "docs" / "rules.yml")
+RECIPROCAL_YML = str(pathlib.Path(__file__).parent.parent / "docs" / "rules_reciprocal.yml")
+
+
+def _rule(rule_id, src="All_Internet", dst="10.0.0.0/24", service="ssh", action="accept"):
+    return to_v01({"vendor": "fortinet", "rule_id": rule_id, "src": src, "dst": dst,
+                   "service": service, "action": action, "reason": "", "severity": ""})
+
+
+RULES = [
+    _rule("1"),
+    _rule("2", service="ALL"),
+    _rule("3", src="CLIENT1_AllNets", service="http"),
+    _rule("4", service="tcp_3389", action="deny"),
+    _rule("5", service="telnet, smtp"),
+]
+
+
+def _reference(rules):
+    # the plain per-check predicate path (enrich inside every predicate call)
+    checks = rules_loader.load_rules(RULES_YML)
+    out = []
+    for r in rules:
+        for chk in checks:
+            ok, reason = chk["predicate"](r)
+            if ok:
+                out.append(risk_engine.make_finding(r, chk, reason))
+    return out
+
+
+def test_engine_matches_predicate_path():
+    assert risk_engine.run_engine(RULES, rules_path=RULES_YML) == _reference(RULES)
+
+
+def test_each_rule_enriched_once(monkeypatch):
+    calls = []
+    real = risk_engine.enrich_rule
+    monkeypatch.setattr(risk_engine, "enrich_rule", lambda r: calls.append(r) or real(r))
+    risk_engine.run_engine(RULES, rules_path=RULES_YML)
+    assert len(calls) == len(RULES)
+
+
+def test_sharded_engine_keeps_input_order(monkeypatch):
+    monkeypatch.setattr(risk_engine, "SHARD_SIZE", 2)
+    rules = RULES * 3
+    serial = risk_engine.run_engine(rules, rules_path=RULES_YML)
+    assert risk_engine.run_engine(rules, rules_path=RULES_YML, workers=2) == serial
+
+
+def test_resolve_workers():
+    assert risk_engine.resolve_workers(3) == 3
+    assert risk_engine.resolve_workers(-1) == 1
+    assert risk_engine.resolve_workers(0) >= 1
+
+
+def test_iter_engine_is_lazy_and_matches_run_engine(monkeypatch):
+    monkeypatch.setattr(risk_engine, "FIRST_BATCH", 5)
+    rules = RULES * 20
+    pulled = []
+
+    def source():
+        for r in rules:
+            pulled.append(r)
+            yield r
+
+    it = risk_engine.iter_engine(source(), rules_path=RULES_YML)
+    first = next(it)
+    assert len(pulled) == 5
+    assert [first] + list(it) == risk_engine.run_engine(rules, rules_path=RULES_YML)
+
+
+def test_reciprocal_rules_found_across_batches(monkeypatch):
+    monkeypatch.setattr(risk_engine, "FIRST_BATCH", 2)
+    there = _rule("there", src="10.1.0.0/16", dst="172.16.5.0/24", service="ssh")
+    back = _rule("back", src="172.16.5.0/24", dst="10.1.0.0/16", service="ssh")
+    other_svc = _rule("web-back", src="172.16.5.0/24", dst="10.1.0.0/16", service="http")
+    denied = _rule("deny-back", src="172.16.5.0/24", dst="10.1.0.0/16", service="ssh", action="deny")
+    rules = [there] + RULES + [other_svc, denied, back]
+    hits = lambda fs: [f["rule_id"] for f in fs if f["check_id"] == "R-RECIPROCAL-ALLOW"]
+    assert hits(risk_engine.iter_engine(iter(rules), rules_path=RECIPROCAL_YML)) == ["there", "back"]
+    assert hits(risk_engine._run_sharded(rules, RECIPROCAL_YML, True, True, 2)) == ["there", "back"]
+    from firefind.columnar import run_engine_columnar
+    assert hits(run_engine_columnar(rules, rules_path=RECIPROCAL_YML)) == ["there", "back"]
+    assert not uses_reciprocal(rules_loader.load_rules(RULES_YML))  # opt-in only
+
+
+def test_ignore_checks_suppress_rules_before_other_checks():
+    internal_any = _rule("int-any", src="10.1.0.0/16", dst="10.2.0.0/16", service="ALL")
+    internal_http = _rule("int-http", src="10.1.0.0/16", dst="192.168.1.0/24", service="http")
+    external_any = _rule("ext-any", src="any", dst="10.2.0.0/16", service="ALL")
+    stats = {}
+    findings = risk_engine.run_engine([internal_any, internal_http, external_any],
+                                      rules_path=RULES_YML, stats=stats)
+    assert {f["rule_id"] for f in findings} == {"ext-any"}
+    assert not any(f["check_id"].startswith("R-IGNORE") for f in findings)
+    assert stats == {"rules": 3, "suppressed": 2,
+                     "suppressed_by": {"R-IGNORE-INTERNAL-ANY-ANY": 1, "R-IGNORE-INTERNAL-HTTP": 1}}
+
+
+def test_then_block_is_validated(tmp_path):
+    bad = tmp_path / "rules.yml"
+    bad.write_text("rules:\n  - {id: X, name: x, severity: low, rationale: r,\n"
+                   "     when: {field: action, op: equals, value: allow}, then: {action: escalate}}\n")
+    with pytest.raises(ValueError, match="then"):
+        rules_loader.load_rules(str(bad))
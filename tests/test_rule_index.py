@@ -0,0 +1,57 @@
+# tests/test_rule_index.py
+import pathlib
+from firefind import risk_engine
+from firefind.rule_index import RuleIndex, plan
+from firefind.rules_loader import enrich_rule, load_rules
+from firefind.v01 import to_v01
+
+RULES_YML = str(pathlib.Path(__file__).parent.parent / "docs" / "rules.yml")
+
+
+def _rule(rule_id, src="All_Internet", dst="10.0.0.0/24", service="ssh", action="accept"):
+    return to_v01({"vendor": "fortinet", "rule_id": rule_id, "src": src, "dst": dst,
+                   "service": service, "action": action, "reason": "", "severity": ""})
+
+
+RULES = [
+    _rule("1"),
+    _rule("2", service="ALL"),
+    _rule("3", src="CLIENT1_AllNets", service="http"),
+    _rule("4", service="tcp_3389", action="deny"),
+    _rule("5", service="telnet, smtp"),
+    _rule("6", src="10.1.0.0/16", service="tcp_3000-3500"),
+    _rule("7", service="icmp"),
+]
+
+
+def test_candidates_cover_every_match():
+    checks = load_rules(RULES_YML)
+    rows = [enrich_rule(r) for r in RULES]
+    index = RuleIndex(rows)
+    for chk in checks:
+        cand = index.candidates(chk["guards"])
+        matched = {i for i, row in enumerate(rows) if chk["match"](row)[0]}
+        assert cand is None or matched <= cand, chk["id"]
+
+
+def test_guards_skip_rules_that_cannot_match():
+    checks = load_rules(RULES_YML)
+    rows = [enrich_rule(r) for r in RULES]
+    todo = plan(RuleIndex(rows), checks)
+    unguarded = [ci for ci, c in enumerate(checks) if c["guards"] is None]
+    assert todo[3] == unguarded  # deny rule: only checks without an action guard
+    assert all(t == sorted(t) for t in todo)
+
+
+def test_port_range_guard_uses_flattened_ports():
+    rows = [enrich_rule(r) for r in RULES]
+    index = RuleIndex(rows)
+    # tcp_3000-3500 flattens to endpoints [3000, 3500], exactly what overlaps_range reads
+    assert 5 in index.candidates(("port_range", 3000, 3000))
+    assert 5 not in index.candidates(("port_range", 3389, 3389))
+    assert 1 in index.candidates(("port_range", 3389, 3389))  # service any
+
+
+def test_indexed_engine_gives_same_findings():
+    assert (risk_engine.run_engine(RULES, rules_path=RULES_YML)
+            == risk_engine.run_engine(RULES, rules_path=RULES_YML, use_index=False))
@@ -0,0 +1,189 @@
+# tests/test_rules_loader.py
+import pytest
+from firefind.rules_loader import NodePool, SetTable, compile_condition, compile_node, enrich_rule, eval_condition
+
+SETS = dict(
+    port_groups={"admin": [22, 3389]},
+    cidr_groups={},
+    name_groups={"inet": ["any", "All_Internet"]},
+)
+
+
+def _row(src=("All_Internet",), ports=((22, 22),), proto="tcp", raw_service="SSH"):
+    services = [{"protocol": proto, "ports": [{"from": a, "to": b} for a, b in ports]}]
+    return enrich_rule({"rule_id": "1", "action": "allow", "src_addrs": list(src),
+                        "dst_addrs": ["10.0.0.1"], "services": services,
+                        "raw": {"service": raw_service}})
+
+
+def _ok(cond, row):
+    return compile_condition(cond, SetTable(**SETS))(row)
+
+
+@pytest.mark.parametrize("cond, expected", [
+    ({"field": "action", "op": "equals", "value": "allow"}, True),
+    ({"field": "service.any", "op": "is_false", "value": True}, True),
+    ({"field": "src_addrs", "op": "overlaps", "value": {"set_ref": "addr_names.inet"}}, True),
+    ({"field": "dst_addrs", "op": "overlaps", "value": {"set_ref": "addr_names.inet"}}, False),
+    ({"field": "service.ports", "op": "overlaps_range", "value": {"set_ref": "port_groups.admin"}}, True),
+    ({"field": "service.ports", "op": "overlaps_range", "value": [20, 23]}, True),
+    ({"field": "service.ports", "op": "overlaps_range", "value": [80, 80]}, False),
+    ({"field": "service.port_count", "op": "gte", "value": 1}, True),
+    ({"field": "raw.service", "op": "ilike_any", "value": ["ssh", "telnet"]}, True),
+    ({"field": "raw.service", "op": "not_ilike_any", "value": ["ssh"]}, False),
+    ({"field": "dst_addrs", "op": "contains", "value": "10.0.0.1"}, True),
+    ({"field": "nope.deeper.still", "op": "equals", "value": None}, True),
+    ({"field": "action", "op": "no_such_op", "value": "allow"}, False),
+    ({"all": []}, True),
+    ({"any": []}, False),
+    ({"all": "not-a-list"}, False),
+    ({"any": [{"field": "action", "op": "equals", "value": "deny"},
+              {"all": [{"field": "service.has_icmp", "op": "is_false"},
+                       {"field": "src.any", "op": "is_false"}]}]}, True),
+    ({"builtin": "reciprocal"}, False),
+])
+def test_operators(cond, expected):
+    assert _ok(cond, _row()) is expected
+
+
+def test_any_service_overlaps_every_range():
+    assert _ok({"field": "service.ports", "op": "overlaps_range", "value": [80, 80]}, _row(proto="any", ports=()))
+
+
+def test_eval_condition_returns_rationale():
+    cond = {"field": "action", "op": "equals", "value": "allow"}
+    assert eval_condition(cond, _row(), rule_meta={"rationale": "why"}, **SETS) == (True, "why")
+
+
+def test_set_refs_frozen_once_and_casefold():
+    table = SetTable(**SETS)
+    assert table.frozen["addr_names.inet"] == frozenset({"any", "All_Internet"})
+    assert table.frozen_for({"set_ref": "addr_names.inet"}) is table.frozen["addr_names.inet"]
+    row = _row(src=("all_internet",))
+    cond = {"field": "src_addrs", "op": "overlaps", "value": {"set_ref": "addr_names.inet"}}
+    assert compile_condition(cond, table)(row) is False
+    assert compile_condition(dict(cond, casefold=True), table)(row) is True
+    assert compile_condition(cond, SetTable(casefold=True, **SETS))(row) is True
+
+
+def test_shared_guard_compiled_once_and_evaluated_once_per_row():
+    table, pool = SetTable(**SETS), NodePool()
+    guard = {"field": "action", "op": "equals", "value": "allow"}
+    a = compile_node({"all": [guard, {"field": "service.any", "op": "is_false"}]}, table, pool)
+    b = compile_node({"all": [{"field": "src.any", "op": "is_false"}, dict(guard)]}, table, pool)
+    # same guard, and `all` children compared as a set
+    c = compile_node({"all": [{"field": "service.any", "op": "is_false"}, guard]}, table, pool)
+    assert a.children[0] is b.children[1]
+    assert c is a
+    assert pool.finish([a, b, c]) == {"unique": 5, "shared": 2}
+
+    class CountingRow(dict):
+        reads = 0
+
+        def get(self, k, default=None):
+            if k == "action":
+                CountingRow.reads += 1
+            return super().get(k, default)
+
+    row = CountingRow(_row())
+    assert a.fn(row) is True and b.fn(row) is True
+    assert CountingRow.reads == 1
+
+
+@pytest.mark.parametrize("ports, cond, expected", [
+    (((20, 25),), {"service": {"ports": {"any": {"in": [23, 110]}}}}, True),
+    (((24, 100),), {"service": {"ports": {"any": {"in": [23, 110]}}}}, False),
+    (((1, 2000),), {"service": {"ports": {"any": {"to_from_diff_gte": 1024}}}}, True),
+    (((1, 2000), (22, 22)), {"service": {"ports": {"all": {"to_from_diff_gte": 1024}}}}, False),
+    (((22, 22), (3389, 3389)), {"service": {"ports": {"all": {"in": {"set_ref": "port_groups.admin"}}}}}, True),
+    (((22, 22),), {"service": {"ports": {"any": {"not_in": [22], "to_from_diff_lte": 5}}}}, False),
+    (((22, 22),), {"service": {"ports": {"some": {"in": [22]}}}}, False),
+    (((22, 22),), {"service": {"ports": {"any": {"bogus": 1}}}}, False),
+    (((1000, 1999), (1500, 3047)), {"field": "service.port_span_total", "op": "gte", "value": 2048}, True),
+    (((1000, 1999), (1500, 3046)), {"field": "service.port_span_total", "op": "gte", "value": 2048}, False),
+])
+def test_port_quantifiers_and_span_total(ports, cond, expected):
+    assert _ok(cond, _row(ports=ports)) is expected
+
+
+def test_any_service_has_no_ranges_but_full_span():
+    row = _row(proto="any", ports=())
+    assert _ok({"service": {"ports": {"any": {"to_from_diff_gte": 0}}}}, row) is False
+    assert row["service"]["port_span_total"] == 65536
+
+
+def test_rule_set_cache_skips_yaml_on_repeat_loads(tmp_path, monkeypatch):
+    import yaml
+    from firefind import rules_loader
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "rules.yml"
+    path.write_text("rules:\n  - {id: X, name: x, severity: low, rationale: r,\n"
+                    "     when: {field: action, op: equals, value: allow}}\n")
+    first = rules_loader.load_rules(str(path))
+
+    def no_yaml(*a, **k):
+        raise AssertionError("YAML parsed on a cache hit")
+    monkeypatch.setattr(yaml, "load", no_yaml)
+    again = rules_loader.load_rules(str(path))
+    assert [c["id"] for c in again] == [c["id"] for c in first]
+    assert again[0]["match"](_row()) == (True, "r")
+
+    # edited file -> new key -> parsed again
+    path.write_text(path.read_text().replace("id: X", "id: Y"))
+    monkeypatch.undo()
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", str(tmp_path / "cache"))
+    assert rules_loader.load_rules(str(path))[0]["id"] == "Y"
+
+
+@pytest.mark.parametrize("tok, kind", [
+    ("10.1.0.0/16", "ipv4"), ("10.0.0.0/255.0.0.0", "ipv4"), ("2001:db8::/32", "ipv6"),
+    ("::ffff:1.2.3.4", "ipv6"), ("10.0.0.1-10.0.0.9", "range"), ("All_Internet", "name"),
+    ("WAN-DAAS_21", "name"), ("any", "name"),
+])
+def test_classify_addr_token(tok, kind):
+    from firefind.rules_loader import classify_addr_token
+    assert classify_addr_token(tok) == kind
+
+
+@pytest.mark.parametrize("tok", [
+    "10.1.1.1/24", "0.0.0.0/0", "::/0", "fe80::1", "256.1.1.1", "1.2.3.4/33", "01.2.3.4",
+    "10.0.0.1-10.0.0.9", "CLIENT1_AllNets", "1.2.3", "a:b",
+])
+def test_addr_token_info_agrees_with_ipaddress(tok):
+    import ipaddress
+    from firefind.rules_loader import addr_token_info
+    try:
+        net = ipaddress.ip_network(tok, strict=False)
+        expected = (str(net), net.prefixlen, net.is_private)
+    except ValueError:
+        expected = None
+    assert addr_token_info(tok) == expected
+
+
+_CIDR_SETS = SetTable({}, {"lab": ["10.0.0.0/9", "10.128.0.0/9", "fc00::/7", "192.168.1.10-192.168.1.20"]}, {})
+
+
+@pytest.mark.parametrize("addrs, within, overlaps", [
+    (["10.1.0.0/16"], True, True),                        # nested CIDR, not string-equal
+    (["10.0.0.0/8"], True, True),                         # spans two adjacent group entries
+    (["10.0.0.1-10.0.0.9", "fd00::1"], True, True),       # range + IPv6
+    (["192.168.1.12", "192.168.1.15-192.168.1.25"], False, True),
+    (["any"], False, True),
+    (["LAN"], False, False),                              # names never resolve
+    (["11.0.0.0/8", "LAN"], False, False),
+    ([], False, False),
+])
+def test_cidr_ops(addrs, within, overlaps):
+    ref = {"set_ref": "cidr_groups.lab"}
+    row = {"src_addrs": addrs}
+    assert compile_condition({"field": "src_addrs", "op": "within_cidr", "value": ref}, _CIDR_SETS)(row) is within
+    assert compile_condition({"field": "src_addrs", "op": "overlaps_cidr", "value": ref}, _CIDR_SETS)(row) is overlaps
+
+
+def test_cidr_ops_literal_and_empty_groups():
+    row = {"dst_addrs": ["172.20.1.0/24"]}
+    lit = compile_condition({"field": "dst_addrs", "op": "within_cidr", "value": ["172.16.0.0/12"]}, _CIDR_SETS)
+    assert lit(row) is True
+    missing = compile_condition({"field": "dst_addrs", "op": "overlaps_cidr",
+                                 "value": {"set_ref": "cidr_groups.nope"}}, _CIDR_SETS)
+    assert missing(row) is False
@@ -0,0 +1,49 @@
+# tests/test_selectivity.py
+import pathlib
+from firefind import risk_engine, selectivity
+from firefind.rules_loader import SetTable, compile_node, enrich_rule
+from firefind.v01 import to_v01
+
+RULES_YML = str(pathlib.Path(__file__).parent.parent / "docs" / "rules.yml")
+
+
+def _rule(rule_id, src="All_Internet", dst="10.0.0.0/24", service="ssh", action="accept"):
+    return to_v01({"vendor": "fortinet", "rule_id": rule_id, "src": src, "dst": dst,
+                   "service": service, "action": action, "reason": "", "severity": ""})
+
+
+RULES = [_rule(str(i), service=svc, action=act)
+         for i, (svc, act) in enumerate(
+             [("ssh", "accept"), ("ALL", "accept"), ("http", "deny"), ("tcp_3389", "accept"),
+              ("telnet, smtp", "accept"), ("udp_53", "deny")] * 10)]
+
+
+def test_all_puts_the_decisive_branch_first():
+    # action == "deny" is false for most rows -> should run first in an `all`
+    node = compile_node({"all": [
+        {"field": "service.any", "op": "is_false"},
+        {"field": "action", "op": "equals", "value": "deny"},
+    ]}, SetTable({}, {}, {}))
+    rows = [enrich_rule(r) for r in RULES]
+    before = [node.fn(r) for r in rows]
+    stats = selectivity.reorder_checks([{"node": node}], rows)
+    assert stats["nodes"] == 1
+    assert node.children[0].cond == {"field": "action", "op": "equals", "value": "deny"}
+    assert [node.fn(r) for r in rows] == before
+
+
+def test_optimized_engine_gives_same_findings(monkeypatch):
+    monkeypatch.setattr(selectivity, "MIN_ROWS", 1)
+    plain = risk_engine.run_engine(RULES, rules_path=RULES_YML, optimize=False)
+    assert risk_engine.run_engine(RULES, rules_path=RULES_YML) == plain
+
+
+def test_calibration_rows_are_not_enriched_twice(monkeypatch):
+    calls = []
+    real = risk_engine.enrich_rule
+    monkeypatch.setattr(risk_engine, "enrich_rule", lambda r: calls.append(r) or real(r))
+    risk_engine.run_engine(RULES, rules_path=RULES_YML, dedupe=False)
+    assert len(calls) == len(RULES)
+    calls.clear()
+    risk_engine.run_engine(RULES, rules_path=RULES_YML)  # 10 copies of 6 distinct rules
+    assert len(calls) == 6
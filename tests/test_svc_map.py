@@ -0,0 +1,66 @@
+# tests/test_svc_map.py
+import json
+from firefind.svc_map import load_svc_map
+from firefind.v01 import to_v01
+
+
+def _flat(service):
+    return {"vendor": "fortinet", "rule_id": "1", "src": "any", "dst": "any",
+            "service": service, "action": "accept", "reason": "", "severity": ""}
+
+
+def test_json_map_nested_groups(tmp_path, monkeypatch):
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", str(tmp_path / "cache"))
+    p = tmp_path / "svc.json"
+    p.write_text(json.dumps({
+        "GRP_Web_Tier": ["HTTPS", "App_8443", "GRP_Mgmt"],
+        "App_8443": "tcp/8443",
+        "GRP_Mgmt": {"members": ["tcp_22", {"protocol": "udp", "ports": [{"from": 161, "to": 162}]}]},
+    }))
+    m = load_svc_map(str(p))
+    assert m["grp_web_tier"] == (("tcp", 443, 443), ("tcp", 8443, 8443), ("tcp", 22, 22), ("udp", 161, 162))
+    v = to_v01(_flat("GRP_Web_Tier"), svc_map=m)
+    assert v["services"] == [
+        {"protocol": "tcp", "ports": [{"from": 22, "to": 22}, {"from": 443, "to": 443}, {"from": 8443, "to": 8443}]},
+        {"protocol": "udp", "ports": [{"from": 161, "to": 162}]},
+    ]
+    # without the map the unknown group falls back to any
+    assert to_v01(_flat("GRP_Web_Tier"))["services"] == [{"protocol": "any", "ports": []}]
+    # second load comes from the compiled cache
+    assert list((tmp_path / "cache").iterdir())
+    assert load_svc_map(str(p)) == m
+
+
+def test_csv_export_and_cycle(tmp_path, monkeypatch):
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", "off")
+    p = tmp_path / "services.csv"
+    p.write_text(
+        "Name,Protocol,Dst Port,Members\n"
+        "Backup_Agent,TCP,10000-10010,\n"
+        "Syslog_UDP,udp,514,\n"
+        "GRP_A,,,\"Backup_Agent\nGRP_B\"\n"
+        "GRP_B,,,\"Syslog_UDP\nGRP_A\"\n"
+    )
+    m = load_svc_map(str(p))
+    cycle = {("tcp", 10000, 10010), ("udp", 514, 514)}
+    assert set(m["grp_a"]) == cycle
+    assert set(m["grp_b"]) == cycle
+
+
+def test_protocol_without_ports_is_every_port(tmp_path, monkeypatch):
+    from firefind.normalized import NormalizedRule
+    from firefind.validate import validate_batch
+    monkeypatch.setenv("FIREFIND_CACHE_DIR", "off")
+    p = tmp_path / "svc.json"
+    p.write_text(json.dumps({"All_TCP": {"protocol": "tcp"}, "All_UDP": {"protocol": "udp", "ports": []},
+                             "Ping": {"protocol": "icmp"}}))
+    m = load_svc_map(str(p))
+    assert m["all_tcp"] == (("tcp", 0, 65535),) and m["ping"] == (("icmp", None, None),)
+    v = to_v01(_flat("All_TCP, All_UDP, Ping"), svc_map=m)
+    assert v["services"][0] == {"protocol": "tcp", "ports": [{"from": 0, "to": 65535}]}
+    assert validate_batch([v], kind="rule", mode="full")["invalid_count"] == 0
+    assert NormalizedRule.from_v01(v).to_v01()["services"] == v["services"]
+
+    csv_path = tmp_path / "services.csv"
+    csv_path.write_text("Name,Protocol,Dst Port\nAny_TCP,tcp,\n", encoding="utf-8")
+    assert load_svc_map(str(csv_path))["any_tcp"] == (("tcp", 0, 65535),)
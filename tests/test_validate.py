@@ -0,0 +1,33 @@
+# tests/test_validate.py
+from firefind.normalized import NormalizedRule
+from firefind.risk_engine import make_finding
+from firefind.v01 import to_v01
+from firefind.validate import validate_batch, drop_invalid
+
+FLAT = {"vendor": "fortinet", "rule_id": "1", "src": "any", "dst": "WAN_21",
+        "service": "tcp_22", "action": "accept", "reason": "", "severity": ""}
+
+
+def test_rules_full_mode_flags_and_drops_bad_rows():
+    good = to_v01(FLAT)
+    bad = dict(good, action="permit", services=[{"protocol": "tcp", "ports": [{"from": "22", "to": 22}]}])
+    rows = [good, NormalizedRule.from_v01(good), bad]
+    rep = validate_batch(rows, kind="rule", mode="full")
+    assert rep["checked"] == 3 and rep["invalid_indexes"] == [2]
+    assert any("action" in e for e in rep["invalid"][0]["errors"])
+    kept, dropped = drop_invalid(rows, rep)
+    assert dropped == 1 and len(kept) == 2
+
+
+def test_sample_mode_checks_head_plus_stride():
+    rows = [to_v01(FLAT)] * 1000
+    rep = validate_batch(rows, kind="rule", mode="sample", sample_rate=0.1)
+    assert rep["checked"] == 100 + 90
+    assert rep["invalid_count"] == 0
+
+
+def test_engine_findings_match_schema():
+    chk = {"id": "R-X", "name": "x", "severity": "high", "rationale": "r", "recommendation": "fix"}
+    f = make_finding(to_v01(FLAT), chk, "r")
+    assert validate_batch([f], kind="finding")["invalid_count"] == 0
+    assert validate_batch([dict(f, severity="info")], kind="finding")["invalid_count"] == 1